@@ -1,29 +1,191 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
+import asyncio
 import os
+import threading
+import weakref
+from cache import LRUCache, SQLiteCache, MISSING
+from instrumentation import increment, stage
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# langchain_groq, langchain_core and httpx take over a second to import, so
+# they are imported when the first question is asked rather than with this module
+
+MODEL_NAME = "llama3-70b-8192"
+
+# Maximum number of requests in flight to Groq at once (per event loop for the
+# async API), which is also the size of the HTTP connection pool
+MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "16"))
+
+# Answer cache configuration: backend is "memory", "sqlite" or "off"
+ANSWER_CACHE_BACKEND = os.getenv("GROQ_ANSWER_CACHE", "memory")
+ANSWER_CACHE_SIZE = int(os.getenv("GROQ_ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("GROQ_ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_PATH = os.getenv("GROQ_ANSWER_CACHE_PATH", os.path.join("data", "answer_cache.sqlite3"))
+
 # Initialize the model
-def get_model():
+def get_model(**client_options):
+    from langchain_groq import ChatGroq
+    
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise ValueError("GROQ_API_KEY not found. Make sure to set the variable in the .env file")
     
     return ChatGroq(
         api_key=api_key,
-        model_name="llama3-70b-8192"
+        model_name=MODEL_NAME,
+        **client_options
     )
 
 # Create a prompt template
 system_prompt = """You are an expert agent specialized in answering general questions and also classifying texts into simple categories."""
 
-prompt_template = ChatPromptTemplate.from_messages([
-    ("system", system_prompt),
-    ("human", "{question}")
-])
+_prompt_template = None
+
+def get_prompt_template():
+    """Get the shared prompt template, building it on first use."""
+    global _prompt_template
+    if _prompt_template is None:
+        from langchain_core.prompts import ChatPromptTemplate
+        
+        _prompt_template = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("human", "{question}")
+        ])
+    return _prompt_template
+
+# Chains are built once and reused. The sync chain is keyed on the API key;
+# async chains are also kept per event loop, because pooled async connections
+# and semaphores cannot be shared between loops.
+_chain_lock = threading.Lock()
+_sync_chains = {}
+_sync_clients = {}
+_async_resources = weakref.WeakKeyDictionary()
+
+def _pool_limits():
+    import httpx
+    
+    return httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY)
+
+def get_chain():
+    """
+    Get the shared prompt | model chain for synchronous calls.
+    
+    The model and its pooled HTTP client are created on first use and reused
+    until the GROQ_API_KEY changes.
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    chain = _sync_chains.get(api_key)
+    if chain is None:
+        with _chain_lock:
+            chain = _sync_chains.get(api_key)
+            if chain is None:
+                import httpx
+                
+                client = httpx.Client(limits=_pool_limits())
+                try:
+                    chain = get_prompt_template() | get_model(http_client=client)
+                except BaseException:
+                    client.close()
+                    raise
+                _close_sync_clients()
+                _sync_chains[api_key] = chain
+                _sync_clients[api_key] = client
+    return chain
+
+def _close_sync_clients():
+    """Drop the cached sync chains and close their connection pools; the caller holds _chain_lock."""
+    _sync_chains.clear()
+    for client in _sync_clients.values():
+        client.close()
+    _sync_clients.clear()
+
+async def _get_async_resources():
+    """Get the chain and concurrency semaphore for the running event loop."""
+    loop = asyncio.get_running_loop()
+    api_key = os.getenv("GROQ_API_KEY")
+    resources = _async_resources.get(loop)
+    if resources is None or resources[0] != api_key:
+        import httpx
+        
+        client = httpx.AsyncClient(limits=_pool_limits())
+        try:
+            chain = get_prompt_template() | get_model(http_async_client=client)
+        except BaseException:
+            await client.aclose()
+            raise
+        previous = resources
+        resources = (api_key, chain, asyncio.Semaphore(MAX_CONCURRENCY), client)
+        _async_resources[loop] = resources
+        if previous is not None:
+            await previous[3].aclose()
+    return resources[1], resources[2]
+
+def _close_async_client(loop, client):
+    """Close an async client on its own event loop, or on a new one if that loop has ended."""
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    elif not loop.is_closed():
+        loop.run_until_complete(client.aclose())
+    else:
+        asyncio.run(client.aclose())
+
+def clear_client_cache():
+    """
+    Drop the cached chains and close their connection pools, e.g. after
+    swapping the model in tests.
+    
+    Async pools are closed on their own event loop while it runs; call this
+    from outside async code otherwise.
+    """
+    with _chain_lock:
+        _close_sync_clients()
+        resources = list(_async_resources.items())
+        _async_resources.clear()
+    for loop, (_, _, _, client) in resources:
+        _close_async_client(loop, client)
+
+def create_answer_cache(backend=ANSWER_CACHE_BACKEND):
+    """
+    Create an answer cache for the given backend.
+    
+    Args:
+        backend (str): "memory", "sqlite" or "off"
+        
+    Returns:
+        The cache, or None when caching is off
+    """
+    if backend == "off":
+        return None
+    if backend == "sqlite":
+        return SQLiteCache(ANSWER_CACHE_PATH, max_size=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)
+    if backend == "memory":
+        return LRUCache(max_size=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)
+    raise ValueError(f"Unknown answer cache backend: {backend}")
+
+_answer_cache = create_answer_cache()
+
+def get_answer_cache():
+    """Get the answer cache in use, or None when caching is off."""
+    return _answer_cache
+
+def set_answer_cache(cache):
+    """
+    Replace the answer cache.
+    
+    Args:
+        cache: Any object with get(key, default) and set(key, value), or None to disable caching
+    """
+    global _answer_cache
+    _answer_cache = cache
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for cache lookups: lowercase and collapse whitespace."""
+    return " ".join(question.lower().split())
+
+def _answer_cache_key(question):
+    return (MODEL_NAME, system_prompt, normalize_question(question))
 
 def answer(question: str) -> str:
     """
@@ -35,10 +197,83 @@ def answer(question: str) -> str:
     Returns:
         str: The response generated by the model
     """
-    try:
-        model = get_model()
-        chain = prompt_template | model
-        response = chain.invoke({"question": question})
-        return response.content
-    except Exception as e:
-        return f"Error processing the question: {str(e)}" 
\ No newline at end of file
+    with stage("answer"):
+        increment("answers_total")
+        cache = _answer_cache
+        if cache is not None:
+            cached = cache.get(_answer_cache_key(question), MISSING)
+            if cached is not MISSING:
+                increment("answer_cache_hits_total")
+                return cached
+        
+        try:
+            with stage("answer_client"):
+                chain = get_chain()
+            with stage("answer_request"):
+                response = chain.invoke({"question": question})
+            # Only successful answers are cached
+            if cache is not None:
+                cache.set(_answer_cache_key(question), response.content)
+            return response.content
+        except Exception as e:
+            increment("answer_errors_total")
+            return f"Error processing the question: {str(e)}"
+
+async def answer_async(question: str) -> str:
+    """
+    Answer a question without blocking the event loop.
+    
+    Concurrent calls share one pooled client, and at most MAX_CONCURRENCY of
+    them are in flight at a time.
+    
+    Args:
+        question (str): The user's question
+        
+    Returns:
+        str: The response generated by the model
+    """
+    with stage("answer"):
+        increment("answers_total")
+        cache = _answer_cache
+        if cache is not None:
+            cached = cache.get(_answer_cache_key(question), MISSING)
+            if cached is not MISSING:
+                increment("answer_cache_hits_total")
+                return cached
+        
+        try:
+            with stage("answer_client"):
+                chain, semaphore = await _get_async_resources()
+            # Includes the wait for a free slot under MAX_CONCURRENCY
+            with stage("answer_request"):
+                async with semaphore:
+                    response = await chain.ainvoke({"question": question})
+            if cache is not None:
+                cache.set(_answer_cache_key(question), response.content)
+            return response.content
+        except Exception as e:
+            increment("answer_errors_total")
+            return f"Error processing the question: {str(e)}"
+
+async def answer_many(questions, max_concurrency: int = None) -> list:
+    """
+    Answer many questions concurrently.
+    
+    Args:
+        questions: Iterable of questions
+        max_concurrency (int): Optional lower limit on requests in flight for
+            this call, on top of the shared MAX_CONCURRENCY limit
+            
+    Returns:
+        list: The responses, in the same order as the questions
+    """
+    if max_concurrency is None:
+        return await asyncio.gather(*(answer_async(question) for question in questions))
+    
+    limit = asyncio.Semaphore(max_concurrency)
+    
+    async def limited(question):
+        async with limit:
+            return await answer_async(question)
+    
+    return await asyncio.gather(*(limited(question) for question in questions))
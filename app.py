@@ -1,13 +1,21 @@
 import streamlit as st
 from agents import answer
-from ml_logic import classify_text, get_category_description, get_classifier_metrics
+from ml_logic import classify_text_result, get_category_description, get_classifier_metrics
 import time
 import os
-from data_utils import save_classification_results
-import pandas as pd
+from data_utils import save_classification_results, classify_csv_stream, batch_classify
+import instrumentation
+import json
 import base64
-import numpy as np
-import matplotlib.pyplot as plt
+
+# pandas and matplotlib take about a second and a half to import, so they are
+# imported where they are first needed and the first page renders without them
+
+# Number of rows shown when previewing uploaded CSV files and their results
+PREVIEW_ROWS = 100
+
+# Larger result files are kept on disk instead of being offered for download
+MAX_DOWNLOAD_BYTES = 200 * 1024 * 1024
 
 # Set page configuration
 st.set_page_config(
@@ -147,6 +155,8 @@ def get_csv_download_link(df, filename="classification_results.csv", text="Downl
 
 def create_metrics_charts(metrics):
     """Create charts for model metrics visualization"""
+    import matplotlib.pyplot as plt
+    
     # Create a figure with multiple subplots
     fig, axes = plt.subplots(1, 2, figsize=(10, 4))
     
@@ -233,14 +243,17 @@ def main():
             
             # Export to CSV button
             if st.button("Export All Classifications to CSV"):
+                import pandas as pd
                 try:
                     # Create DataFrame from history
                     history_df = pd.DataFrame(st.session_state.classification_history)
                     
-                    # Save to CSV file
+                    # Save to a CSV file; without a filename the history would be
+                    # appended to the results store again on every click
                     file_path = save_classification_results(
                         history_df['text'].tolist(), 
-                        history_df['category'].tolist()
+                        history_df['category'].tolist(),
+                        f"classification_results_{time.strftime('%Y%m%d_%H%M%S')}.csv"
                     )
                     
                     st.success(f"Classifications saved to {file_path}")
@@ -254,7 +267,7 @@ def main():
                 st.success("History cleared!")
     
     # Create tabs for main functionality
-    tab1, tab2, tab3 = st.tabs(["Classify & Answer", "Model Metrics", "Batch Processing"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Classify & Answer", "Model Metrics", "Batch Processing", "Performance"])
     
     # Tab 1: Main classification and answering functionality
     with tab1:
@@ -290,16 +303,24 @@ def main():
         # Button to classify the text
         if col2.button("Classify Text 🔍", use_container_width=True):
             if user_text:
+                import pandas as pd
                 with st.spinner("Analyzing text..."):
                     # Add a slight delay to show the spinner
                     time.sleep(0.5)
-                    category = classify_text(user_text)
+                    try:
+                        result = classify_text_result(user_text)
+                    except Exception as e:
+                        st.error(f"Error classifying the text: {str(e)}")
+                        st.stop()
+                    category = result.category
                     description = get_category_description(category)
                     
                     # Add to classification history
                     st.session_state.classification_history.append({
                         'text': user_text,
                         'category': category,
+                        'confidence': round(result.confidence, 3),
+                        'rule': result.rule,
                         'description': description,
                         'timestamp': pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
                     })
@@ -332,6 +353,16 @@ def main():
                     </div>
                     """, unsafe_allow_html=True)
                     
+                    # Confidence and margins come from the same decision pass as the category
+                    details = f"Confidence (largest margin): {result.confidence:.2f}"
+                    if result.rule:
+                        details += f" · Decided by rule: {result.rule} (model predicted {result.predicted})"
+                    if result.model_version:
+                        details += f" · Model: {result.model_version[:12]}"
+                    st.caption(details)
+                    with st.expander("Per-category margins"):
+                        st.bar_chart(pd.Series(result.margins_by_class(), name="margin"))
+                    
                     # Show example response based on category
                     if category == "question" and hasattr(st.session_state, 'groq_api_key') and st.session_state.groq_api_key:
                         st.markdown("### 🤖 Suggested Response:")
@@ -347,6 +378,7 @@ def main():
                     result_df = pd.DataFrame([{
                         'text': user_text,
                         'category': category,
+                        'confidence': result.confidence,
                         'description': description
                     }])
                     st.markdown(get_csv_download_link(result_df, "single_classification.csv", "💾 Download this result"), unsafe_allow_html=True)
@@ -356,6 +388,7 @@ def main():
         # Display classification history
         if st.session_state.classification_history:
             with st.expander("View Classification History"):
+                import pandas as pd
                 history_df = pd.DataFrame(st.session_state.classification_history)
                 st.dataframe(history_df, use_container_width=True)
     
@@ -368,13 +401,14 @@ def main():
         """)
         
         if st.button("Calculate Model Metrics"):
+            import pandas as pd
             with st.spinner("Calculating metrics..."):
                 try:
                     # Get model metrics
                     metrics = get_classifier_metrics()
                     
                     # Display overall accuracy
-                    st.markdown(f"### Overall Performance")
+                    st.markdown("### Overall Performance")
                     st.metric("Mean Cross-Validation Accuracy", f"{metrics['mean_cv_score']:.4f}")
                     
                     # Create and display charts
@@ -428,16 +462,15 @@ def main():
                     texts = [text.strip() for text in batch_texts.split('\n') if text.strip()]
                     
                     if texts:
+                        import pandas as pd
                         with st.spinner(f"Classifying {len(texts)} texts..."):
-                            results = []
-                            for text in texts:
-                                category = classify_text(text)
-                                description = get_category_description(category)
-                                results.append({
-                                    'text': text,
-                                    'category': category,
-                                    'description': description
-                                })
+                            results = [{
+                                'text': text,
+                                'category': category,
+                                'confidence': round(result.confidence, 3),
+                                'rule': result.rule,
+                                'description': description
+                            } for text, category, description, result in batch_classify(texts, use_cache=True)]
                             
                             results_df = pd.DataFrame(results)
                             st.dataframe(results_df, use_container_width=True)
@@ -458,9 +491,11 @@ def main():
             uploaded_file = st.file_uploader("Upload CSV file with texts to classify", type=["csv"])
             
             if uploaded_file is not None:
+                import pandas as pd
                 try:
-                    # Load the CSV file
-                    df = pd.read_csv(uploaded_file)
+                    # Only read a preview; the full file is streamed when classifying
+                    df = pd.read_csv(uploaded_file, nrows=PREVIEW_ROWS)
+                    uploaded_file.seek(0)
                     
                     # Check if the CSV has a text column
                     if 'text' in df.columns:
@@ -477,37 +512,85 @@ def main():
                     st.dataframe(df.head(), use_container_width=True)
                     
                     if st.button("Classify CSV Data"):
-                        texts = df[text_column].tolist()
+                        progress_bar = st.progress(0.0, text="Classifying texts...")
+                        total_bytes = max(uploaded_file.size, 1)
                         
-                        with st.spinner(f"Classifying {len(texts)} texts..."):
-                            results = []
-                            for text in texts:
-                                if pd.notna(text):  # Check for NaN values
-                                    category = classify_text(str(text))
-                                    description = get_category_description(category)
-                                    results.append({
-                                        'text': text,
-                                        'category': category,
-                                        'description': description
-                                    })
-                            
-                            results_df = pd.DataFrame(results)
-                            
-                            # Display results
-                            st.markdown("### Classification Results")
-                            st.dataframe(results_df, use_container_width=True)
-                            
-                            # Add download link
-                            st.markdown(get_csv_download_link(results_df, "csv_classifications.csv", "💾 Download results"), unsafe_allow_html=True)
-                            
-                            # Show category distribution
-                            st.markdown("### Category Distribution")
-                            category_counts = results_df['category'].value_counts()
-                            st.bar_chart(category_counts)
+                        def update_progress(rows, bytes_read):
+                            progress_bar.progress(min(bytes_read / total_bytes, 1.0),
+                                                  text=f"Classified {rows:,} texts...")
+                        
+                        # Classify in chunks and append each chunk to the results file
+                        summary = classify_csv_stream(uploaded_file, text_column,
+                                                      progress_callback=update_progress)
+                        progress_bar.progress(1.0, text=f"Classified {summary['rows']:,} texts")
+                        
+                        # Display the first results
+                        st.markdown("### Classification Results")
+                        results_df = pd.read_csv(summary['path'], nrows=PREVIEW_ROWS)
+                        results_df['Description'] = results_df['Category'].map(get_category_description)
+                        st.dataframe(results_df, use_container_width=True)
+                        if summary['rows'] > PREVIEW_ROWS:
+                            st.caption(f"Showing the first {PREVIEW_ROWS} of {summary['rows']:,} results.")
+                        
+                        # Offer the results file for download unless it is too large to serve
+                        st.success(f"Results saved to {summary['path']}")
+                        if os.path.getsize(summary['path']) <= MAX_DOWNLOAD_BYTES:
+                            with open(summary['path'], 'rb') as results_file:
+                                st.download_button("💾 Download results", results_file,
+                                                   file_name="csv_classifications.csv", mime="text/csv")
+                        
+                        # Show category distribution
+                        st.markdown("### Category Distribution")
+                        category_counts = pd.Series(summary['category_counts'], dtype=int).sort_values(ascending=False)
+                        st.bar_chart(category_counts)
                             
                 except Exception as e:
                     st.error(f"Error processing CSV file: {str(e)}")
     
+    # Tab 4: Stage timings
+    with tab4:
+        st.markdown("### Stage Timings")
+        st.markdown("""
+        Time spent in each stage of classification (preprocessing, vectorization,
+        prediction, rule overrides, model loading and saving) and of agent answers
+        (client setup and the API request), recorded in this process.
+        """)
+        
+        recording = st.toggle("Record stage timings", value=instrumentation.is_enabled(),
+                              help="Recording can also be turned on at startup with CLASSIFIER_METRICS=on")
+        if recording != instrumentation.is_enabled():
+            if recording:
+                instrumentation.enable()
+            else:
+                instrumentation.disable()
+        
+        stages = instrumentation.registry.stage_summary()
+        if not stages:
+            st.info("No timings recorded yet. Turn recording on, then classify or ask something.")
+        else:
+            import pandas as pd
+            stages_df = pd.DataFrame(stages).set_index("stage")
+            st.bar_chart(stages_df["total_ms"])
+            st.dataframe(stages_df, use_container_width=True)
+            
+            counters = instrumentation.registry.counters()
+            if counters:
+                st.markdown("### Counters")
+                st.dataframe(pd.DataFrame([
+                    {"counter": row["name"], "labels": ", ".join(f"{k}={v}" for k, v in row["labels"].items()),
+                     "value": row["value"]}
+                    for row in counters
+                ]), use_container_width=True)
+        
+        col1, col2, col3 = st.columns(3)
+        col1.download_button("Prometheus text", instrumentation.export_prometheus(),
+                             file_name="metrics.prom", mime="text/plain", use_container_width=True)
+        col2.download_button("JSON", json.dumps(instrumentation.export_json(), indent=2),
+                             file_name="metrics.json", mime="application/json", use_container_width=True)
+        if col3.button("Reset timings", use_container_width=True):
+            instrumentation.reset()
+            st.rerun()
+    
     # Instructions
     with st.expander("How to use this application"):
         st.markdown("""
@@ -517,6 +600,7 @@ def main():
         3. **Classify Text**: Analyze what type of content your text represents
         4. **Model Metrics**: View performance metrics of the classification model
         5. **Batch Processing**: Classify multiple texts at once
+        6. **Performance**: Record and inspect where time is spent
         
         ### Tips:
         - For best results with the agent, ask clear and specific questions
@@ -0,0 +1,744 @@
+"""
+Benchmarks for Groq Classifier
+
+Reproducible, offline benchmarks for the classification hot paths.
+
+Usage:
+    python benchmarks.py parallel --texts 100000 --max-workers 8
+    python benchmarks.py vectorizers --texts 100000
+    python benchmarks.py inference --texts 2000
+    python benchmarks.py worker-memory --workers 4
+    python benchmarks.py suite --output bench.json
+    python benchmarks.py compare baseline.json bench.json
+    python benchmarks.py startup
+    python benchmarks.py --profile suite --sizes 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import List, Dict, Any, Tuple
+
+# Phrases combined into synthetic texts, grouped by the category they express;
+# together they cover every category and rule
+CATEGORY_PHRASES = {
+    "positive": [
+        "I love this product", "this is the best purchase I've ever made",
+        "very satisfied with the service", "absolutely amazing quality",
+    ],
+    "negative": [
+        "I don't like it", "terrible experience", "the product broke on first use",
+        "not happy with the delivery", "waste of money",
+    ],
+    "question": [
+        "how does this work?", "when will my order arrive?", "is there a warranty?",
+    ],
+    "informational": [
+        "the store opens at 9am", "shipping takes 3-5 business days",
+        "the package includes a charger", "the color is blue", "made in China",
+        "I received the item yesterday", "it runs on batteries",
+    ],
+}
+SYNTHETIC_PHRASES = [phrase for phrases in CATEGORY_PHRASES.values() for phrase in phrases]
+
+
+def synthetic_texts(count: int, seed: int = 0) -> List[str]:
+    """
+    Generate a deterministic list of synthetic texts.
+    
+    Args:
+        count: Number of texts to generate
+        seed: Random seed, so runs are reproducible
+        
+    Returns:
+        List of texts made of one to four phrases each
+    """
+    rng = random.Random(seed)
+    return [
+        ", ".join(rng.choice(SYNTHETIC_PHRASES) for _ in range(rng.randint(1, 4)))
+        for _ in range(count)
+    ]
+
+
+def labelled_synthetic_corpus(count: int, vocabulary_size: int = 50000,
+                              seed: int = 0) -> Tuple[List[str], List[str]]:
+    """
+    Generate a deterministic labelled corpus with a large vocabulary.
+    
+    Each text combines phrases from one category, sometimes a phrase from
+    another, and random filler words drawn from vocabulary_size distinct
+    tokens, so the number of distinct n-grams grows with the corpus like it
+    does on real messages.
+    
+    Args:
+        count: Number of texts to generate
+        vocabulary_size: Number of distinct filler words
+        seed: Random seed, so runs are reproducible
+        
+    Returns:
+        (texts, categories) as parallel lists
+    """
+    rng = random.Random(seed)
+    categories = list(CATEGORY_PHRASES)
+    texts = []
+    labels = []
+    for _ in range(count):
+        category = rng.choice(categories)
+        # Log-uniform word ranks: a few very common words and a long tail
+        words = [f"w{int(vocabulary_size ** rng.random())}" for _ in range(rng.randint(2, 8))]
+        phrases = [rng.choice(CATEGORY_PHRASES[category]) for _ in range(rng.randint(1, 2))]
+        # Some texts also mention another category, so the task is not trivially separable
+        if rng.random() < 0.3:
+            phrases.append(rng.choice(SYNTHETIC_PHRASES))
+        texts.append(" ".join(words[:len(words) // 2] + phrases + words[len(words) // 2:]))
+        labels.append(category)
+    return texts, labels
+
+
+def benchmark_vectorizers(num_texts: int = 100000, n_features: int = None) -> Dict[str, Any]:
+    """
+    Compare the TF-IDF and hashing vectorizer modes.
+    
+    Each mode is fitted on 80% of a labelled synthetic corpus and scored on
+    the rest, and is also cross-validated on the real training corpus.
+    
+    Args:
+        num_texts: Number of synthetic texts
+        n_features: Hashed feature space size, defaults to ml_logic's default
+        
+    Returns:
+        Dictionary with fit time, peak traced memory, pickled size and
+        accuracy for each mode
+    """
+    import io
+    import tracemalloc
+    import joblib
+    from ml_logic import train_classifier, build_pipeline, evaluate_classifier, get_training_data
+    
+    texts, labels = labelled_synthetic_corpus(num_texts)
+    split = int(num_texts * 0.8)
+    corpus_examples, corpus_categories = get_training_data()
+    
+    results = []
+    for mode in ("tfidf", "hashing"):
+        start = time.perf_counter()
+        model = train_classifier(texts[:split], labels[:split], vectorizer=mode, n_features=n_features)
+        fit_seconds = time.perf_counter() - start
+        
+        # Memory is traced in a second fit, since tracing slows allocation down
+        tracemalloc.start()
+        train_classifier(texts[:split], labels[:split], vectorizer=mode, n_features=n_features)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        predictions = model.predict(texts[split:])
+        holdout_accuracy = sum(p == label for p, label in zip(predictions, labels[split:])) / (num_texts - split)
+        cv = evaluate_classifier(build_pipeline(mode, n_features), corpus_examples, corpus_categories)
+        
+        results.append({
+            "vectorizer": mode,
+            "fit_seconds": round(fit_seconds, 3),
+            "peak_traced_mb": round(peak / 2 ** 20, 1),
+            "model_mb": round(buffer.tell() / 2 ** 20, 2),
+            "holdout_accuracy": round(holdout_accuracy, 4),
+            "corpus_cv_accuracy": round(float(cv['mean_cv_score']), 4),
+        })
+    
+    return {
+        "benchmark": "vectorizers",
+        "texts": num_texts,
+        "n_features": n_features,
+        "results": results,
+    }
+
+
+def benchmark_parallel_scaling(num_texts: int = 100000, max_workers: int = None,
+                               chunk_size: int = None) -> Dict[str, Any]:
+    """
+    Measure batch classification throughput from one worker up to max_workers.
+    
+    Args:
+        num_texts: Number of synthetic texts to classify
+        max_workers: Largest worker count to try, defaults to the number of CPUs
+        chunk_size: Texts per worker shard, defaults to data_utils' default
+        
+    Returns:
+        Dictionary with the parameters and one result per worker count
+    """
+    from data_utils import classify_parallel, DEFAULT_PARALLEL_CHUNK_SIZE
+    from ml_logic import clear_prediction_cache, get_model
+    
+    max_workers = max_workers or os.cpu_count() or 1
+    chunk_size = chunk_size or DEFAULT_PARALLEL_CHUNK_SIZE
+    texts = synthetic_texts(num_texts)
+    
+    # Train or load the model up front so it is not part of the timings
+    get_model()
+    
+    results = []
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        # Forked workers would otherwise inherit the cache warmed by earlier runs
+        clear_prediction_cache()
+        start = time.perf_counter()
+        classify_parallel(texts, workers=workers, chunk_size=chunk_size, use_cache=False)
+        elapsed = time.perf_counter() - start
+        
+        baseline = baseline or elapsed
+        results.append({
+            "workers": workers,
+            "seconds": round(elapsed, 4),
+            "texts_per_second": round(num_texts / elapsed, 1),
+            "speedup": round(baseline / elapsed, 2),
+        })
+    
+    return {
+        "benchmark": "parallel_scaling",
+        "texts": num_texts,
+        "chunk_size": chunk_size,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def benchmark_inference(num_texts: int = 2000, batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Compare the sklearn pipeline with the NumPy inference engine.
+    
+    Single-text latency is the time to score one preprocessed text (label
+    and margins); batch throughput scores batch_size texts per call.
+    
+    Args:
+        num_texts: Number of synthetic texts
+        batch_size: Texts per call in the batch measurement
+        
+    Returns:
+        Dictionary with p50/p99 single-text latency and batch throughput for each path
+    """
+    import numpy as np
+    from ml_logic import get_model, get_inference_engine, preprocess_text
+    
+    model = get_model()
+    engine = get_inference_engine(model)
+    vectorizer = model.named_steps['vectorizer']
+    classifier = model.named_steps['classifier']
+    texts = [preprocess_text(text) for text in synthetic_texts(num_texts)]
+    
+    def sklearn_score(batch):
+        scores = classifier.decision_function(vectorizer.transform(batch))
+        return classifier.classes_[scores.argmax(axis=1)], scores
+    
+    paths = {
+        "sklearn": (lambda text: sklearn_score([text]), sklearn_score),
+        "engine": (engine.score, engine.score_batch),
+    }
+    
+    results = []
+    for name, (score, score_batch) in paths.items():
+        latencies = []
+        for text in texts:
+            start = time.perf_counter()
+            score(text)
+            latencies.append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        for offset in range(0, num_texts, batch_size):
+            score_batch(texts[offset:offset + batch_size])
+        batch_seconds = time.perf_counter() - start
+        
+        results.append({
+            "path": name,
+            "p50_us": round(float(np.percentile(latencies, 50)) * 1e6, 1),
+            "p99_us": round(float(np.percentile(latencies, 99)) * 1e6, 1),
+            "batch_texts_per_second": round(num_texts / batch_seconds, 1),
+        })
+    
+    return {
+        "benchmark": "inference",
+        "texts": num_texts,
+        "batch_size": batch_size,
+        "results": results,
+    }
+
+
+def _process_memory() -> Dict[str, Any]:
+    """Return this process's resident (RSS) and proportional (PSS) set sizes in MB."""
+    memory = {"rss_mb": None, "pss_mb": None}
+    try:
+        # PSS divides each shared page between the processes mapping it
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, value = line.split(":", 1)
+                if name in ("Rss", "Pss"):
+                    memory[f"{name.lower()}_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        import resource
+        memory["rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return memory
+
+
+def _memory_worker(filename, mmap_mode, texts, barrier, results):
+    from ml_logic import load_model
+    
+    before = _process_memory()
+    model = load_model(filename, mmap_mode=mmap_mode)
+    model.decision_function(texts)
+    # Measure once every worker holds the model, and keep it until all have measured
+    barrier.wait()
+    after = _process_memory()
+    barrier.wait()
+    results.put({"before": before, "after": after})
+
+
+def benchmark_worker_memory(workers: int = 4, num_texts: int = 100000, n_features: int = 2 ** 20) -> Dict[str, Any]:
+    """
+    Measure the memory each worker process spends on a loaded model.
+    
+    A hashing-mode model (whose dense coefficients dominate its size) is
+    trained on a labelled synthetic corpus and saved. Worker processes then
+    load it concurrently, with and without memory mapping, and score a batch.
+    
+    Args:
+        workers: Number of concurrent worker processes
+        num_texts: Number of synthetic labelled texts to train on
+        n_features: Hashed feature space size
+        
+    Returns:
+        Dictionary with per-worker RSS and PSS growth for each load mode
+    """
+    import multiprocessing
+    from ml_logic import train_classifier, save_model
+    
+    texts, labels = labelled_synthetic_corpus(num_texts)
+    model = train_classifier(texts, labels, vectorizer="hashing", n_features=n_features)
+    filename = "benchmark_worker_memory.joblib"
+    path = save_model(model, filename)
+    model_mb = os.path.getsize(path) / 2 ** 20
+    del model
+    
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for mmap_mode in (None, "r"):
+            barrier = context.Barrier(workers)
+            queue = context.Queue()
+            processes = [
+                context.Process(target=_memory_worker, args=(filename, mmap_mode, texts[:1000], barrier, queue))
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            measurements = [queue.get() for _ in processes]
+            for process in processes:
+                process.join()
+            
+            def mean_growth(key):
+                if measurements[0]["after"][key] is None:
+                    return None
+                growth = [m["after"][key] - m["before"][key] for m in measurements]
+                return round(sum(growth) / len(growth), 1)
+            
+            results.append({
+                "mmap_mode": mmap_mode,
+                "rss_growth_mb_per_worker": mean_growth("rss_mb"),
+                "pss_growth_mb_per_worker": mean_growth("pss_mb"),
+            })
+    finally:
+        os.remove(path)
+    
+    return {
+        "benchmark": "worker_memory",
+        "workers": workers,
+        "n_features": n_features,
+        "model_mb": round(model_mb, 1),
+        "results": results,
+    }
+
+
+# Corpus sizes of the benchmark suite
+SUITE_SIZES = (1000, 100000, 1000000)
+
+
+def _latency(function, inputs) -> Dict[str, Any]:
+    """Call function on each input and return p50/p99 latency in microseconds."""
+    import numpy as np
+    
+    timings = np.empty(len(inputs))
+    clock = time.perf_counter
+    for i, value in enumerate(inputs):
+        start = clock()
+        function(value)
+        timings[i] = clock() - start
+    return {
+        "calls": len(inputs),
+        "p50_us": round(float(np.percentile(timings, 50)) * 1e6, 2),
+        "p99_us": round(float(np.percentile(timings, 99)) * 1e6, 2),
+        "mean_us": round(float(timings.mean()) * 1e6, 2),
+    }
+
+
+def _environment() -> Dict[str, Any]:
+    """Describe the code and machine a benchmark ran on."""
+    import platform
+    import subprocess
+    import numpy
+    import sklearn
+    
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def _benchmark_load_saved_data(texts: List[str], labels: List[str], result_files: int) -> Dict[str, Any]:
+    """Time report.load_saved_data over texts spread across result CSV files."""
+    import csv
+    import tempfile
+    import results_store
+    from report import load_saved_data
+    
+    with tempfile.TemporaryDirectory() as directory:
+        per_file = -(-len(texts) // result_files)
+        for i in range(result_files):
+            with open(os.path.join(directory, f"classification_results_{i:05d}.csv"), "w",
+                      newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["Text", "Category"])
+                writer.writerows(zip(texts[i * per_file:(i + 1) * per_file], labels[i * per_file:(i + 1) * per_file]))
+        
+        # Point the store and CSV import at the temporary directory
+        saved = results_store.RESULTS_DB_PATH, results_store.LEGACY_CSV_PATTERN
+        results_store.RESULTS_DB_PATH = os.path.join(directory, "results.sqlite3")
+        results_store.LEGACY_CSV_PATTERN = os.path.join(directory, "classification_results_*.csv")
+        try:
+            start = time.perf_counter()
+            rows = len(load_saved_data())
+            first_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            load_saved_data()
+            repeat_seconds = time.perf_counter() - start
+        finally:
+            results_store.RESULTS_DB_PATH, results_store.LEGACY_CSV_PATTERN = saved
+    
+    return {
+        "files": result_files,
+        "rows": rows,
+        "first_load_seconds": round(first_seconds, 3),
+        "repeat_load_seconds": round(repeat_seconds, 3),
+    }
+
+
+def benchmark_suite(sizes=SUITE_SIZES, latency_samples: int = 10000, max_train_texts: int = 100000,
+                    result_files: int = 100) -> Dict[str, Any]:
+    """
+    Measure the classification and reporting hot paths on synthetic corpora.
+    
+    For each corpus size this times preprocess_text per call, classify_text
+    per call (on up to latency_samples texts, with a cold prediction cache),
+    data_utils.batch_classify throughput, train_classifier fit time,
+    save_model/load_model time and size, and report.load_saved_data over the
+    corpus spread across result_files CSV files. Cold start figures from
+    benchmark_startup are included under "startup".
+    
+    Args:
+        sizes: Corpus sizes to run
+        latency_samples: Most classify_text calls timed per size
+        max_train_texts: Largest corpus to train on; TF-IDF over 1-3 word
+            n-grams of a million texts needs several GB of memory
+        result_files: Number of result CSV files for load_saved_data
+        
+    Returns:
+        Dictionary with the environment, the startup figures and one result per size
+    """
+    from data_utils import batch_classify
+    from ml_logic import (classify_text, clear_prediction_cache, get_model, load_model,
+                          preprocess_text, save_model, train_classifier)
+    
+    get_model()
+    startup = benchmark_startup()
+    results = []
+    for size in sizes:
+        texts, labels = labelled_synthetic_corpus(size, seed=size)
+        result = {"texts": size}
+        
+        result["preprocess_text"] = _latency(preprocess_text, texts)
+        
+        clear_prediction_cache()
+        result["classify_text"] = _latency(classify_text, texts[:latency_samples])
+        
+        clear_prediction_cache()
+        start = time.perf_counter()
+        for offset in range(0, size, 100000):
+            batch_classify(texts[offset:offset + 100000])
+        elapsed = time.perf_counter() - start
+        result["batch_classify"] = {"seconds": round(elapsed, 3), "texts_per_second": round(size / elapsed, 1)}
+        
+        if size <= max_train_texts:
+            start = time.perf_counter()
+            model = train_classifier(texts, labels)
+            result["train_classifier"] = {"seconds": round(time.perf_counter() - start, 3)}
+            
+            filename = "benchmark_suite_model.joblib"
+            start = time.perf_counter()
+            path = save_model(model, filename)
+            save_seconds = time.perf_counter() - start
+            try:
+                start = time.perf_counter()
+                load_model(filename)
+                load_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                load_model(filename, mmap_mode="r")
+                mmap_seconds = time.perf_counter() - start
+                result["model_persistence"] = {
+                    "save_seconds": round(save_seconds, 4),
+                    "load_seconds": round(load_seconds, 4),
+                    "load_mmap_seconds": round(mmap_seconds, 4),
+                    "size_mb": round(os.path.getsize(path) / 2 ** 20, 2),
+                }
+            finally:
+                os.remove(path)
+            del model
+        else:
+            result["train_classifier"] = result["model_persistence"] = {"skipped": f"more than {max_train_texts} texts"}
+        
+        result["load_saved_data"] = _benchmark_load_saved_data(texts, labels, min(result_files, size))
+        results.append(result)
+    
+    return {
+        "benchmark": "suite",
+        "environment": _environment(),
+        "startup": startup,
+        "results": results,
+    }
+
+
+# Modules whose cold import time is tracked by benchmark_startup
+STARTUP_MODULES = ("ml_logic", "data_utils", "agents", "classify_cli", "server", "report", "app")
+
+# Run in a fresh interpreter: import the classifier and classify one batch
+_FIRST_CLASSIFICATION = """
+import json, sys, time
+start = time.perf_counter()
+import ml_logic
+imported = time.perf_counter()
+ml_logic.classify_batch(["I love this product", "When will my order arrive?", "The box is blue"])
+done = time.perf_counter()
+print(json.dumps({"import_seconds": imported - start, "seconds": done - start,
+                  "model": type(ml_logic.get_classification_model()).__name__,
+                  "sklearn_imported": "sklearn" in sys.modules}))
+"""
+
+
+def _import_time(module: str) -> Dict[str, Any]:
+    """Import module in a fresh interpreter under -X importtime and return its cost."""
+    import subprocess
+    import sys
+    
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    process_seconds = time.perf_counter() - start
+    if completed.returncode:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    # Lines read "import time: self [us] | cumulative | name", nested imports indented
+    cumulative = None
+    for line in completed.stderr.splitlines():
+        fields = line.split("|")
+        if line.startswith("import time:") and len(fields) == 3 and fields[2].rstrip() == f" {module}":
+            cumulative = int(fields[1])
+    return {
+        "import_ms": round(cumulative / 1000, 1) if cumulative is not None else None,
+        "process_seconds": round(process_seconds, 3),
+    }
+
+
+def benchmark_startup(modules=STARTUP_MODULES, runs: int = 3) -> Dict[str, Any]:
+    """
+    Measure cold start: module import times and the first classification.
+    
+    Each measurement runs in a fresh interpreter and the fastest of runs is
+    kept, so the figures are not skewed by a cold disk cache. Import times
+    are the cumulative microseconds python -X importtime reports for the
+    module; the first classification is timed from before "import ml_logic"
+    to the end of a three-text classify_batch call, and reports whether
+    sklearn had to be imported.
+    
+    Args:
+        modules: Modules to import
+        runs: Runs per measurement
+        
+    Returns:
+        Dictionary with one entry per module and the first classification
+    """
+    import subprocess
+    import sys
+    from ml_logic import get_model
+    
+    # Make sure the model and its compact artifact exist before timing
+    get_model()
+    
+    imports = {}
+    for module in modules:
+        samples = [_import_time(module) for _ in range(runs)]
+        timed = [sample for sample in samples if sample.get("import_ms") is not None]
+        imports[module] = min(timed, key=lambda sample: sample["import_ms"]) if timed else samples[0]
+    
+    first = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-c", _FIRST_CLASSIFICATION], capture_output=True,
+                                   text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        sample = json.loads(completed.stdout.strip().splitlines()[-1])
+        sample["process_seconds"] = time.perf_counter() - start
+        first.append(sample)
+    best = min(first, key=lambda sample: sample["seconds"])
+    
+    return {
+        "imports": imports,
+        "first_classification": {
+            "import_seconds": round(best["import_seconds"], 3),
+            "seconds": round(best["seconds"], 3),
+            "process_seconds": round(best["process_seconds"], 3),
+            "model": best["model"],
+            "sklearn_imported": best["sklearn_imported"],
+        },
+    }
+
+
+def _flatten(report, prefix=""):
+    """Flatten nested numeric values into {"path.to.value": number}."""
+    values = {}
+    if isinstance(report, dict):
+        for key, value in report.items():
+            values.update(_flatten(value, f"{prefix}{key}."))
+    elif isinstance(report, list):
+        for i, value in enumerate(report):
+            # Result lists are labelled by their size when they have one
+            label = value.get("texts", i) if isinstance(value, dict) else i
+            values.update(_flatten(value, f"{prefix}{label}."))
+    elif isinstance(report, (int, float)) and not isinstance(report, bool):
+        values[prefix[:-1]] = report
+    return values
+
+
+def _report_metrics(report: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten the results and startup figures of a suite or startup report."""
+    values = _flatten(report.get("results", [] if "startup" in report else report))
+    values.update(_flatten(report.get("startup", {}), "startup."))
+    return values
+
+
+def compare_reports(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compare two benchmark reports metric by metric.
+    
+    Args:
+        baseline: Report from the reference commit
+        candidate: Report from the commit under test
+        
+    Returns:
+        One entry per metric present in both, with the relative change
+    """
+    before = _report_metrics(baseline)
+    after = _report_metrics(candidate)
+    return [
+        {
+            "metric": metric,
+            "baseline": before[metric],
+            "candidate": after[metric],
+            "change": round(after[metric] / before[metric] - 1, 4) if before[metric] else None,
+        }
+        for metric in before if metric in after
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run Groq Classifier benchmarks")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write cProfile and tracemalloc reports of training, batch classification "
+                             "and report loading to data/profiles/ (slows the measured code)")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    
+    parallel = subparsers.add_parser("parallel", help="Batch classification scaling across worker processes")
+    parallel.add_argument("--texts", type=int, default=100000, help="Number of synthetic texts")
+    parallel.add_argument("--max-workers", type=int, default=None, help="Largest worker count to try")
+    parallel.add_argument("--chunk-size", type=int, default=None, help="Texts per worker shard")
+    
+    vectorizers = subparsers.add_parser("vectorizers", help="TF-IDF versus hashing vectorizer fit time, size and accuracy")
+    vectorizers.add_argument("--texts", type=int, default=100000, help="Number of synthetic labelled texts")
+    vectorizers.add_argument("--n-features", type=int, default=None, help="Hashed feature space size")
+    
+    inference = subparsers.add_parser("inference", help="Single-text latency and batch throughput, sklearn versus the NumPy engine")
+    inference.add_argument("--texts", type=int, default=2000, help="Number of synthetic texts")
+    inference.add_argument("--batch-size", type=int, default=1000, help="Texts per call in the batch measurement")
+    
+    worker_memory = subparsers.add_parser("worker-memory", help="Per-worker memory of a loaded model, with and without mmap")
+    worker_memory.add_argument("--workers", type=int, default=4, help="Number of concurrent worker processes")
+    worker_memory.add_argument("--texts", type=int, default=100000, help="Number of synthetic labelled texts to train on")
+    worker_memory.add_argument("--n-features", type=int, default=2 ** 20, help="Hashed feature space size")
+    
+    suite = subparsers.add_parser("suite", help="Hot paths on synthetic corpora of several sizes, as JSON")
+    suite.add_argument("--sizes", type=int, nargs="+", default=list(SUITE_SIZES), help="Corpus sizes")
+    suite.add_argument("--latency-samples", type=int, default=10000, help="Most classify_text calls timed per size")
+    suite.add_argument("--max-train-texts", type=int, default=100000, help="Largest corpus to train on")
+    suite.add_argument("--result-files", type=int, default=100, help="Result CSV files for load_saved_data")
+    suite.add_argument("--output", help="Also write the report to this JSON file")
+    
+    startup = subparsers.add_parser("startup", help="Cold import time of each module and of the first classification")
+    startup.add_argument("--runs", type=int, default=3, help="Fresh interpreters per measurement; the fastest is kept")
+    startup.add_argument("--output", help="Also write the report to this JSON file")
+    
+    compare = subparsers.add_parser("compare", help="Relative change of every metric between two suite reports")
+    compare.add_argument("baseline", help="Report from the reference commit")
+    compare.add_argument("candidate", help="Report from the commit under test")
+    
+    args = parser.parse_args()
+    if args.profile:
+        from profiling import enable
+        enable()
+    
+    if args.benchmark == "parallel":
+        report = benchmark_parallel_scaling(args.texts, args.max_workers, args.chunk_size)
+    elif args.benchmark == "vectorizers":
+        report = benchmark_vectorizers(args.texts, args.n_features)
+    elif args.benchmark == "inference":
+        report = benchmark_inference(args.texts, args.batch_size)
+    elif args.benchmark == "worker-memory":
+        report = benchmark_worker_memory(args.workers, args.texts, args.n_features)
+    elif args.benchmark == "suite":
+        report = benchmark_suite(args.sizes, args.latency_samples, args.max_train_texts, args.result_files)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    elif args.benchmark == "startup":
+        report = {"benchmark": "startup", "environment": _environment(), "startup": benchmark_startup(runs=args.runs)}
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    elif args.benchmark == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.candidate, encoding="utf-8") as f:
+            candidate = json.load(f)
+        report = compare_reports(baseline, candidate)
+    
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Command-line Batch Classifier for Groq Classifier
+
+Classifies CSV, JSONL or plain text files (or stdin) with the persisted
+model, chunk by chunk, and writes each record with its category, confidence
+and override rule to a CSV or JSONL file (or stdout). Progress and the final
+throughput are reported on stderr, so stdout can be piped.
+
+Usage:
+    python classify_cli.py reviews.csv --text-column review --output classified.csv
+    python classify_cli.py day1.jsonl day2.jsonl --output classified.jsonl --workers 4
+    cat texts.txt | python classify_cli.py - > classified.jsonl
+"""
+
+import argparse
+import json
+import sys
+
+from data_utils import DEFAULT_CHUNK_SIZE, classify_stream
+from profiling import PROFILE_DIR, enable as enable_profiling
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Classify CSV, JSONL or plain text files with the persisted model")
+    parser.add_argument("inputs", nargs="+", help="Input files (.csv, .jsonl, .txt); '-' reads stdin")
+    parser.add_argument("--text-column", default="text", help="Column (CSV) or key (JSONL) holding the text")
+    parser.add_argument("--output", "-o", default="-", help="Output file (.csv or .jsonl); '-' writes stdout")
+    parser.add_argument("--input-format", choices=["csv", "jsonl", "text"],
+                        help="Format of every input; defaults to the extension, and to one text per line for stdin")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"],
+                        help="Output format; defaults to the extension, and to JSONL for stdout")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Records classified at a time")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--cache", action="store_true", help="Use the prediction cache (for inputs with repeated texts)")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final summary")
+    parser.add_argument("--profile", action="store_true", help=f"Write cProfile and tracemalloc reports to {PROFILE_DIR}/")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+    
+    def report_progress(rows, seconds):
+        print(f"\r{rows:,} texts classified, {rows / seconds:,.0f} texts/s", end="", file=sys.stderr, flush=True)
+    
+    try:
+        summary = classify_stream(
+            args.inputs, args.output, args.text_column, args.chunk_size, args.workers,
+            args.input_format, args.output_format, args.cache, progress_callback=None if args.quiet else report_progress
+        )
+    except (OSError, ValueError) as e:
+        parser.exit(1, f"\nError: {e}\n")
+    
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,28 +8,51 @@ import csv
 import os
 import json
 import datetime
-from typing import List, Dict, Any, Tuple
+import io
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import List, Dict, Any, Tuple, Callable, Optional, Union, BinaryIO, Iterator
+
+from profiling import profiled
+
+# Number of CSV rows read, classified and written at a time when streaming
+DEFAULT_CHUNK_SIZE = 10000
+
+# Number of texts sent to a worker process at a time in parallel mode
+DEFAULT_PARALLEL_CHUNK_SIZE = 2000
+
+# File formats read and written by classify_stream, by file extension
+STREAM_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.txt': 'text'}
+
+# Fields classify_stream adds to every output record
+RESULT_FIELDS = ('category', 'confidence', 'rule')
 
 def save_classification_results(texts: List[str], categories: List[str], filename: str = None) -> str:
     """
-    Save classification results to a CSV file.
+    Save classification results to the results store, or to a CSV file.
+    
+    Without a filename the results are appended to the SQLite results store
+    (see results_store.py), which the report dashboard reads. With a filename
+    they are written to that CSV file in the data directory instead.
     
     Args:
         texts: List of texts that were classified
         categories: List of categories assigned to each text
-        filename: Optional filename to save results to, defaults to timestamp
+        filename: Optional CSV filename to export the results to
         
     Returns:
-        The path to the saved file
+        The path to the results store or the saved file
     """
+    if not filename:
+        from results_store import append_results, RESULTS_DB_PATH
+        append_results(texts, categories)
+        return RESULTS_DB_PATH
+    
     # Create data directory if it doesn't exist
     os.makedirs("data", exist_ok=True)
     
-    # Generate filename with timestamp if not provided
-    if not filename:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"classification_results_{timestamp}.csv"
-    
     filepath = os.path.join("data", filename)
     
     # Write results to CSV
@@ -43,6 +66,95 @@ def save_classification_results(texts: List[str], categories: List[str], filenam
     return filepath
 
 
+@profiled("classify_csv_stream")
+def classify_csv_stream(source: Union[str, BinaryIO], text_column: str = 'text',
+                        filename: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        progress_callback: Optional[Callable[[int, int], None]] = None,
+                        use_cache: bool = False) -> Dict[str, Any]:
+    """
+    Classify a CSV file chunk by chunk, appending the results to a CSV file.
+    
+    Only one chunk of input rows and its results are held in memory at a
+    time, so memory use is bounded by the chunk size rather than the file size.
+    Rows with an empty text are skipped. Each chunk is also appended to the
+    results store, under the output file's name as its source; the file
+    itself only appears once it is complete.
+    
+    Args:
+        source: Path to the input CSV, or a binary file object
+        text_column: Name of the column containing the texts
+        filename: Optional filename to save results to, defaults to timestamp
+        chunk_size: Number of rows to classify per batch
+        progress_callback: Optional function called after each chunk with
+            (rows classified so far, bytes of input consumed so far)
+        use_cache: Use the prediction cache; off by default, since its
+            entries would keep up to PREDICTION_CACHE_SIZE texts alive
+        
+    Returns:
+        Dictionary with the output 'path', the number of 'rows' classified
+        and the 'category_counts'
+    """
+    import pandas as pd
+    from ml_logic import classify_batch
+    from results_store import connect, append_results, mark_ingested
+    
+    # Create data directory if it doesn't exist
+    os.makedirs("data", exist_ok=True)
+    
+    # Generate filename with timestamp if not provided
+    if not filename:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"classification_results_{timestamp}.csv"
+    
+    filepath = os.path.join("data", filename)
+    
+    # Keep our own handle on paths so progress can be reported in bytes
+    handle = open(source, 'rb') if isinstance(source, str) else source
+    
+    rows = 0
+    category_counts = Counter()
+    store = connect()
+    timestamp = datetime.datetime.now()
+    # The CSV is written under a temporary name and renamed when complete, so
+    # the dashboard never ingests rows this stream is still appending to the store
+    fd, tmp_path = tempfile.mkstemp(dir="data", suffix='.tmp')
+    try:
+        with open(fd, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['Text', 'Category'])
+            
+            reader = pd.read_csv(handle, usecols=[text_column], dtype={text_column: str},
+                                 chunksize=chunk_size)
+            for chunk in reader:
+                texts = chunk[text_column].dropna().tolist()
+                categories = classify_batch(texts, use_cache)
+                
+                writer.writerows(zip(texts, categories))
+                csvfile.flush()
+                append_results(texts, categories, source=filename, timestamp=timestamp, conn=store)
+                
+                rows += len(texts)
+                category_counts.update(categories)
+                if progress_callback:
+                    progress_callback(rows, handle.tell())
+        
+        os.replace(tmp_path, filepath)
+        # The rows are already stored, so the finished CSV must not be ingested again
+        mark_ingested(store, filepath, rows)
+    finally:
+        store.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if handle is not source:
+            handle.close()
+    
+    return {
+        "path": filepath,
+        "rows": rows,
+        "category_counts": dict(category_counts)
+    }
+
+
 def export_classifier_examples() -> str:
     """
     Export the examples used for training the classifier to a JSON file.
@@ -50,30 +162,18 @@ def export_classifier_examples() -> str:
     Returns:
         The path to the saved file
     """
-    from ml_logic import classify_text
-    import inspect
+    from ml_logic import load_training_corpus
     
     # Create data directory if it doesn't exist
     os.makedirs("data", exist_ok=True)
     
-    # Get the source code of the classify_text function
-    source = inspect.getsource(classify_text)
-    
-    # Extract examples and categories - this is a simple extraction method
-    # A more robust method would be to use the AST module
-    examples_start = source.find("examples = [")
-    examples_end = source.find("]", examples_start)
-    categories_start = source.find("categories = [")
-    categories_end = source.find("]", categories_start)
-    
-    # Extract the example lists as strings
-    examples_str = source[examples_start:examples_end+1]
-    categories_str = source[categories_start:categories_end+1]
+    corpus = load_training_corpus()
     
     # Create a dictionary with the data
     data = {
-        "examples": examples_str,
-        "categories": categories_str,
+        "examples": corpus.examples,
+        "categories": corpus.categories,
+        "corpus_fingerprint": corpus.fingerprint,
         "exported_at": datetime.datetime.now().isoformat()
     }
     
@@ -87,54 +187,332 @@ def export_classifier_examples() -> str:
     return filepath
 
 
-def batch_classify(texts: List[str]) -> List[Tuple[str, str, str]]:
+def _init_classifier_worker() -> None:
+    """Load the persisted model once when a worker process starts."""
+    from ml_logic import get_classification_model
+    get_classification_model()
+
+
+def _classify_shard(texts: List[str], use_cache: bool = False) -> List[Any]:
+    """Classify one shard of texts inside a worker process."""
+    from ml_logic import classify_batch_results
+    return classify_batch_results(texts, use_cache)
+
+
+@profiled("classify_parallel_results")
+def classify_parallel_results(texts: List[str], workers: Optional[int] = None,
+                              chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE,
+                              use_cache: bool = False) -> List[Any]:
     """
-    Classify a batch of texts and return results with descriptions.
+    Classify texts by sharding them across a pool of worker processes.
+    
+    Each worker loads the persisted model once and classifies whole shards
+    with classify_batch_results. Results are merged back in input order.
+    Small inputs and a single worker are classified in the current process.
     
     Args:
         texts: List of texts to classify
+        workers: Number of worker processes, defaults to the number of CPUs
+        chunk_size: Number of texts sent to a worker at a time
+        use_cache: Use the prediction cache; off by default, since bulk
+            inputs rarely repeat and every entry keeps its text alive
         
     Returns:
-        List of tuples (text, category, description)
+        List with the ClassificationResult of each text
     """
-    from ml_logic import classify_text, get_category_description
+    from concurrent.futures import ProcessPoolExecutor
+    from ml_logic import classify_batch_results, get_classification_model
     
-    results = []
+    workers = workers or os.cpu_count() or 1
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if workers <= 1 or len(texts) <= chunk_size:
+        return classify_batch_results(texts, use_cache)
     
-    for text in texts:
-        category = classify_text(text)
-        description = get_category_description(category)
-        results.append((text, category, description))
+    # Make sure the model is trained and saved so workers only have to load it
+    get_classification_model()
+    
+    shards = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    workers = min(workers, len(shards))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_classifier_worker) as executor:
+        results = []
+        for shard_results in executor.map(_classify_shard, shards, [use_cache] * len(shards)):
+            results.extend(shard_results)
     
     return results
 
 
-def export_classification_stats() -> Dict[str, Any]:
+def classify_parallel(texts: List[str], workers: Optional[int] = None,
+                      chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE, use_cache: bool = False) -> List[str]:
     """
-    Generate statistics about the classifier training data.
+    Classify texts across a pool of worker processes (see classify_parallel_results).
     
+    Args:
+        texts: List of texts to classify
+        workers: Number of worker processes, defaults to the number of CPUs
+        chunk_size: Number of texts sent to a worker at a time
+        use_cache: Use the prediction cache
+        
     Returns:
-        Dictionary with statistics
+        List with the category of each text
+    """
+    return [result.category for result in classify_parallel_results(texts, workers, chunk_size, use_cache)]
+
+
+@profiled("batch_classify")
+def batch_classify(texts: List[str], workers: int = 1, chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE,
+                   use_cache: bool = False) -> List[Tuple[str, str, str, Any]]:
     """
-    from ml_logic import classify_text
-    import inspect
+    Classify a batch of texts and return results with descriptions.
     
-    # Get the source code of the classify_text function
-    source = inspect.getsource(classify_text)
+    Args:
+        texts: List of texts to classify
+        workers: Number of worker processes; more than one enables parallel mode
+        chunk_size: Number of texts per worker shard in parallel mode
+        use_cache: Use the prediction cache
+        
+    Returns:
+        List of tuples (text, category, description, result), where result
+        is the ClassificationResult with the margins and the rule that fired
+    """
+    from ml_logic import get_category_description
     
-    # Extract examples and categories - this is a simple extraction method
-    examples_start = source.find("examples = [")
-    examples_end = source.find("]", examples_start)
-    categories_start = source.find("categories = [")
-    categories_end = source.find("]", categories_start)
+    # Classify the whole batch with one decision pass per shard
+    results = classify_parallel_results(texts, workers=workers, chunk_size=chunk_size, use_cache=use_cache)
     
-    # Extract the example lists as strings and convert to actual lists
-    examples_str = source[examples_start+11:examples_end].strip()
-    categories_str = source[categories_start+13:categories_end].strip()
+    return [(text, result.category, get_category_description(result.category), result)
+            for text, result in zip(texts, results)]
+
+
+def stream_format(path: str, default: str = 'text') -> str:
+    """
+    Return the stream format of a path from its extension.
+    
+    Args:
+        path: File path, or '-' for stdin/stdout
+        default: Format of '-'
+        
+    Returns:
+        'csv', 'jsonl' or 'text'
+    """
+    if path == '-':
+        return default
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in STREAM_FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}; use one of {', '.join(STREAM_FORMATS)} or pass a format")
+    return STREAM_FORMATS[extension]
+
+
+def iter_record_chunks(path: str, input_format: str, text_column: str = 'text',
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read records from a CSV, JSONL or plain text file (one text per line) in chunks.
+    
+    Args:
+        path: Input file, or '-' for stdin
+        input_format: 'csv', 'jsonl' or 'text'
+        text_column: Column (CSV) or key (JSONL) holding the text; plain
+            text lines become {text_column: line}
+        chunk_size: Number of records per chunk
+        
+    Yields:
+        Lists of up to chunk_size records, as dictionaries
+    """
+    if input_format not in ('csv', 'jsonl', 'text'):
+        raise ValueError(f"Unknown input format: {input_format}")
+    
+    handle = (io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='') if path == '-'
+              else open(path, 'r', encoding='utf-8', newline=''))
+    try:
+        if input_format == 'csv':
+            records = csv.DictReader(handle)
+            if records.fieldnames is None or text_column not in records.fieldnames:
+                raise ValueError(f"Column '{text_column}' not found in {path}")
+        elif input_format == 'jsonl':
+            records = _jsonl_records(handle, path)
+        else:
+            records = ({text_column: line.rstrip('\r\n')} for line in handle)
+        
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        if path == '-':
+            handle.detach()
+        else:
+            handle.close()
+
+
+def _jsonl_records(handle, path: str) -> Iterator[Any]:
+    for number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON on line {number} of {path}: {e}") from e
+
+
+class _RecordWriter:
+    """Writes classified records as CSV (columns fixed by the first record) or JSONL."""
+    
+    def __init__(self, handle, output_format: str):
+        if output_format not in ('csv', 'jsonl'):
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.handle = handle
+        self.output_format = output_format
+        self._csv = None
+    
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        if self.output_format == 'jsonl':
+            self.handle.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+            return
+        if self._csv is None and records:
+            fields = [field for field in records[0] if field not in RESULT_FIELDS] + list(RESULT_FIELDS)
+            self._csv = csv.DictWriter(self.handle, fields, restval='', extrasaction='ignore')
+            self._csv.writeheader()
+        self._csv.writerows(records)
+
+
+@profiled("classify_stream")
+def classify_stream(inputs: List[str], output: str = '-', text_column: str = 'text',
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1,
+                    input_format: Optional[str] = None, output_format: Optional[str] = None,
+                    use_cache: bool = False, progress_callback: Optional[Callable[[int, float], None]] = None) -> Dict[str, Any]:
+    """
+    Classify CSV, JSONL or plain text files chunk by chunk with the persisted model.
+    
+    Each output record is the input record plus its category, confidence
+    and the override rule that decided it, in input order. Records without
+    a text are skipped. An output file only appears once it is complete.
+    Memory use is bounded by the chunk size. With several workers, every
+    chunk is split between a pool of processes that load the model once,
+    and the next chunk is read while they classify.
+    
+    Args:
+        inputs: Input files; '-' reads stdin
+        output: Output file; '-' writes stdout
+        text_column: Column (CSV) or key (JSONL) holding the text
+        chunk_size: Number of records read and classified at a time
+        workers: Number of worker processes
+        input_format: 'csv', 'jsonl' or 'text'; defaults to each input's
+            extension, and to 'text' (one text per line) for stdin
+        output_format: 'csv' or 'jsonl'; defaults to the output's extension,
+            and to 'jsonl' for stdout
+        use_cache: Use the prediction cache; it only pays off when texts
+            repeat, and costs a quarter of the throughput when they do not
+        progress_callback: Optional function called after each chunk with
+            (records classified so far, seconds elapsed)
+            
+    Returns:
+        Dictionary with the number of 'rows' classified and 'skipped', the
+        'seconds' taken, 'texts_per_second', 'category_counts' and the
+        'model_version' used
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from ml_logic import classify_batch_results, get_classification_model
+    
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    formats = [input_format or stream_format(path) for path in inputs]
+    output_format = output_format or stream_format(output, default='jsonl')
+    model = get_classification_model()
+    
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_classifier_worker) if workers > 1 else None
+    
+    def submit(texts):
+        if executor is None:
+            return classify_batch_results(texts, use_cache)
+        shard_size = -(-len(texts) // workers)
+        return [executor.submit(_classify_shard, texts[i:i + shard_size], use_cache)
+                for i in range(0, len(texts), shard_size)]
+    
+    def collect(pending):
+        if executor is None:
+            return pending
+        return [result for future in pending for result in future.result()]
+    
+    rows = 0
+    skipped = 0
+    category_counts = Counter()
+    start = time.perf_counter()
+    # Files are written next to their destination and renamed when complete,
+    # so downstream jobs never read a partial output
+    if output == '-':
+        handle = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='')
+    else:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)), suffix='.tmp')
+        handle = open(fd, 'w', encoding='utf-8', newline='')
+    writer = _RecordWriter(handle, output_format)
+    
+    def finish(records, pending):
+        nonlocal rows
+        for record, result in zip(records, collect(pending)):
+            record['category'] = result.category
+            record['confidence'] = round(result.confidence, 4)
+            record['rule'] = result.rule
+            category_counts[result.category] += 1
+        writer.write(records)
+        handle.flush()
+        rows += len(records)
+        if progress_callback:
+            progress_callback(rows, time.perf_counter() - start)
+    
+    try:
+        # One chunk is classified while the next is read
+        in_flight = None
+        for path, path_format in zip(inputs, formats):
+            for chunk in iter_record_chunks(path, path_format, text_column, chunk_size):
+                records = [record for record in chunk if isinstance(record, dict)
+                           and isinstance(record.get(text_column), str) and record[text_column].strip()]
+                skipped += len(chunk) - len(records)
+                if not records:
+                    continue
+                pending = submit([record[text_column] for record in records])
+                if in_flight is not None:
+                    finish(*in_flight)
+                in_flight = (records, pending)
+        if in_flight is not None:
+            finish(*in_flight)
+        if output != '-':
+            handle.close()
+            os.replace(tmp_path, output)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if output == '-':
+            handle.detach()
+        elif not handle.closed:
+            handle.close()
+            os.remove(tmp_path)
+    
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "skipped": skipped,
+        "seconds": round(seconds, 3),
+        "texts_per_second": round(rows / seconds, 1) if seconds else 0.0,
+        "category_counts": dict(category_counts),
+        "model_version": getattr(model, 'corpus_fingerprint_', None),
+    }
+
+
+def export_classification_stats() -> Dict[str, Any]:
+    """
+    Generate statistics about the classifier training data.
+    
+    Returns:
+        Dictionary with statistics
+    """
+    from ml_logic import load_training_corpus
     
-    # Split by commas followed by newlines to get items
-    examples = [item.strip().strip('"\'').strip() for item in examples_str.split('",\n')]
-    categories = [item.strip().strip('"\'').strip() for item in categories_str.split('",\n')]
+    corpus = load_training_corpus()
+    examples, categories = corpus.examples, corpus.categories
     
     # Calculate stats
     category_counts = {}
@@ -148,7 +526,8 @@ def export_classification_stats() -> Dict[str, Any]:
         "total_examples": len(examples),
         "category_distribution": category_counts,
         "average_example_length": sum(len(ex) for ex in examples) / len(examples) if examples else 0,
-        "categories": list(set(categories))
+        "categories": list(set(categories)),
+        "corpus_fingerprint": corpus.fingerprint
     }
     
     return stats
@@ -168,8 +547,8 @@ if __name__ == "__main__":
     
     results = batch_classify(sample_texts)
     print("\nBatch Classification Results:")
-    for text, category, description in results:
-        print(f"Text: '{text[:30]}...' → Category: {category} ({description})")
+    for text, category, description, result in results:
+        print(f"Text: '{text[:30]}...' → Category: {category} ({description}, confidence {result.confidence:.2f})")
     
     # Save results to CSV
     filepath = save_classification_results([r[0] for r in results], [r[1] for r in results])
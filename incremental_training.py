@@ -0,0 +1,226 @@
+"""
+Out-of-core Training for Groq Classifier
+
+Trains a linear classifier on JSONL corpora too large to hold in memory.
+The corpus is streamed in chunks, hashed into a fixed feature space and fed
+to SGDClassifier.partial_fit (hinge loss, a linear SVM like the main model).
+
+Progress is checkpointed, including the byte offset reached in every file,
+so an interrupted run resumes where it stopped, and new labelled data
+appended to a file (or added as a new file) is folded in without retraining.
+
+Usage:
+    python incremental_training.py data/labelled/*.jsonl --chunk-size 10000
+    python incremental_training.py data/labelled/*.jsonl --profile
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from typing import List, Dict, Any, Iterator, Tuple, Optional, Callable
+
+import joblib
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from ml_logic import HASHING_FEATURES, load_training_corpus
+from profiling import PROFILE_DIR, enable as enable_profiling, profiled
+
+DEFAULT_CHECKPOINT_PATH = os.path.join("models", "incremental_checkpoint.joblib")
+
+# Number of labelled records read and fitted at a time
+DEFAULT_TRAINING_CHUNK_SIZE = 10000
+
+
+def build_hashing_vectorizer(n_features: int = HASHING_FEATURES) -> HashingVectorizer:
+    """
+    Build the stateless vectorizer used for incremental training.
+    
+    There is no IDF step: document frequencies change as data streams in,
+    and re-weighting features would invalidate the weights already learned.
+    
+    Args:
+        n_features: Size of the hashed feature space
+        
+    Returns:
+        HashingVectorizer over 1-3 word n-grams with L2-normalized counts
+    """
+    return HashingVectorizer(ngram_range=(1, 3), n_features=n_features, alternate_sign=False, norm='l2')
+
+
+def iter_labelled_chunks(path: str, chunk_size: int = DEFAULT_TRAINING_CHUNK_SIZE,
+                         offset: int = 0) -> Iterator[Tuple[List[str], List[str], int]]:
+    """
+    Stream {"text": ..., "category": ...} records from a JSONL file in chunks.
+    
+    Args:
+        path: Path to the JSONL file
+        chunk_size: Number of records per chunk
+        offset: Byte offset to start reading from
+        
+    Yields:
+        (texts, categories, offset) with the byte offset just past the chunk
+    """
+    texts = []
+    categories = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            # A line without its newline may still be being written; stop before it
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                texts.append(record['text'])
+                categories.append(record['category'])
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"Invalid training record in {path} before byte {offset}: {e}") from e
+            
+            if len(texts) >= chunk_size:
+                yield texts, categories, offset
+                texts = []
+                categories = []
+    
+    if texts:
+        yield texts, categories, offset
+
+
+def load_checkpoint(path: str = DEFAULT_CHECKPOINT_PATH) -> Optional[Dict[str, Any]]:
+    """
+    Load a training checkpoint.
+    
+    Args:
+        path: Path to the checkpoint file
+        
+    Returns:
+        The checkpoint dictionary, or None if there is no checkpoint yet
+    """
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path)
+
+
+def save_checkpoint(checkpoint: Dict[str, Any], path: str = DEFAULT_CHECKPOINT_PATH) -> None:
+    """Write a checkpoint atomically, so a crash never leaves a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        joblib.dump(checkpoint, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def checkpoint_pipeline(checkpoint: Dict[str, Any]) -> Pipeline:
+    """
+    Build a prediction pipeline from a checkpoint.
+    
+    The pipeline has the same 'vectorizer' and 'classifier' steps as the
+    main model, so it can be used wherever a model from ml_logic is expected.
+    
+    Args:
+        checkpoint: A checkpoint from train_incremental or load_checkpoint
+        
+    Returns:
+        Pipeline: Hashing vectorizer followed by the trained SGDClassifier
+    """
+    return Pipeline([
+        ('vectorizer', build_hashing_vectorizer(checkpoint['n_features'])),
+        ('classifier', checkpoint['classifier'])
+    ])
+
+
+@profiled("train_incremental")
+def train_incremental(paths: List[str], checkpoint_path: str = DEFAULT_CHECKPOINT_PATH,
+                      chunk_size: int = DEFAULT_TRAINING_CHUNK_SIZE, classes: Optional[List[str]] = None,
+                      n_features: int = HASHING_FEATURES, checkpoint_every: int = 10,
+                      progress_callback: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+    """
+    Train, or continue training, a linear classifier on JSONL files in chunks.
+    
+    Each file is read from the byte offset stored in the checkpoint, so only
+    records not yet seen are fitted. Memory use is bounded by the chunk size.
+    
+    Args:
+        paths: JSONL files of {"text": ..., "category": ...} records
+        checkpoint_path: Checkpoint to resume from and write to
+        chunk_size: Number of records per partial_fit call
+        classes: Every category the model can predict; defaults to the
+            categories of the training corpus. Fixed once training starts.
+        n_features: Size of the hashed feature space for a new model
+        checkpoint_every: Write the checkpoint after this many chunks
+        progress_callback: Optional function called after each chunk with
+            the total number of examples fitted so far
+            
+    Returns:
+        The final checkpoint dictionary
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is None:
+        classes = sorted(classes or set(load_training_corpus().categories))
+        checkpoint = {
+            'classifier': SGDClassifier(loss='hinge', random_state=0),
+            'classes': classes,
+            'n_features': n_features,
+            'offsets': {},
+            'examples_seen': 0,
+        }
+    
+    vectorizer = build_hashing_vectorizer(checkpoint['n_features'])
+    classifier = checkpoint['classifier']
+    known = set(checkpoint['classes'])
+    
+    chunks = 0
+    for path in paths:
+        key = os.path.abspath(path)
+        for texts, categories, offset in iter_labelled_chunks(path, chunk_size, checkpoint['offsets'].get(key, 0)):
+            unknown = set(categories) - known
+            if unknown:
+                raise ValueError(f"Categories {sorted(unknown)} in {path} are not among the model's classes "
+                                 f"{checkpoint['classes']}; start a new checkpoint to add them")
+            
+            classifier.partial_fit(vectorizer.transform(texts), categories, classes=checkpoint['classes'])
+            checkpoint['offsets'][key] = offset
+            checkpoint['examples_seen'] += len(texts)
+            
+            chunks += 1
+            if chunks % checkpoint_every == 0:
+                save_checkpoint(checkpoint, checkpoint_path)
+            if progress_callback:
+                progress_callback(checkpoint['examples_seen'])
+    
+    save_checkpoint(checkpoint, checkpoint_path)
+    return checkpoint
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the classifier out of core from JSONL files")
+    parser.add_argument("paths", nargs="+", help="JSONL files of {\"text\", \"category\"} records")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="Checkpoint to resume from and update")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_TRAINING_CHUNK_SIZE, help="Records per partial_fit call")
+    parser.add_argument("--n-features", type=int, default=HASHING_FEATURES, help="Hashed feature space size for a new model")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="Chunks between checkpoints")
+    parser.add_argument("--profile", action="store_true", help=f"Write cProfile and tracemalloc reports to {PROFILE_DIR}/")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+    
+    checkpoint = train_incremental(
+        args.paths, args.checkpoint, args.chunk_size, n_features=args.n_features,
+        checkpoint_every=args.checkpoint_every,
+        progress_callback=lambda seen: print(f"\r{seen} examples fitted", end="", flush=True)
+    )
+    print(f"\nCheckpoint saved to {args.checkpoint} ({checkpoint['examples_seen']} examples in total)")
+
+
+if __name__ == "__main__":
+    main()
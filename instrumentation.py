@@ -0,0 +1,312 @@
+"""
+Instrumentation for Groq Classifier
+
+Per-stage timers, counters and latency histograms for the classifier and the
+LLM agent, exported as Prometheus text or JSON.
+
+Recording is off unless CLASSIFIER_METRICS=on or enable() is called. When it
+is off, stage() returns one shared no-op context manager and increment()
+returns at once, so instrumented code pays a single flag check per call.
+
+Usage:
+    from instrumentation import stage, increment
+    
+    with stage("preprocess"):
+        processed = preprocess_text(text)
+    increment("classified_texts_total", len(texts))
+"""
+
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "groq_classifier_"
+
+# Upper bounds in seconds of the latency histogram buckets, from 10 µs to 10 s
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed bucket bounds, as in Prometheus.
+    
+    Args:
+        buckets: Increasing upper bounds in seconds; an overflow bucket is added
+    """
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by linear interpolation within its bucket.
+        
+        Args:
+            q: Quantile between 0 and 1
+            
+        Returns:
+            The estimate in seconds, or None if nothing was recorded
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                # Values past the last bound are reported at the last bound
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class _Stage:
+    """Context manager recording the time spent in a stage."""
+    
+    __slots__ = ("registry", "name", "start")
+    
+    def __init__(self, registry: "MetricsRegistry", name: str):
+        self.registry = registry
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage:
+    """Shared context manager used while recording is off."""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of stage histograms and counters.
+    
+    Counters are keyed by name and an optional tuple of (label, value) pairs.
+    
+    Args:
+        enabled: Whether to record from the start
+        buckets: Bucket bounds of the stage histograms
+    """
+    
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+    
+    def stage(self, name: str):
+        """Return a context manager timing a stage, or a no-op one when disabled."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+    
+    def observe(self, name: str, seconds: float) -> None:
+        """Record the duration of one pass through a stage."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._stages.get(name)
+            if histogram is None:
+                histogram = self._stages[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+    
+    def increment(self, name: str, amount: float = 1, **labels) -> None:
+        """Add amount to a counter."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+    
+    def reset(self) -> None:
+        """Drop everything recorded so far."""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+    
+    def stage_summary(self) -> List[Dict[str, Any]]:
+        """
+        Summarize every stage recorded so far.
+        
+        Returns:
+            One dictionary per stage with its call count, total and mean time,
+            and p50/p99 estimated from the histogram, in milliseconds
+        """
+        with self._lock:
+            stages = {name: (histogram.count, histogram.sum, histogram.quantile(0.5), histogram.quantile(0.99))
+                      for name, histogram in self._stages.items()}
+        return [
+            {
+                "stage": name,
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / count * 1000, 4),
+                "p50_ms": round(p50 * 1000, 4),
+                "p99_ms": round(p99 * 1000, 4),
+            }
+            for name, (count, total, p50, p99) in sorted(stages.items())
+        ]
+    
+    def counters(self) -> List[Dict[str, Any]]:
+        """Return every counter as {"name", "labels", "value"}."""
+        with self._lock:
+            counters = list(self._counters.items())
+        return [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(counters)]
+    
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Export everything recorded as a JSON-serializable dictionary.
+        
+        Returns:
+            Dictionary with the stage summaries, the raw bucket counts and the counters
+        """
+        with self._lock:
+            buckets = {name: {"buckets": list(self.buckets), "counts": list(histogram.counts),
+                              "count": histogram.count, "sum": histogram.sum}
+                       for name, histogram in self._stages.items()}
+        return {
+            "enabled": self.enabled,
+            "stages": self.stage_summary(),
+            "histograms": buckets,
+            "counters": self.counters(),
+        }
+    
+    def to_prometheus(self) -> str:
+        """
+        Export everything recorded in the Prometheus text exposition format.
+        
+        Stage timings form one histogram, {prefix}stage_duration_seconds,
+        labelled by stage; counters keep their own names and labels.
+        
+        Returns:
+            str: The exposition text
+        """
+        with self._lock:
+            stages = sorted((name, list(histogram.counts), histogram.count, histogram.sum)
+                            for name, histogram in self._stages.items())
+            counters = sorted(self._counters.items())
+        
+        histogram_name = f"{METRIC_PREFIX}stage_duration_seconds"
+        lines = [
+            f"# HELP {histogram_name} Time spent in each processing stage.",
+            f"# TYPE {histogram_name} histogram",
+        ]
+        for name, counts, count, total in stages:
+            label = f'stage="{_escape(name)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{histogram_name}_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"{histogram_name}_sum{{{label}}} {total!r}")
+            lines.append(f"{histogram_name}_count{{{label}}} {count}")
+        
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{METRIC_PREFIX}{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Registry shared by the classifier, the agent and the app
+registry = MetricsRegistry(enabled=os.getenv("CLASSIFIER_METRICS", "off") == "on")
+
+
+def stage(name: str):
+    """
+    Time a stage of work on the shared registry.
+    
+    Args:
+        name: Stage name, e.g. "preprocess"
+        
+    Returns:
+        A context manager; a shared no-op one while recording is off
+    """
+    if not registry.enabled:
+        return _NULL_STAGE
+    return _Stage(registry, name)
+
+
+def increment(name: str, amount: float = 1, **labels) -> None:
+    """
+    Add amount to a counter on the shared registry.
+    
+    Args:
+        name: Counter name, conventionally ending in _total
+        amount: Value to add
+        **labels: Label values distinguishing series of the counter
+    """
+    if registry.enabled:
+        registry.increment(name, amount, **labels)
+
+
+def enable() -> None:
+    """Start recording on the shared registry."""
+    registry.enabled = True
+
+
+def disable() -> None:
+    """Stop recording on the shared registry; what was recorded is kept."""
+    registry.enabled = False
+
+
+def is_enabled() -> bool:
+    """Return whether the shared registry is recording."""
+    return registry.enabled
+
+
+def reset() -> None:
+    """Drop everything recorded on the shared registry."""
+    registry.reset()
+
+
+def export_prometheus() -> str:
+    """Export the shared registry in the Prometheus text format."""
+    return registry.to_prometheus()
+
+
+def export_json() -> Dict[str, Any]:
+    """Export the shared registry as a JSON-serializable dictionary."""
+    return registry.to_json()
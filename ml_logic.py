@@ -1,13 +1,131 @@
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import Pipeline
-from sklearn.svm import LinearSVC
-from sklearn.model_selection import cross_val_score
-from sklearn.metrics import classification_report
-import joblib
+import hashlib
+import json
 import os
 import re
+import tempfile
+import threading
+import weakref
+from collections import namedtuple
+from typing import NamedTuple, Optional, Tuple
+from cache import LRUCache, MISSING
+from inference import InferenceEngine
+from instrumentation import increment, is_enabled, stage
+from model_artifact import ARTIFACT_DIR, CompactModel, export_artifact, load_artifact
+from profiling import profiled
+
+# sklearn and joblib are imported inside the functions that train, evaluate,
+# save or load pipelines. Classifying with a compact artifact (see
+# get_classification_model) needs neither, so CLI jobs and workers start
+# without paying for them.
+
+MODEL_DIR = "models"
+MODEL_FILENAME = 'classifier_model.joblib'
+TRAINING_CORPUS_PATH = os.path.join("data", "training_corpus.jsonl")
+
+TrainingCorpus = namedtuple('TrainingCorpus', ['examples', 'categories', 'fingerprint'])
+
+# Feature extraction: "tfidf" builds an n-gram vocabulary, "hashing" maps n-grams
+# into a fixed feature space of HASHING_FEATURES columns without storing one
+VECTORIZER_MODE = os.getenv("CLASSIFIER_VECTORIZER", "tfidf")
+HASHING_FEATURES = int(os.getenv("CLASSIFIER_HASHING_FEATURES", str(2 ** 18)))
+
+# Persisted models are loaded with their NumPy arrays memory-mapped read-only
+# ("r"), so worker processes loading the same file share one physical copy;
+# "off" reads them into each process's memory instead
+MODEL_MMAP_MODE = os.getenv("CLASSIFIER_MODEL_MMAP", "r")
+
+# "auto" exports a compact artifact (model_artifact.py) next to the pickled
+# model and classifies from it when it matches the corpus, so predictions do
+# not import sklearn; "off" always uses the pickled pipeline
+MODEL_ARTIFACT = os.getenv("CLASSIFIER_MODEL_ARTIFACT", "auto")
+
+# Cross-validation results are cached here, one JSON file per corpus and hyperparameters
+METRICS_CACHE_DIR = os.path.join("models", "metrics_cache")
+CV_FOLDS = 5
+
+# Parsed training corpora keyed by path, with the (mtime, size) they were read at
+_corpus_cache = {}
+
+# Process-wide model registry: the fitted pipeline is trained (or loaded)
+# once and reused by every prediction until the corpus fingerprint changes.
+_model_lock = threading.Lock()
+_model_registry = {'model': None, 'fingerprint': None}
+_compact_registry = {'model': None}
+
+# Bounded cache of classification results for repeated inputs. It is cleared
+# whenever a model is (re)trained or (re)loaded into the registry.
+PREDICTION_CACHE_SIZE = 100000
+_prediction_cache = LRUCache(max_size=PREDICTION_CACHE_SIZE)
+
+# Common contractions and their expansions
+CONTRACTIONS = {
+    "won't": "will not",
+    "can't": "cannot",
+    "n't": " not",
+    "'ll": " will",
+    "'re": " are",
+    "'ve": " have",
+    "'m": " am",
+    "'d": " would"
+}
+
+# Every whitespace character matched by \s, other than the plain space
+_OTHER_WHITESPACE = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f\x85\xa0\u1680"
+    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+    "\u2028\u2029\u202f\u205f\u3000"
+)
+
+# Single-pass normalizer. Alternatives, tried left to right at each position:
+# - a negation (possibly contracted), joined to the following word with "_"
+# - any other contraction, expanded
+# - a whitespace run other than a single space, collapsed
+# Every alternative starts with a literal character, which lets the regex
+# engine skip ahead to candidate positions instead of trying each one.
+_PREPROCESS_REGEX = re.compile(
+    r"won't(?:\s+\w+)?"
+    r"|can't(?:\s+\w+)?"
+    r"|n(?:'t|ot)(?:\s+\w+)?"
+    r"|never\s+\w+"
+    r"|'(?:ll|re|ve|m|d)"
+    r"| \s+"
+    r"|" + "|".join(re.escape(char) + r"\s*" for char in _OTHER_WHITESPACE)
+)
+
+# Inputs where expanding, joining and collapsing in one pass would differ from
+# applying them one after another: a contraction right after whitespace or a
+# negation, and negations chained onto a joined word.
+_PREPROCESS_FALLBACK_REGEX = re.compile(
+    r"'(?<=\s')"
+    r"|n't(?<=\sn't)"
+    r"|n(?:ot|ever|'t)(?:n't|'|\s+\w*(?:(?:not|never)\s+\w|n't))"
+)
+
+def _preprocess_replace(match):
+    """Replacement callback for _PREPROCESS_REGEX."""
+    matched = match.group(0)
+    if matched[0].isspace():
+        return ' '
+    # A negation or contraction, optionally followed by the word to join
+    parts = matched.split(None, 1)
+    expansion = CONTRACTIONS.get(parts[0], parts[0])
+    if len(parts) == 2:
+        return expansion + '_' + parts[1]
+    return expansion
+
+def _preprocess_text_multipass(text):
+    """Apply each preprocessing step as a separate pass over the text."""
+    for contraction, expansion in CONTRACTIONS.items():
+        text = text.replace(contraction, expansion)
+    
+    # Replace negation patterns; the second pass joins chained negations
+    text = re.sub(r'not\s+(\w+)', r'not_\1', text)
+    text = re.sub(r"not\s+(\w+)", r'not_\1', text)
+    text = re.sub(r'never\s+(\w+)', r'never_\1', text)
+    
+    # Remove extra whitespace
+    return re.sub(r'\s+', ' ', text).strip()
 
 def preprocess_text(text):
     """
@@ -16,89 +134,172 @@ def preprocess_text(text):
     - Handle negations (e.g., "not good" -> "not_good")
     - Remove extra whitespace
     - Expand contractions
+    
+    After lowercasing, all steps run in a single precompiled regex scan.
     """
     # Convert to lowercase
     text = text.lower()
     
-    # Expand common contractions
-    contractions = {
-        "won't": "will not",
-        "can't": "cannot",
-        "n't": " not",
-        "'ll": " will",
-        "'re": " are",
-        "'ve": " have",
-        "'m": " am",
-        "'d": " would"
-    }
-    for contraction, expansion in contractions.items():
-        text = text.replace(contraction, expansion)
-    
-    # Replace negation patterns
-    text = re.sub(r'not\s+(\w+)', r'not_\1', text)
-    text = re.sub(r"not\s+(\w+)", r'not_\1', text)
-    text = re.sub(r'never\s+(\w+)', r'never_\1', text)
+    # Rare inputs where the steps interact fall back to one pass per step
+    if _PREPROCESS_FALLBACK_REGEX.search(text):
+        return _preprocess_text_multipass(text)
     
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    return _PREPROCESS_REGEX.sub(_preprocess_replace, text).strip()
+
+def preprocess_batch(texts):
+    """
+    Lazily preprocess an iterable of texts.
     
-    return text
+    Args:
+        texts: Iterable of texts
+        
+    Returns:
+        iterator: Preprocessed texts, suitable for TfidfVectorizer.transform
+    """
+    return map(preprocess_text, texts)
 
-def train_classifier(examples, categories):
+def build_vectorizer(mode=None, n_features=None):
     """
-    Train a text classifier model with the provided examples and categories.
+    Build the unfitted text vectorizer.
+    
+    Both modes produce sublinear, L2-normalized TF-IDF features over 1-3 word
+    n-grams. The "hashing" mode hashes n-grams into n_features columns, so
+    there is no vocabulary to build, store or pickle; only the IDF weights
+    are learned when fitting.
     
     Args:
-        examples (list): List of text examples
-        categories (list): List of corresponding categories
+        mode: "tfidf" or "hashing", defaults to VECTORIZER_MODE
+        n_features: Size of the hashed feature space, defaults to HASHING_FEATURES
         
     Returns:
-        Pipeline: Trained scikit-learn pipeline
+        The vectorizer (a TfidfVectorizer or a hashing + TF-IDF pipeline)
     """
-    # Create improved pipeline for classification
-    model = Pipeline([
-        ('vectorizer', TfidfVectorizer(
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+    from sklearn.pipeline import Pipeline
+    
+    mode = mode or VECTORIZER_MODE
+    if mode == 'tfidf':
+        return TfidfVectorizer(
             ngram_range=(1, 3),  # Capture up to 3-word phrases
             min_df=1,  # Minimum document frequency
             sublinear_tf=True,  # Apply sublinear tf scaling (1 + log(tf))
             use_idf=True,
             max_features=10000
-        )),
+        )
+    if mode == 'hashing':
+        return Pipeline([
+            # Raw counts, so the TF-IDF step sees the same input as TfidfVectorizer
+            ('hashing', HashingVectorizer(
+                ngram_range=(1, 3),
+                n_features=n_features or HASHING_FEATURES,
+                alternate_sign=False,
+                norm=None
+            )),
+            ('tfidf', TfidfTransformer(sublinear_tf=True))
+        ])
+    raise ValueError(f"Unknown vectorizer mode: {mode}")
+
+def build_pipeline(vectorizer=None, n_features=None):
+    """
+    Build the unfitted classification pipeline.
+    
+    Args:
+        vectorizer: "tfidf" or "hashing", defaults to VECTORIZER_MODE
+        n_features: Size of the hashed feature space in "hashing" mode
+        
+    Returns:
+        Pipeline: Vectorizer followed by a linear SVM
+    """
+    from sklearn.pipeline import Pipeline
+    from sklearn.svm import LinearSVC
+    
+    return Pipeline([
+        ('vectorizer', build_vectorizer(vectorizer, n_features)),
         ('classifier', LinearSVC(C=1.0, class_weight='balanced', max_iter=10000))
     ])
+
+@profiled("train_classifier")
+def train_classifier(examples, categories, vectorizer=None, n_features=None):
+    """
+    Train a text classifier model with the provided examples and categories.
+    
+    Args:
+        examples (list): List of text examples
+        categories (list): List of corresponding categories
+        vectorizer (str): "tfidf" or "hashing", defaults to VECTORIZER_MODE
+        n_features (int): Size of the hashed feature space in "hashing" mode
+        
+    Returns:
+        Pipeline: Trained scikit-learn pipeline
+    """
+    # Create improved pipeline for classification
+    model = build_pipeline(vectorizer, n_features)
     
     # Train the model
-    model.fit(examples, categories)
+    with stage("train"):
+        model.fit(examples, categories)
+    model.vectorizer_mode_ = vectorizer or VECTORIZER_MODE
     
     return model
 
-def evaluate_classifier(model, examples, categories):
+def evaluate_classifier(model, examples, categories, cv=CV_FOLDS, n_jobs=None):
     """
     Evaluate the classifier using cross-validation.
     
+    Folds are fitted in parallel in a single cross_validate pass. The
+    classification report is computed from out-of-fold predictions, so every
+    example is scored by a model that did not see it during training.
+    
     Args:
-        model: Trained model
+        model: Unfitted model (each fold fits its own clone)
         examples: List of text examples
         categories: List of corresponding categories
+        cv: Number of cross-validation folds
+        n_jobs: Number of folds fitted in parallel (-1 for all CPUs)
         
     Returns:
         dict: Evaluation metrics
     """
-    # Perform cross-validation
-    cv_scores = cross_val_score(model, examples, categories, cv=5)
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import cross_validate
+    
+    results = cross_validate(
+        model, examples, categories, cv=cv, n_jobs=n_jobs,
+        return_estimator=True, return_indices=True
+    )
     
-    # Get detailed classification report for the last fold
-    # For simplicity, we're not doing a proper train/test split here
-    predictions = model.predict(examples)
-    report = classification_report(categories, predictions, output_dict=True)
+    # Each fold's estimator predicts the examples it held out
+    examples = np.asarray(examples, dtype=object)
+    predictions = np.empty(len(examples), dtype=object)
+    for estimator, test_indices in zip(results['estimator'], results['indices']['test']):
+        predictions[test_indices] = estimator.predict(examples[test_indices])
+    
+    cv_scores = results['test_score']
+    report = classification_report(categories, predictions.tolist(), output_dict=True, zero_division=0)
     
     return {
         'cv_scores': cv_scores,
         'mean_cv_score': np.mean(cv_scores),
-        'classification_report': report
+        'classification_report': report,
+        'oof_predictions': predictions.tolist()
     }
 
-def save_model(model, filename='classifier_model.joblib'):
+def _metrics_cache_key(model, fingerprint, cv):
+    """Hash the corpus fingerprint, the model's hyperparameters and the fold count."""
+    import sklearn
+    
+    # Nested estimators are skipped; their parameters appear as separate entries
+    params = {
+        name: value for name, value in model.get_params(deep=True).items()
+        if name != 'steps' and not hasattr(value, 'get_params')
+    }
+    payload = json.dumps(
+        {'corpus': fingerprint, 'params': params, 'cv': cv, 'sklearn': sklearn.__version__},
+        sort_keys=True, default=repr
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def save_model(model, filename=MODEL_FILENAME):
     """
     Save the trained model to disk.
     
@@ -109,269 +310,597 @@ def save_model(model, filename='classifier_model.joblib'):
     Returns:
         str: Path to the saved model
     """
+    import joblib
+    
     # Create models directory if it doesn't exist
-    os.makedirs("models", exist_ok=True)
-    filepath = os.path.join("models", filename)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    filepath = os.path.join(MODEL_DIR, filename)
     
-    # Save the model
-    joblib.dump(model, filepath)
+    # Write to a temporary file and swap it in atomically, so concurrent
+    # readers never see a partially written model
+    fd, tmp_path = tempfile.mkstemp(dir=MODEL_DIR, suffix=".tmp")
+    try:
+        with stage("model_save"), os.fdopen(fd, 'wb') as f:
+            joblib.dump(model, f)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
     
     return filepath
 
-def load_model(filename='classifier_model.joblib'):
+def load_model(filename=MODEL_FILENAME, mmap_mode=None):
     """
     Load a trained model from disk.
     
     Args:
         filename: Name of the file to load the model from
+        mmap_mode: None to read the model into memory, or a numpy memmap mode
+            ('r') to map its arrays (IDF weights, coefficients, intercepts)
+            from the file, so processes loading it share the same pages
         
     Returns:
         Pipeline: Loaded model
     """
-    filepath = os.path.join("models", filename)
+    import joblib
+    
+    filepath = os.path.join(MODEL_DIR, filename)
     
     # Check if model file exists
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"Model file {filepath} not found")
     
-    # Load the model
-    return joblib.load(filepath)
+    # Load the model; save_model replaces the file atomically, so a mapped
+    # model keeps reading the version it was loaded from
+    with stage("model_load"):
+        return joblib.load(filepath, mmap_mode=mmap_mode)
 
-def classify_text(text: str) -> str:
+def load_training_corpus(path=None):
     """
-    Classifies a text into multiple categories using a machine learning classifier.
+    Load a JSONL training corpus, one {"text": ..., "category": ...} object per line.
+    
+    The parsed corpus is cached per path and only re-read when the file's
+    modification time or size changes. Its SHA-256 content hash identifies
+    the corpus version and is stored on models trained from it.
     
     Args:
-        text (str): The text to be classified
+        path: Path to the corpus file, defaults to TRAINING_CORPUS_PATH
         
     Returns:
-        str: The predicted category for the text
+        TrainingCorpus: (examples, categories, fingerprint)
     """
-    # Preprocess input text
-    processed_text = preprocess_text(text)
+    path = path or TRAINING_CORPUS_PATH
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _corpus_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    digest = hashlib.sha256()
+    examples = []
+    categories = []
+    with open(path, 'rb') as f:
+        for line_number, line in enumerate(f, 1):
+            digest.update(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                examples.append(record['text'])
+                categories.append(record['category'])
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"Invalid training record at {path}:{line_number}: {e}") from e
+    
+    corpus = TrainingCorpus(examples, categories, digest.hexdigest())
+    _corpus_cache[path] = (signature, corpus)
+    return corpus
+
+def get_training_data():
+    """
+    Get the examples and categories used to train the classifier.
     
-    # Training examples (texts and categories)
-    examples = [
-        # Positive sentiment - original examples
-        "This product is great, I loved it!", 
-        "Amazing experience, I recommend it to everyone",
-        "Very satisfied with the service provided",
-        "The product arrived as expected and working perfectly",
-        
-        # Additional positive examples
-        "I'm really happy with my purchase",
-        "The quality exceeded my expectations",
-        "Excellent service and great communication",
-        "This is exactly what I was looking for",
-        "Wonderful experience from start to finish",
-        "The best customer service I've ever had",
-        "I'm impressed with the quality of this product",
-        "Highly recommended for anyone looking for this type of item",
-        "The product works flawlessly",
-        "Very pleased with my purchase, will buy again",
-        "I'm extremely happy with this purchase, it's perfect!",
-        "I love this product, it's amazing",
-        "Perfect product, exactly as described",
-        "Couldn't be happier with my purchase",
-        "This is the best product I've ever used",
-        
-        # Negative sentiment - original examples
-        "Horrible, I don't recommend it to anyone",
-        "Terrible experience, don't buy",
-        "Low quality product, broke on first use",
-        "Poor customer service and defective product",
+    Returns:
+        tuple: (examples, categories) as parallel lists
+    """
+    corpus = load_training_corpus()
+    return corpus.examples, corpus.categories
+
+def get_model(force_retrain=False):
+    """
+    Get the shared classifier, training or loading it only when needed.
+    
+    The fitted pipeline is kept in a process-wide registry. It is loaded from
+    disk when the persisted model matches the current corpus fingerprint and
+    retrained (then saved) otherwise. Its compact artifact is (re)written
+    whenever it is missing or out of date.
+    
+    Args:
+        force_retrain: Retrain even if a matching model is available
         
-        # Additional negative examples with negations and sad terms
-        "I am not happy with this product",
-        "This makes me sad and disappointed",
-        "Not satisfied with the quality",
-        "This is very frustrating and annoying",
-        "I regret buying this product",
-        "This is a very sad experience",
-        "I am not pleased with the service",
-        "Very disappointing results",
-        "Would not recommend to anyone",
-        "The product did not meet my expectations",
-        "Waste of money, complete garbage",
-        "This is the worst purchase I've ever made",
-        "The quality is terrible and not worth the price",
-        "Customer service was unhelpful and rude",
-        "Complete disappointment, do not buy",
-        "I do not like it",
-        "I don't like this product at all",
-        "I did not enjoy using this",
-        "I do not recommend this",
-        "This is not good enough",
+    Returns:
+        Pipeline: Fitted scikit-learn pipeline
+    """
+    examples, categories, fingerprint = load_training_corpus()
+    
+    # Fast path: reuse the registered model without taking the lock
+    model = _model_registry['model']
+    if not force_retrain and model is not None and _model_registry['fingerprint'] == fingerprint:
+        return model
+    
+    with _model_lock:
+        model = _model_registry['model']
+        if not force_retrain and model is not None and _model_registry['fingerprint'] == fingerprint:
+            return model
         
-        # Questions
-        "How does this work?",
-        "What is the return policy?",
-        "Can you help me with this issue?",
-        "When will my order arrive?",
-        "Where can I find more information?",
-        "Who should I contact for support?",
-        "How long does shipping take?",
-        "Is there a warranty for this product?",
-        "Do you offer international shipping?",
-        "What payment methods do you accept?",
-        "How can I track my order?",
-        "Are there any discounts available?",
+        model = None
+        if not force_retrain:
+            try:
+                model = load_model(mmap_mode=None if MODEL_MMAP_MODE == "off" else MODEL_MMAP_MODE)
+            except Exception:
+                model = None
+            # Only reuse a persisted model trained on the same corpus and vectorizer
+            if (getattr(model, 'corpus_fingerprint_', None) != fingerprint
+                    or getattr(model, 'vectorizer_mode_', 'tfidf') != VECTORIZER_MODE):
+                model = None
         
-        # Informational
-        "The store opens at 9am and closes at 6pm",
-        "This product contains 500mg of vitamin C",
-        "The company was founded in 2010",
-        "The product weighs 2.5 kg and measures 30x40 cm",
-        "Shipping takes 3-5 business days",
-        "Our offices are located in New York",
-        "The warranty is valid for 2 years from purchase date",
-        "Returns are accepted within 30 days",
-        "The package includes a charger and instruction manual",
-        "This device is compatible with iOS and Android",
-        "We offer free shipping on orders over $50",
-        "The product is available in red, blue, and black",
+        if model is None:
+            model = train_classifier(examples, categories)
+            model.corpus_fingerprint_ = fingerprint
+            save_model(model)
+            _export_compact_model(model)
+        elif not _artifact_matches(fingerprint):
+            _export_compact_model(model)
         
-        # Neutral/Ambiguous - NEW CATEGORY
-        "I received the item yesterday",
-        "The color is blue",
-        "I ordered this last week",
-        "The size is medium",
-        "It has three buttons",
-        "Made in China",
-        "Delivery took four days",
-        "The manual is included",
-        "I'm using it for the first time today",
-        "It runs on batteries",
-        "I don't have a strong opinion about this product",
-        "It's an average product, nothing special",
-    ]
+        _model_registry['model'] = model
+        _model_registry['fingerprint'] = fingerprint
+        _compact_registry['model'] = None
+        _prediction_cache.clear()
+        return model
+
+def _artifact_matches(fingerprint):
+    """Return whether the compact artifact on disk was exported for fingerprint and VECTORIZER_MODE."""
+    try:
+        with open(os.path.join(ARTIFACT_DIR, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (meta.get('corpus_fingerprint') == fingerprint
+            and (meta.get('vectorizer_mode') or 'tfidf') == VECTORIZER_MODE)
+
+def _export_compact_model(model):
+    """Write the compact artifact of model, unless artifacts are turned off."""
+    if MODEL_ARTIFACT == "off":
+        return
+    try:
+        export_artifact(model, ARTIFACT_DIR)
+    except (OSError, ValueError):
+        pass  # The pickled model is still saved; only the fast start-up path is lost
+
+def get_classification_model():
+    """
+    Get the model used for predictions, avoiding sklearn where possible.
     
-    # Count the number of examples to ensure correct pairing
-    num_positive = 19  # 4 original + 15 additional
-    num_negative = 20  # 4 original + 16 additional
-    num_questions = 12
-    num_informational = 12
-    num_neutral = 12
-    
-    # Total should equal the length of examples list
-    total_examples = num_positive + num_negative + num_questions + num_informational + num_neutral
-    print(f"Total examples: {total_examples}, Actual examples: {len(examples)}")
-    
-    # Let's count actual examples to ensure accuracy
-    actual_positive = 0
-    actual_negative = 0
-    actual_questions = 0
-    actual_informational = 0
-    actual_neutral = 0
-    
-    # Count examples in the list
-    for idx, example in enumerate(examples):
-        if idx < 19:
-            actual_positive += 1
-        elif idx < 39:
-            actual_negative += 1
-        elif idx < 51:
-            actual_questions += 1
-        elif idx < 63:
-            actual_informational += 1
-        else:
-            actual_neutral += 1
+    Returns the registered pipeline if one is loaded for the current corpus.
+    Otherwise the compact artifact is loaded when it was exported from a model
+    of the current corpus and vectorizer mode, which takes a few milliseconds
+    and imports neither sklearn nor joblib. Failing both, the pipeline is
+    loaded or trained by get_model, which writes its artifact for the next
+    process.
     
-    # Update counts to match actual counts
-    num_positive = actual_positive
-    num_negative = actual_negative
-    num_questions = actual_questions
-    num_informational = actual_informational
-    num_neutral = actual_neutral
+    Returns:
+        A fitted Pipeline or a model_artifact.CompactModel; both carry
+        corpus_fingerprint_ and classes_ and work with get_inference_engine
+    """
+    fingerprint = load_training_corpus().fingerprint
+    model = _model_registry['model']
+    if model is not None and _model_registry['fingerprint'] == fingerprint:
+        return model
+    if MODEL_ARTIFACT == "off":
+        return get_model()
+    
+    compact = _compact_registry['model']
+    if compact is not None and compact.corpus_fingerprint_ == fingerprint:
+        return compact
+    with _model_lock:
+        compact = _compact_registry['model']
+        if compact is not None and compact.corpus_fingerprint_ == fingerprint:
+            return compact
+        try:
+            compact = load_artifact(ARTIFACT_DIR, mmap_mode=None if MODEL_MMAP_MODE == "off" else MODEL_MMAP_MODE)
+        except (OSError, ValueError, KeyError):
+            compact = None
+        if (compact is not None and compact.corpus_fingerprint_ == fingerprint
+                and (compact.vectorizer_mode_ or 'tfidf') == VECTORIZER_MODE):
+            _compact_registry['model'] = compact
+            _prediction_cache.clear()
+            return compact
+    return get_model()
+
+def loaded_model_version():
+    """
+    Get the corpus fingerprint of the model loaded in this process, without loading one.
     
-    # Create categories list with correct counts
-    categories = []
+    Returns:
+        str: Fingerprint of the registered pipeline or compact artifact, or None if neither is loaded
+    """
+    model = _model_registry['model'] if _model_registry['model'] is not None else _compact_registry['model']
+    return getattr(model, 'corpus_fingerprint_', None)
+
+def retrain_model():
+    """
+    Retrain the shared classifier from the training corpus and persist it.
     
-    # Add categories based on counts
-    categories.extend(["positive"] * num_positive)
-    categories.extend(["negative"] * num_negative)
-    categories.extend(["question"] * num_questions)
-    categories.extend(["informational"] * num_informational)
-    categories.extend(["neutral"] * num_neutral)
+    Returns:
+        Pipeline: Newly fitted scikit-learn pipeline
+    """
+    return get_model(force_retrain=True)
+
+def get_prediction_cache_stats():
+    """
+    Get hit/miss counters and the size of the prediction cache.
     
-    print(f"Total categories: {len(categories)}, Total examples: {len(examples)}")
+    Returns:
+        dict: Cache statistics (see cache.LRUCache.stats)
+    """
+    return _prediction_cache.stats()
+
+def clear_prediction_cache():
+    """Drop every cached prediction."""
+    _prediction_cache.clear()
+
+# Keyword rules applied on top of the model prediction
+NEGATIVE_PATTERNS = [
+    "not like", "don't like", "do not like", 
+    "not good", "isn't good", "is not good",
+    "not recommend", "don't recommend", "do not recommend",
+    "not happy", "disappointed", "terrible", "horrible",
+    "waste", "worst", "bad", "poor", "awful", "trash"
+]
+
+# Positive words are used by both the negation and the positive checks
+POSITIVE_WORDS = ["happy", "love", "great", "perfect", "excellent", "amazing", "wonderful", 
+                  "pleased", "impressed", "recommend", "best", "satisfied", "fantastic"]
+
+NEGATION_WORDS = ["not", "don't", "do not", "doesn't", "does not", "didn't", "did not", "no", "never"]
+
+NEGATIVE_STARTS = ["i do not", "i don't", "i did not", "i didn't", "i cannot", "i can't", "i won't", "i will not"]
+
+EXTREME_POSITIVE_PATTERNS = ["extremely happy", "really love", "absolutely amazing", "love it", "very satisfied", "very happy"]
+
+# Rule names in precedence order. Each rule is a bit in the mask returned by
+# _rule_mask so a whole batch can be evaluated with array operations.
+RULE_NAMES = (
+    'negative_start',     # text begins with a NEGATIVE_STARTS phrase
+    'negative_pattern',   # text contains a NEGATIVE_PATTERNS phrase
+    'negated_positive',   # a NEGATION_WORDS entry followed by a POSITIVE_WORDS entry
+    'positive_word',      # text contains a POSITIVE_WORDS entry
+    'contains_not',       # text contains "not "
+    'extreme_positive',   # text contains an EXTREME_POSITIVE_PATTERNS phrase
+)
+RULE_BITS = {name: 1 << i for i, name in enumerate(RULE_NAMES)}
+
+def _trie_pattern(phrases):
+    """
+    Build a regex alternation of literal phrases factored into a prefix trie.
     
-    # Verify that counts match
-    if len(categories) != len(examples):
-        print(f"ERROR: Mismatch in counts. Examples: {len(examples)}, Categories: {len(categories)}")
-        # Return a meaningful error if used during development/testing
-        return f"Error: counts mismatch ({len(examples)} examples, {len(categories)} categories)"
+    Children are tried before the end of a phrase, so the regex always
+    matches the longest phrase starting at a given position.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = '(?:' + '|'.join(branches) + ')'
+        return pattern + '?' if '' in node else pattern
+    
+    return build(trie)
+
+def _compile_rules():
+    """
+    Compile all keyword rules into a single matcher.
     
-    try:
-        # Force training a new model by removing the old one if it exists
-        model_path = os.path.join("models", "classifier_model.joblib")
-        if os.path.exists(model_path):
-            os.remove(model_path)
-            print("Removed old model to train a new one")
-        
-        # Train a new model
-        print("Training new model")
-        model = train_classifier(examples, categories)
-        # Save the model for future use
-        save_model(model)
-        
-        # Make prediction using preprocessed text
-        predicted_category = model.predict([processed_text])[0]
-        
-        # Convert to lowercase for pattern matching
-        text_lower = text.lower()
-        
-        # Check for negative patterns first
-        negative_patterns = [
-            "not like", "don't like", "do not like", 
-            "not good", "isn't good", "is not good",
-            "not recommend", "don't recommend", "do not recommend",
-            "not happy", "disappointed", "terrible", "horrible",
-            "waste", "worst", "bad", "poor", "awful", "trash"
-        ]
-        
-        # Define positive words for use in multiple checks
-        positive_words = ["happy", "love", "great", "perfect", "excellent", "amazing", "wonderful", 
-                         "pleased", "impressed", "recommend", "best", "satisfied", "fantastic"]
-        
-        # Check if the text contains a negation followed by a positive word
-        negation_words = ["not", "don't", "do not", "doesn't", "does not", "didn't", "did not", "no", "never"]
-        has_negated_positive = any(neg + " " + pos in text_lower for neg in negation_words for pos in positive_words)
-        
-        # Check if text begins with "I do not" or similar negative constructions
-        negative_starts = ["i do not", "i don't", "i did not", "i didn't", "i cannot", "i can't", "i won't", "i will not"]
-        if any(text_lower.startswith(start) for start in negative_starts):
-            return "negative"
+    Returns:
+        tuple: (regex, masks, start_masks) where masks maps every matchable
+        phrase to the rule bits of all phrases that are prefixes of it, and
+        start_masks does the same for rules that only apply at position 0
+    """
+    phrase_bits = {}
+    start_bits = {}
+    
+    def add(table, phrases, rule):
+        for phrase in phrases:
+            table[phrase] = table.get(phrase, 0) | RULE_BITS[rule]
+    
+    add(phrase_bits, NEGATIVE_PATTERNS, 'negative_pattern')
+    add(phrase_bits, [neg + " " + pos for neg in NEGATION_WORDS for pos in POSITIVE_WORDS], 'negated_positive')
+    add(phrase_bits, POSITIVE_WORDS, 'positive_word')
+    add(phrase_bits, ["not "], 'contains_not')
+    add(phrase_bits, EXTREME_POSITIVE_PATTERNS, 'extreme_positive')
+    add(start_bits, NEGATIVE_STARTS, 'negative_start')
+    
+    phrases = set(phrase_bits) | set(start_bits)
+    
+    # Phrases matching at the same position are all prefixes of the longest
+    # one, so the longest match determines every hit at that position
+    def prefix_mask(table, phrase):
+        mask = 0
+        for end in range(1, len(phrase) + 1):
+            mask |= table.get(phrase[:end], 0)
+        return mask
+    
+    masks = {phrase: prefix_mask(phrase_bits, phrase) for phrase in phrases}
+    start_masks = {phrase: prefix_mask(start_bits, phrase) for phrase in phrases}
+    
+    # Zero-width lookahead so overlapping phrases are all reported
+    regex = re.compile('(?=(' + _trie_pattern(phrases) + '))')
+    return regex, masks, start_masks
+
+_RULE_REGEX, _RULE_MASKS, _RULE_START_MASKS = _compile_rules()
+
+def _rule_mask(text_lower):
+    """Return the bit mask of every rule hit in a lowercased text, in one scan."""
+    mask = 0
+    for match in _RULE_REGEX.finditer(text_lower):
+        phrase = match.group(1)
+        mask |= _RULE_MASKS[phrase]
+        if match.start() == 0:
+            mask |= _RULE_START_MASKS[phrase]
+    return mask
+
+def match_rules(text):
+    """
+    Find every keyword rule that fires for a text.
+    
+    Args:
+        text (str): The text to check
         
-        # If any negative pattern is found or has negated positive words, classify as negative
-        if any(pattern in text_lower for pattern in negative_patterns) or has_negated_positive:
-            return "negative"
+    Returns:
+        tuple: Names of the rules hit, in precedence order (see RULE_NAMES)
+    """
+    mask = _rule_mask(text.lower())
+    return tuple(name for name in RULE_NAMES if mask & RULE_BITS[name])
+
+class ClassificationResult(NamedTuple):
+    """
+    Outcome of classifying one text, from a single decision pass.
+    
+    Attributes:
+        category: The final category
+        predicted: The model's own prediction, before any override rule
+        classes: The model's class labels, in the order of margins
+        margins: Decision value of each class (one value for a two-class model)
+        rule: The override rule that decided the category (see OVERRIDE_RULES), or None
+        model_version: Corpus fingerprint of the model that produced the result
+    """
+    category: str
+    predicted: str
+    classes: Tuple[str, ...]
+    margins: Tuple[float, ...]
+    rule: Optional[str]
+    model_version: Optional[str]
+    
+    @property
+    def confidence(self):
+        """The largest absolute margin, which the short-text rule compares with 0.5."""
+        return max(abs(margin) for margin in self.margins)
+    
+    def margins_by_class(self):
+        """Return the margins as a {class: margin} dictionary."""
+        if len(self.margins) == 1:
+            return {self.classes[1]: self.margins[0]}
+        return dict(zip(self.classes, self.margins))
+
+# Override rules applied to the model's prediction, in precedence order
+OVERRIDE_RULES = (
+    'negative_keywords',   # negative start, negative pattern or negated positive word -> negative
+    'positive_word',       # a positive word without "not " the model missed -> positive
+    'extreme_positive',    # an EXTREME_POSITIVE_PATTERNS phrase -> positive
+    'short_text_neutral',  # short, low-confidence, not a question or sentiment -> neutral
+)
+
+def classify_batch(texts, use_cache=True):
+    """
+    Classify a list of texts with a single vectorization and prediction pass.
+    
+    Produces exactly the same categories as calling classify_text on each text,
+    but transforms the whole batch into one sparse matrix and evaluates the
+    keyword rules as array operations.
+    
+    Args:
+        texts (list): Texts to be classified
+        use_cache (bool): Look up and store predictions in the prediction cache
         
-        # Additional rules for positive sentiment detection
+    Returns:
+        list: The predicted category for each text, in input order
+    """
+    return [result.category for result in classify_batch_results(texts, use_cache)]
+
+def classify_batch_results(texts, use_cache=True):
+    """
+    Classify a list of texts, returning the full result of each.
+    
+    Repeated inputs are answered from the prediction cache. Its key is the
+    preprocessed text and the model's corpus fingerprint, plus the rule hits
+    and short-text flag, which are computed on the raw text.
+    
+    Args:
+        texts (list): Texts to be classified
+        use_cache (bool): Look up and store results in the prediction cache
         
-        # Check for positive words
-        has_positive = any(word in text_lower for word in positive_words)
+    Returns:
+        list: A ClassificationResult for each text, in input order
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    
+    with stage("classify"):
+        model = get_classification_model()
+        increment("classified_texts_total", len(texts))
+        with stage("preprocess"):
+            processed = list(preprocess_batch(texts))
+        if not use_cache:
+            return _classify_uncached(model, texts, processed)
         
-        # Override with positive if text contains explicit positive indicators
-        if has_positive and "not " not in text_lower and predicted_category != "positive":
-            return "positive"
+        with stage("cache_lookup"):
+            fingerprint = getattr(model, 'corpus_fingerprint_', None)
+            keys = [
+                (fingerprint, processed_text, _rule_mask(text.lower()), len(text.split()) < 5)
+                for text, processed_text in zip(texts, processed)
+            ]
+            results = [_prediction_cache.get(key) for key in keys]
+            missing = [i for i, result in enumerate(results) if result is MISSING]
+        increment("prediction_cache_hits_total", len(texts) - len(missing))
+        increment("prediction_cache_misses_total", len(missing))
+        if missing:
+            computed = _classify_uncached(model, [texts[i] for i in missing], [keys[i][1] for i in missing])
+            for i, result in zip(missing, computed):
+                results[i] = result
+                _prediction_cache.set(keys[i], result)
+        return results
+
+# NumPy inference engines built from fitted pipelines, dropped with their model
+_inference_engines = weakref.WeakKeyDictionary()
+
+def get_inference_engine(model=None):
+    """
+    Get the NumPy inference engine for a model, building it on first use.
+    
+    Args:
+        model: Fitted pipeline or CompactModel, defaults to the shared classifier
         
-        # Additional check for extremely positive statements
-        extreme_positive_patterns = ["extremely happy", "really love", "absolutely amazing", "love it", "very satisfied", "very happy"]
-        if any(pattern in text_lower for pattern in extreme_positive_patterns):
-            return "positive"
-                
-        # Additional logic for short, factual statements
-        if len(text.split()) < 5 and predicted_category not in ["question", "negative", "positive"]:
-            # Short statements that aren't questions or clear sentiments are likely neutral/informational
-            confidence_scores = model.decision_function([processed_text])[0]
-            if np.max(np.abs(confidence_scores)) < 0.5:  # Low confidence
-                return "neutral"
+    Returns:
+        InferenceEngine, or None if the model's vectorizer is not supported
+        and predictions must go through the sklearn pipeline
+    """
+    model = model if model is not None else get_classification_model()
+    engine = _inference_engines.get(model, MISSING)
+    if engine is MISSING:
+        try:
+            if isinstance(model, CompactModel):
+                engine = InferenceEngine.from_artifact(model)
+            else:
+                engine = InferenceEngine.from_pipeline(model)
+        except (ValueError, AttributeError, KeyError):
+            engine = None
+        _inference_engines[model] = engine
+    return engine
+
+def _classify_uncached(model, texts, processed):
+    """Run the model and the keyword rules on texts and their preprocessed forms."""
+    engine = get_inference_engine(model)
+    if engine is not None:
+        # Label and margins in one call, without sklearn's per-call overhead
+        if len(processed) == 1:
+            label, margins = engine.score(processed[0])
+            predicted, scores = np.array([label]), margins[np.newaxis, :]
+        else:
+            predicted, scores = engine.score_batch(processed)
+        max_confidence = np.abs(scores).max(axis=1)
+        classes = engine.classes_
+    else:
+        if isinstance(model, CompactModel):
+            # The artifact vectorizes with the analyzer it was exported with
+            with stage("predict"):
+                scores = model.decision_function(processed)
+            classes = model.classes_
+        else:
+            vectorizer = model.named_steps['vectorizer']
+            classifier = model.named_steps['classifier']
+            
+            # One transform and one decision pass for the whole batch
+            with stage("vectorize"):
+                features = vectorizer.transform(processed)
+            with stage("predict"):
+                scores = classifier.decision_function(features)
+            classes = classifier.classes_
+        if scores.ndim == 1:
+            predicted = classes[(scores > 0).astype(int)]
+            max_confidence = np.abs(scores)
+        else:
+            predicted = classes[scores.argmax(axis=1)]
+            max_confidence = np.abs(scores).max(axis=1)
+    
+    with stage("rules"):
+        categories, rules = _apply_rules(texts, predicted, max_confidence)
+    if is_enabled():
+        for rule, count in enumerate(np.bincount(rules + 1, minlength=len(OVERRIDE_RULES) + 1)[1:].tolist()):
+            if count:
+                increment("rule_overrides_total", count, rule=OVERRIDE_RULES[rule])
+    
+    classes = tuple(classes.tolist())
+    version = getattr(model, 'corpus_fingerprint_', None)
+    return [
+        ClassificationResult(category, label, classes, tuple(margins),
+                             OVERRIDE_RULES[rule] if rule >= 0 else None, version)
+        for category, label, margins, rule in zip(
+            categories.tolist(), predicted.tolist(), scores.reshape(len(texts), -1).tolist(), rules.tolist()
+        )
+    ]
+
+def _apply_rules(texts, predicted, max_confidence):
+    """Return the final categories and the index in OVERRIDE_RULES of the rule applied (-1 for none)."""
+    # Rule hits as one bit mask per text
+    masks = np.fromiter((_rule_mask(text.lower()) for text in texts), dtype=np.int64, count=len(texts))
+    negative_start, negative_pattern, negated_positive, has_positive, has_not, extreme_positive = (
+        (masks & RULE_BITS[name]) != 0 for name in RULE_NAMES
+    )
+    
+    # Short statements that aren't questions or clear sentiments are likely neutral
+    short_text = np.fromiter((len(text.split()) < 5 for text in texts), dtype=bool, count=len(texts))
+    low_confidence_short = (
+        short_text
+        & ~np.isin(predicted, ["question", "negative", "positive"])
+        & (max_confidence < 0.5)
+    )
+    
+    # Conditions are listed in precedence order (OVERRIDE_RULES); the first match wins
+    conditions = [
+        negative_start | negative_pattern | negated_positive,
+        has_positive & ~has_not & (predicted != "positive"),
+        extreme_positive,
+        low_confidence_short,
+    ]
+    categories = np.select(conditions, ["negative", "positive", "positive", "neutral"], default=predicted)
+    rules = np.select(conditions, range(len(OVERRIDE_RULES)), default=-1)
+    return categories, rules
+
+def classify_text(text: str) -> str:
+    """
+    Classifies a text into multiple categories using a machine learning classifier.
+    
+    Args:
+        text (str): The text to be classified
         
-        return predicted_category
+    Returns:
+        str: The predicted category for the text
+    """
+    try:
+        return classify_text_result(text).category
     except Exception as e:
         return f"Error classifying the text: {str(e)}"
 
+def classify_text_result(text: str) -> ClassificationResult:
+    """
+    Classify a text and return the full result: category, per-class margins,
+    the override rule that fired and the model version.
+    
+    Args:
+        text (str): The text to be classified
+        
+    Returns:
+        ClassificationResult: The result for the text
+    """
+    return classify_batch_results([text])[0]
+
 def get_category_description(category: str) -> str:
     """
     Returns a description for each category.
@@ -393,31 +922,46 @@ def get_category_description(category: str) -> str:
     
     return descriptions.get(category, "Unknown category")
 
-def get_classifier_metrics():
+def get_classifier_metrics(n_jobs=-1, use_cache=True):
     """
     Get performance metrics for the current classifier.
     
+    Results are cached on disk, keyed on the corpus hash and the model's
+    hyperparameters, so repeated calls return without retraining.
+    
+    Args:
+        n_jobs: Number of cross-validation folds fitted in parallel (-1 for all CPUs)
+        use_cache: Read and write the on-disk metrics cache
+        
     Returns:
         dict: Metrics for the classifier
     """
-    # Extract examples and categories from classify_text function
-    examples = [
-        # Positive sentiment - original examples
-        "This product is great, I loved it!", 
-        "Amazing experience, I recommend it to everyone",
-        # ... (truncated for brevity)
-    ]
-    
-    categories = [
-        "positive",
-        "positive", 
-        # ... (truncated for brevity)
-    ]
-    
-    # Train a model (we don't save this one, just for evaluation)
-    model = train_classifier(examples, categories)
-    
-    # Evaluate the model
-    metrics = evaluate_classifier(model, examples, categories)
-    
-    return metrics 
\ No newline at end of file
+    examples, categories, fingerprint = load_training_corpus()
+    model = build_pipeline()
+    
+    cache_path = os.path.join(METRICS_CACHE_DIR, _metrics_cache_key(model, fingerprint, CV_FOLDS) + '.json')
+    if use_cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                metrics = json.load(f)
+            metrics['cv_scores'] = np.array(metrics['cv_scores'])
+            return metrics
+        except (OSError, ValueError, KeyError):
+            pass  # Unreadable cache entry, recompute it
+    
+    metrics = evaluate_classifier(model, examples, categories, cv=CV_FOLDS, n_jobs=n_jobs)
+    
+    if use_cache:
+        os.makedirs(METRICS_CACHE_DIR, exist_ok=True)
+        serializable = dict(metrics, cv_scores=metrics['cv_scores'].tolist(), mean_cv_score=float(metrics['mean_cv_score']))
+        fd, tmp_path = tempfile.mkstemp(dir=METRICS_CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(serializable, f)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    return metrics
@@ -0,0 +1,280 @@
+"""
+Compact Model Artifacts for Groq Classifier
+
+Exports a fitted classification pipeline as a directory of raw NumPy arrays
+plus a small JSON header, instead of a pickled sklearn object:
+
+    meta.json         vectorizer settings, classes and provenance
+    vocabulary.npy    n-grams as a sorted UTF-8 byte-string array (tfidf mode)
+    idf.npy           IDF weights, one per feature (if the model uses IDF)
+    coef.npy          linear model weights, one row per class
+    intercept.npy     linear model intercepts
+
+Arrays are loaded with np.load(mmap_mode='r'), so loading is nearly free and
+worker processes that load the same artifact share its pages. Column j of
+the model is the j-th entry of the sorted vocabulary, so n-grams are looked
+up by binary search and no Python dictionary is rebuilt at load time.
+Loading imports neither scipy nor sklearn; they are imported when
+CompactModel first vectorizes texts.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+ARTIFACT_DIR = os.path.join("models", "classifier_model")
+ARTIFACT_FORMAT_VERSION = 1
+
+# Tokenizer settings copied into meta.json; they rebuild the exact analyzer
+ANALYZER_PARAMS = ('lowercase', 'token_pattern', 'ngram_range', 'strip_accents', 'stop_words')
+
+
+def split_vectorizer(vectorizer):
+    """Return (token vectorizer, tf-idf step or None) for a fitted vectorizer step."""
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+    from sklearn.pipeline import Pipeline
+    
+    if isinstance(vectorizer, Pipeline):
+        steps = [step for _, step in vectorizer.steps]
+        if len(steps) == 2 and isinstance(steps[0], HashingVectorizer) and isinstance(steps[1], TfidfTransformer):
+            return steps[0], steps[1]
+    elif isinstance(vectorizer, TfidfVectorizer):
+        return vectorizer, vectorizer
+    elif isinstance(vectorizer, HashingVectorizer):
+        return vectorizer, None
+    raise ValueError(f"Cannot export vectorizer of type {type(vectorizer).__name__}")
+
+
+def export_artifact(model, directory: str = ARTIFACT_DIR) -> str:
+    """
+    Export a fitted pipeline as a compact artifact directory.
+    
+    The directory is written next to its destination and swapped in, so
+    readers never see a partially written artifact.
+    
+    Args:
+        model: Fitted Pipeline with 'vectorizer' and 'classifier' steps
+        directory: Destination directory
+        
+    Returns:
+        str: Path to the artifact directory
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+    
+    vectorizer = model.named_steps['vectorizer']
+    classifier = model.named_steps['classifier']
+    tokens, tfidf = split_vectorizer(vectorizer)
+    
+    meta = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'vectorizer': 'hashing' if isinstance(tokens, HashingVectorizer) else 'tfidf',
+        'analyzer': {name: getattr(tokens, name) for name in ANALYZER_PARAMS},
+        'sublinear_tf': bool(tfidf.sublinear_tf) if tfidf is not None else False,
+        'use_idf': bool(tfidf.use_idf) if tfidf is not None else False,
+        'norm': tfidf.norm if tfidf is not None else tokens.norm,
+        'classes': [str(label) for label in classifier.classes_],
+        'corpus_fingerprint': getattr(model, 'corpus_fingerprint_', None),
+        'vectorizer_mode': getattr(model, 'vectorizer_mode_', None),
+    }
+    
+    arrays = {
+        'coef': np.ascontiguousarray(classifier.coef_, dtype=np.float64),
+        'intercept': np.ascontiguousarray(classifier.intercept_, dtype=np.float64),
+    }
+    if meta['vectorizer'] == 'hashing':
+        meta['n_features'] = tokens.n_features
+        meta['alternate_sign'] = bool(tokens.alternate_sign)
+    else:
+        # sklearn sorts the vocabulary, so column order is alphabetical
+        terms = sorted(tokens.vocabulary_, key=tokens.vocabulary_.get)
+        if terms != sorted(terms):
+            raise ValueError("Vectorizer columns are not in sorted vocabulary order")
+        arrays['vocabulary'] = np.array([term.encode('utf-8') for term in terms], dtype=np.bytes_)
+        meta['n_features'] = len(terms)
+    if meta['use_idf']:
+        arrays['idf'] = np.ascontiguousarray(tfidf.idf_, dtype=np.float64)
+    
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, suffix='.tmp')
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), array, allow_pickle=False)
+        with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        
+        if os.path.exists(directory):
+            retired = tempfile.mkdtemp(dir=parent, suffix='.old')
+            os.replace(directory, os.path.join(retired, 'artifact'))
+            os.replace(staging, directory)
+            shutil.rmtree(retired)
+        else:
+            os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    
+    return directory
+
+
+class CompactModel:
+    """
+    Linear text classifier backed by the arrays of a compact artifact.
+    
+    Produces the same features, decision values and predictions as the
+    pipeline it was exported from, without sklearn estimators.
+    
+    Args:
+        meta: The artifact's meta.json contents
+        arrays: Dictionary of the artifact's NumPy arrays
+    """
+    
+    def __init__(self, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.meta = meta
+        self.classes_ = np.array(meta['classes'])
+        self.coef_ = arrays['coef']
+        self.intercept_ = arrays['intercept']
+        self.idf_ = arrays.get('idf')
+        self.vocabulary = arrays.get('vocabulary')
+        self.n_features = meta['n_features']
+        self.corpus_fingerprint_ = meta.get('corpus_fingerprint')
+        self.vectorizer_mode_ = meta.get('vectorizer_mode')
+        self._hashing = None
+        self._analyzer = None
+    
+    def _build_analyzer(self) -> None:
+        """Build the sklearn tokenizer on first use, so loading does not import sklearn."""
+        from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+        
+        analyzer_params = dict(self.meta['analyzer'], ngram_range=tuple(self.meta['analyzer']['ngram_range']))
+        if self.meta['vectorizer'] == 'hashing':
+            # Stateless, so constructing it costs nothing
+            self._hashing = HashingVectorizer(n_features=self.n_features,
+                                              alternate_sign=self.meta.get('alternate_sign', False),
+                                              norm=None, **analyzer_params)
+        else:
+            self._analyzer = TfidfVectorizer(**analyzer_params).build_analyzer()
+    
+    def _count(self, texts: List[str]):
+        """Return the n-gram count matrix of texts."""
+        import scipy.sparse as sp
+        
+        if self._hashing is None and self._analyzer is None:
+            self._build_analyzer()
+        if self._hashing is not None:
+            return self._hashing.transform(texts)
+        
+        indptr = [0]
+        grams = []
+        for text in texts:
+            grams.extend(self._analyzer(text))
+            indptr.append(len(grams))
+        rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        
+        # Binary search of the sorted vocabulary; out-of-vocabulary n-grams are dropped
+        keys = np.array([gram.encode('utf-8') for gram in grams], dtype=np.bytes_)
+        if not len(keys) or not len(self.vocabulary):
+            return sp.csr_matrix((len(texts), self.n_features))
+        columns = np.searchsorted(self.vocabulary, keys)
+        columns[columns == len(self.vocabulary)] = 0
+        found = self.vocabulary[columns] == keys
+        
+        counts = sp.csr_matrix(
+            (np.ones(found.sum()), (rows[found], columns[found])),
+            shape=(len(texts), self.n_features)
+        )
+        counts.sum_duplicates()
+        return counts
+    
+    def transform(self, texts: List[str]):
+        """
+        Compute the TF-IDF features of texts.
+        
+        Args:
+            texts: Texts to vectorize
+            
+        Returns:
+            scipy.sparse.csr_matrix with one row per text
+        """
+        features = self._count(texts).astype(np.float64)
+        if self.meta['sublinear_tf']:
+            np.log(features.data, features.data)
+            features.data += 1
+        if self.idf_ is not None:
+            features.data *= self.idf_[features.indices]
+        if self.meta['norm'] == 'l2':
+            norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+        elif self.meta['norm'] == 'l1':
+            norms = np.asarray(abs(features).sum(axis=1)).ravel()
+        else:
+            return features
+        norms[norms == 0] = 1
+        features.data /= np.repeat(norms, np.diff(features.indptr))
+        return features
+    
+    def decision_function(self, texts: List[str]) -> np.ndarray:
+        """
+        Compute the linear model's decision values.
+        
+        Args:
+            texts: Texts to score
+            
+        Returns:
+            Array of shape (n_texts,) for two classes, else (n_texts, n_classes)
+        """
+        scores = self.transform(texts) @ self.coef_.T + self.intercept_
+        return scores.ravel() if scores.shape[1] == 1 else scores
+    
+    def predict(self, texts: List[str]) -> np.ndarray:
+        """
+        Predict the category of each text.
+        
+        Args:
+            texts: Texts to classify
+            
+        Returns:
+            Array of category labels
+        """
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+
+def load_artifact(directory: str = ARTIFACT_DIR, mmap_mode: Optional[str] = 'r') -> CompactModel:
+    """
+    Load a compact artifact.
+    
+    Args:
+        directory: Artifact directory written by export_artifact
+        mmap_mode: Passed to np.load; 'r' maps the arrays read-only and
+            shares them between processes, None reads them into memory
+            
+    Returns:
+        CompactModel: The loaded model
+    """
+    meta_path = os.path.join(directory, 'meta.json')
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"Model artifact {directory} not found")
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact format: {meta.get('format_version')}")
+    
+    arrays = {}
+    for name in ('coef', 'intercept', 'idf', 'vocabulary'):
+        path = os.path.join(directory, f"{name}.npy")
+        if os.path.exists(path):
+            arrays[name] = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+    return CompactModel(meta, arrays)
+
+
+if __name__ == "__main__":
+    from ml_logic import get_model
+    
+    path = export_artifact(get_model())
+    print(f"Model artifact exported to {path}")
@@ -0,0 +1,235 @@
+"""
+Profiling Hooks for Groq Classifier
+
+Opt-in cProfile and tracemalloc capture around training, batch
+classification and report loading. Profiling is off unless
+CLASSIFIER_PROFILE=on, enable() is called or a CLI is run with --profile.
+
+Each profiled call writes three files to data/profiles/, named
+<name>-<timestamp>-<pid>-<n>:
+
+    .prof        cProfile statistics (pstats, snakeviz, gprof2dot)
+    .folded      folded stacks in microseconds, for flamegraph.pl,
+                 speedscope or inferno
+    .alloc.txt   peak traced memory and the top allocation sites
+
+Usage:
+    CLASSIFIER_PROFILE=on python data_utils.py
+    python benchmarks.py --profile suite --sizes 1000
+"""
+
+import cProfile
+import functools
+import itertools
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Dict, Optional
+
+PROFILE_DIR = os.path.join("data", "profiles")
+
+# Number of allocation sites listed in each .alloc.txt report
+TOP_ALLOCATIONS = 25
+
+# Stack paths shorter than this many microseconds are left out of .folded files
+MIN_FOLDED_MICROSECONDS = 1
+
+_enabled = os.getenv("CLASSIFIER_PROFILE", "off") == "on"
+_active_lock = threading.Lock()
+_active = False
+_sequence = itertools.count(1)
+
+
+def enable() -> None:
+    """Start profiling the hooked functions."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop profiling the hooked functions."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """Return whether profiling is on."""
+    return _enabled
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        # Built-in functions, e.g. "<method 'sort' of 'list' objects>"
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def folded_stacks(stats: pstats.Stats) -> Dict[str, int]:
+    """
+    Convert cProfile statistics to folded stacks.
+    
+    cProfile records caller-callee edges rather than whole stacks, so each
+    function's time is split between its call paths in proportion to the
+    time its callers spent in it, as flameprof and similar tools do.
+    Recursive calls are folded into the outermost frame.
+    
+    Args:
+        stats: Statistics of a finished profile
+        
+    Returns:
+        Dictionary of "root;caller;function" stack to self time in microseconds
+    """
+    entries = stats.stats
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, edge_time) in callers.items():
+            callees[caller].append((func, edge_time))
+    # The profiler's own exit is not part of the profiled code
+    roots = [func for func, entry in entries.items()
+             if func[0] != __file__ and not any(caller in entries for caller in entry[4])]
+    
+    folded = Counter()
+    
+    def walk(func, path, on_path, share):
+        _, _, self_time, total_time, _ = entries[func]
+        path = f"{path};{_label(func)}" if path else _label(func)
+        folded[path] += self_time * share * 1e6
+        for callee, edge_time in callees.get(func, ()):
+            callee_total = entries[callee][3]
+            time_here = edge_time * share
+            if callee in on_path or callee_total <= 0 or time_here * 1e6 < MIN_FOLDED_MICROSECONDS:
+                continue
+            walk(callee, path, on_path | {callee}, time_here / callee_total)
+    
+    for root in roots:
+        walk(root, "", {root}, 1.0)
+    return {path: round(value) for path, value in folded.items() if round(value) >= MIN_FOLDED_MICROSECONDS}
+
+
+def _write_reports(name: str, profiler: cProfile.Profile, before, after, peak: int,
+                   seconds: float, directory: str) -> Dict[str, str]:
+    """Write the .prof, .folded and .alloc.txt files of one profiled call."""
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}")
+    paths = {"prof": base + ".prof", "folded": base + ".folded", "alloc": base + ".alloc.txt"}
+    
+    profiler.dump_stats(paths["prof"])
+    stats = pstats.Stats(profiler)
+    with open(paths["folded"], "w", encoding="utf-8") as f:
+        for path, microseconds in sorted(folded_stacks(stats).items()):
+            f.write(f"{path} {microseconds}\n")
+    
+    with open(paths["alloc"], "w", encoding="utf-8") as f:
+        f.write(f"{name}: {seconds:.3f} s, peak traced memory {peak / 2 ** 20:.1f} MB\n\n")
+        # Leave out tracemalloc's own bookkeeping
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        before = before.filter_traces(ignore)
+        after = after.filter_traces(ignore)
+        f.write(f"Top {TOP_ALLOCATIONS} allocation sites still held at the end (net growth):\n")
+        for difference in after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]:
+            f.write(f"{difference}\n")
+        f.write(f"\nTop {TOP_ALLOCATIONS} allocation sites by memory held at the end:\n")
+        for statistic in after.statistics("lineno")[:TOP_ALLOCATIONS]:
+            f.write(f"{statistic}\n")
+    return paths
+
+
+class ProfileCapture:
+    """
+    Context manager profiling the code inside it when profiling is on.
+    
+    Nested profiles are folded into the outermost one, and only one call is
+    profiled at a time in a process: a second thread entering a profile
+    while one is running is not profiled. After the block, paths holds the
+    files written (empty if nothing was profiled).
+    
+    Args:
+        name: Prefix of the output files, e.g. "batch_classify"
+        directory: Where to write them, defaults to PROFILE_DIR
+        force: Profile even if profiling is off
+    """
+    
+    def __init__(self, name: str, directory: Optional[str] = None, force: bool = False):
+        self.name = name
+        self.directory = directory or PROFILE_DIR
+        self.force = force
+        self.paths = {}
+        self._profiler = None
+    
+    def __enter__(self):
+        global _active
+        if not (_enabled or self.force):
+            return self
+        with _active_lock:
+            if _active:
+                return self
+            _active = True
+        
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+        self._start = time.perf_counter()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active
+        if self._profiler is None:
+            return False
+        self._profiler.disable()
+        seconds = time.perf_counter() - self._start
+        try:
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            if self._started_tracing:
+                tracemalloc.stop()
+            self.paths = _write_reports(self.name, self._profiler, self._before, after, peak, seconds, self.directory)
+        finally:
+            self._profiler = self._before = None
+            with _active_lock:
+                _active = False
+        return False
+
+
+def profile(name: str, directory: Optional[str] = None, force: bool = False) -> ProfileCapture:
+    """
+    Profile a block of code when profiling is on.
+    
+    Args:
+        name: Prefix of the output files, e.g. "batch_classify"
+        directory: Where to write them, defaults to PROFILE_DIR
+        force: Profile even if profiling is off
+        
+    Returns:
+        ProfileCapture: Context manager whose paths lists the files written
+    """
+    return ProfileCapture(name, directory, force)
+
+
+def profiled(name: str):
+    """
+    Decorate a function so that each call is profiled when profiling is on.
+    
+    Args:
+        name: Prefix of the output files
+        
+    Returns:
+        The decorator; while profiling is off the wrapper only checks a flag
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with profile(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
@@ -5,14 +5,14 @@ A Streamlit dashboard for analyzing classification results.
 """
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import os
-import glob
 from typing import List, Dict, Any
-import matplotlib.pyplot as plt
 import datetime
 from data_utils import export_classification_stats, batch_classify, save_classification_results
+import results_store
+from profiling import profiled
+
+# Number of most recent results shown in the raw data table
+RAW_DATA_ROWS = 1000
 
 # Set page config
 st.set_page_config(
@@ -57,48 +57,49 @@ def add_custom_css():
     """, unsafe_allow_html=True)
 
 
-def load_saved_data():
-    """Load all saved classification results"""
-    data_dir = "data"
-    
-    # Create data directory if it doesn't exist
-    os.makedirs(data_dir, exist_ok=True)
-    
-    # Find all CSV files in the data directory
-    csv_files = glob.glob(os.path.join(data_dir, "classification_results_*.csv"))
-    
-    if not csv_files:
+@profiled("load_saved_data")
+def load_saved_data(categories=None, start=None, end=None, limit=None):
+    """Load saved classification results matching the filters, newest first"""
+    # Import result CSVs written since the last load; unchanged files are skipped
+    try:
+        results_store.ingest_csv_files()
+    except Exception as e:
+        st.warning(f"Error importing result files: {str(e)}")
+    
+    df = results_store.query_results(categories=categories, start=start, end=end, limit=limit)
+    
+    if df.empty:
         return None
     
-    # Load and combine all CSV files
-    dataframes = []
-    for file in csv_files:
-        try:
-            df = pd.read_csv(file)
-            # Add a column for the file name (for tracking)
-            df['source_file'] = os.path.basename(file)
-            # Extract timestamp from filename
-            timestamp_str = os.path.basename(file).replace("classification_results_", "").replace(".csv", "")
-            try:
-                timestamp = datetime.datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                df['timestamp'] = timestamp
-            except:
-                df['timestamp'] = None
-                
-            dataframes.append(df)
-        except Exception as e:
-            st.warning(f"Error loading file {file}: {str(e)}")
-    
-    if not dataframes:
-        return None
-        
-    # Combine all dataframes
-    combined_df = pd.concat(dataframes, ignore_index=True)
-    return combined_df
+    return df
+
+
+# The cached readers below take the store version as their first argument, so
+# Streamlit reruns reuse them until new results are written to the store
+
+@st.cache_data(show_spinner=False)
+def load_filter_options(version):
+    """Categories and time range present in the results store"""
+    first, last = results_store.time_range()
+    return results_store.list_categories(), first, last
+
+
+@st.cache_data(show_spinner=False)
+def load_summary(version, categories, start, end):
+    """Merged aggregates for the filtered results"""
+    return results_store.summarize_results(list(categories) if categories is not None else None, start, end)
+
+
+@st.cache_data(show_spinner=False)
+def load_recent_results(version, categories, start, end, limit):
+    """Most recent filtered results"""
+    return results_store.query_results(list(categories) if categories is not None else None, start, end, limit)
 
 
 def display_classification_stats():
     """Display statistics about the classifier"""
+    import matplotlib.pyplot as plt
+    
     stats = export_classification_stats()
     
     st.markdown("### Classifier Statistics")
@@ -174,12 +175,19 @@ def batch_classification_tool():
                 st.warning("Please enter at least one text to classify.")
                 return
                 
+            import matplotlib.pyplot as plt
+            import pandas as pd
+            
             with st.spinner("Classifying texts..."):
                 # Classify each text
                 results = batch_classify(texts)
                 
-                # Create a dataframe with the results
-                df = pd.DataFrame(results, columns=['Text', 'Category', 'Description'])
+                # Create a dataframe with the results; confidence and rule come
+                # from the same decision pass as the category
+                df = pd.DataFrame([
+                    (text, category, round(result.confidence, 3), result.rule, description)
+                    for text, category, description, result in results
+                ], columns=['Text', 'Category', 'Confidence', 'Rule', 'Description'])
                 
                 # Save results to CSV
                 texts_list = df['Text'].tolist()
@@ -232,23 +240,48 @@ def batch_classification_tool():
             st.warning("Please enter some text to classify.")
 
 
+@profiled("historical_data_analysis")
 def historical_data_analysis():
     """Analyze historical classification data"""
     st.markdown("### Historical Data Analysis")
     
-    # Load saved data
-    df = load_saved_data()
+    # Import new or changed result files (detected by mtime and size), then
+    # filter and aggregate inside the store
+    try:
+        results_store.ingest_csv_files()
+    except Exception as e:
+        st.warning(f"Error importing result files: {str(e)}")
     
-    if df is None or df.empty:
+    version = results_store.store_version()
+    all_categories, first, last = load_filter_options(version)
+    if not all_categories:
         st.info("No historical data found. Use the Batch Classification Tool to generate data.")
         return
     
+    # Filters are pushed down to indexed queries on category and timestamp
+    selected_categories = st.multiselect("Categories", all_categories, default=all_categories)
+    selected_categories = None if set(selected_categories) == set(all_categories) else tuple(selected_categories)
+    start = end = None
+    if first and last:
+        date_range = st.date_input("Date range", value=(first.date(), last.date()),
+                                   min_value=first.date(), max_value=last.date())
+        # The full range applies no filter, so results without a timestamp stay visible
+        if (isinstance(date_range, (list, tuple)) and len(date_range) == 2
+                and tuple(date_range) != (first.date(), last.date())):
+            start = datetime.datetime.combine(date_range[0], datetime.time.min)
+            end = datetime.datetime.combine(date_range[1], datetime.time.min) + datetime.timedelta(days=1)
+    
+    summary = load_summary(version, selected_categories, start, end)
+    if summary['total'] == 0:
+        st.info("No results match the selected filters.")
+        return
+    
     # Show summary statistics
     st.markdown("#### Overview")
     
-    total_classifications = len(df)
-    unique_texts = df['Text'].nunique()
-    data_sources = df['source_file'].nunique()
+    total_classifications = summary['total']
+    unique_texts = summary['unique_texts']
+    data_sources = summary['sources']
     
     col1, col2, col3 = st.columns(3)
     
@@ -277,9 +310,11 @@ def historical_data_analysis():
         """, unsafe_allow_html=True)
     
     # Category distribution
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    
     st.markdown("#### Category Distribution")
-    category_counts = df['Category'].value_counts().reset_index()
-    category_counts.columns = ['Category', 'Count']
+    category_counts = pd.DataFrame(list(summary['category_counts'].items()), columns=['Category', 'Count'])
     
     col1, col2 = st.columns([1, 2])
     
@@ -306,8 +341,11 @@ def historical_data_analysis():
         
         st.pyplot(fig)
     
-    # Show the raw data
+    # Show the most recent raw data; only these rows are read from the store
     st.markdown("#### Raw Data")
+    df = load_recent_results(version, selected_categories, start, end, RAW_DATA_ROWS)
+    if total_classifications > RAW_DATA_ROWS:
+        st.caption(f"Showing the {RAW_DATA_ROWS} most recent of {total_classifications} results.")
     st.dataframe(df, use_container_width=True)
 
 
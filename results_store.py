@@ -0,0 +1,403 @@
+"""
+Results Store for Groq Classifier
+
+An append-only SQLite store for classification results. Each export appends
+rows in one transaction, and reads push category and time filters down to
+indexed SQL queries instead of loading the whole history.
+
+Results saved as data/classification_results_*.csv by earlier versions are
+imported incrementally: each file is ingested once and re-ingested only if
+its modification time or size changes.
+
+Summaries are materialized at write time: every source keeps per category
+and per day row counts plus an index of text hashes, which reads merge with
+small GROUP BY queries instead of scanning the results table.
+"""
+
+import csv
+import datetime
+import glob
+import hashlib
+import os
+import sqlite3
+from collections import Counter
+from contextlib import closing
+from typing import List, Dict, Any, Iterable, Optional
+
+RESULTS_DB_PATH = os.path.join("data", "classification_results.sqlite3")
+
+# Legacy per-export CSV files, imported into the store on read
+LEGACY_CSV_PATTERN = os.path.join("data", "classification_results_*.csv")
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DAY_FORMAT = "%Y-%m-%d"
+
+# Bump when the aggregate tables change shape, so they are rebuilt from results
+AGGREGATES_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    category TEXT NOT NULL,
+    timestamp TEXT,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_category ON results (category, timestamp);
+CREATE INDEX IF NOT EXISTS results_timestamp ON results (timestamp);
+CREATE INDEX IF NOT EXISTS results_source ON results (source);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    name TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    source TEXT NOT NULL,
+    category TEXT NOT NULL,
+    day TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    PRIMARY KEY (source, category, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS aggregates_category_day ON aggregates (category, day);
+CREATE TABLE IF NOT EXISTS text_index (
+    category TEXT NOT NULL,
+    day TEXT NOT NULL,
+    text_hash INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (category, day, text_hash, source)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS text_index_source ON text_index (source);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Open the results store, creating the database and its schema if needed.
+    
+    Args:
+        path: Path to the database file, defaults to RESULTS_DB_PATH
+        
+    Returns:
+        An open SQLite connection
+    """
+    path = path or RESULTS_DB_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    # WAL lets the dashboard read while a batch is being appended
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    _ensure_aggregates(conn)
+    return conn
+
+
+def _text_hash(text: str) -> int:
+    """Return a signed 64-bit hash of a text, used to count distinct texts."""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def _meta(conn: sqlite3.Connection, key: str) -> Optional[int]:
+    row = conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _bump_version(conn: sqlite3.Connection) -> None:
+    """Increment the store version; call inside the write transaction."""
+    conn.execute(
+        "INSERT INTO store_meta (key, value) VALUES ('version', 1) "
+        "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+    )
+
+
+def _ensure_aggregates(conn: sqlite3.Connection) -> None:
+    """Build the aggregate tables from results if they are missing or outdated."""
+    if _meta(conn, 'aggregates_version') == AGGREGATES_VERSION:
+        return
+    
+    conn.create_function('text_hash', 1, _text_hash, deterministic=True)
+    with conn:
+        conn.execute("DELETE FROM aggregates")
+        conn.execute("DELETE FROM text_index")
+        conn.execute(
+            "INSERT INTO aggregates (source, category, day, rows) "
+            "SELECT source, category, COALESCE(substr(timestamp, 1, 10), ''), COUNT(*) "
+            "FROM results GROUP BY 1, 2, 3"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO text_index (category, day, text_hash, source) "
+            "SELECT category, COALESCE(substr(timestamp, 1, 10), ''), text_hash(text), source FROM results"
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('aggregates_version', ?)",
+            (AGGREGATES_VERSION,)
+        )
+        _bump_version(conn)
+
+
+def _insert_rows(conn: sqlite3.Connection, rows: List[tuple]) -> int:
+    """
+    Insert (text, category, timestamp, source) rows and update the aggregates.
+    
+    Must be called inside a transaction, so the rows and their summaries are
+    committed together.
+    """
+    conn.executemany("INSERT INTO results (text, category, timestamp, source) VALUES (?, ?, ?, ?)", rows)
+    
+    counts = Counter((source, category, timestamp[:10] if timestamp else '') for _, category, timestamp, source in rows)
+    conn.executemany(
+        "INSERT INTO aggregates (source, category, day, rows) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(source, category, day) DO UPDATE SET rows = rows + excluded.rows",
+        [(source, category, day, count) for (source, category, day), count in counts.items()]
+    )
+    # Sorted in key order, the index entries are appended instead of scattered
+    conn.executemany(
+        "INSERT OR IGNORE INTO text_index (category, day, text_hash, source) VALUES (?, ?, ?, ?)",
+        sorted({(category, timestamp[:10] if timestamp else '', _text_hash(text), source)
+                for text, category, timestamp, source in rows})
+    )
+    _bump_version(conn)
+    return len(rows)
+
+
+def _delete_source(conn: sqlite3.Connection, source: str) -> None:
+    """Delete a source's rows and summaries; call inside a transaction."""
+    conn.execute("DELETE FROM results WHERE source = ?", (source,))
+    conn.execute("DELETE FROM aggregates WHERE source = ?", (source,))
+    conn.execute("DELETE FROM text_index WHERE source = ?", (source,))
+
+
+def store_version(path: Optional[str] = None) -> int:
+    """
+    Return a counter that changes whenever results are written.
+    
+    Args:
+        path: Path to the database file, defaults to RESULTS_DB_PATH
+        
+    Returns:
+        The current store version, usable as a cache key
+    """
+    with closing(connect(path)) as conn:
+        return _meta(conn, 'version') or 0
+
+
+def new_source_name() -> str:
+    """Return a source name for an export, made from the current time."""
+    return "batch_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+
+def append_results(texts: Iterable[str], categories: Iterable[str], source: Optional[str] = None,
+                   timestamp: Optional[datetime.datetime] = None, path: Optional[str] = None,
+                   conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Append classification results to the store in one transaction.
+    
+    Args:
+        texts: Texts that were classified
+        categories: Category assigned to each text
+        source: Name of the export the rows belong to, defaults to a new batch name
+        timestamp: Time of the export, defaults to now
+        path: Path to the database file, defaults to RESULTS_DB_PATH
+        conn: Optional open connection to reuse instead of path
+        
+    Returns:
+        Number of rows appended
+    """
+    source = source or new_source_name()
+    timestamp = (timestamp or datetime.datetime.now()).strftime(TIMESTAMP_FORMAT)
+    rows = [(text, category, timestamp, source) for text, category in zip(texts, categories)]
+    
+    owned = conn is None
+    conn = conn or connect(path)
+    try:
+        with conn:
+            return _insert_rows(conn, rows)
+    finally:
+        if owned:
+            conn.close()
+
+
+def _legacy_timestamp(filename: str) -> Optional[str]:
+    """Parse the timestamp out of a classification_results_<ts>.csv name."""
+    stamp = filename.replace("classification_results_", "").replace(".csv", "")
+    try:
+        return datetime.datetime.strptime(stamp, "%Y%m%d_%H%M%S").strftime(TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def mark_ingested(conn: sqlite3.Connection, filepath: str, rows: int) -> None:
+    """Record a CSV file's current signature so ingest_csv_files skips it."""
+    stat = os.stat(filepath)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO ingested_files (name, mtime_ns, size, rows) VALUES (?, ?, ?, ?)",
+            (os.path.basename(filepath), stat.st_mtime_ns, stat.st_size, rows)
+        )
+
+
+def ingest_csv_files(pattern: Optional[str] = None, path: Optional[str] = None) -> List[str]:
+    """
+    Import new or changed result CSV files into the store.
+    
+    Files whose modification time and size match the last ingest are skipped,
+    so calling this on every dashboard load only reads files that changed.
+    A changed file replaces the rows previously imported from it.
+    
+    Args:
+        pattern: Glob pattern of the CSV files to import, defaults to LEGACY_CSV_PATTERN
+        path: Path to the database file, defaults to RESULTS_DB_PATH
+        
+    Returns:
+        Names of the files that were (re)ingested
+    """
+    ingested = []
+    with closing(connect(path)) as conn:
+        known = {
+            name: (mtime_ns, size)
+            for name, mtime_ns, size in conn.execute("SELECT name, mtime_ns, size FROM ingested_files")
+        }
+        for filepath in sorted(glob.glob(pattern or LEGACY_CSV_PATTERN)):
+            name = os.path.basename(filepath)
+            stat = os.stat(filepath)
+            if known.get(name) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            
+            timestamp = _legacy_timestamp(name)
+            with open(filepath, 'r', newline='', encoding='utf-8') as csvfile:
+                reader = csv.DictReader(csvfile)
+                rows = [
+                    (row['Text'], row['Category'], timestamp, name)
+                    for row in reader if row.get('Text') and row.get('Category')
+                ]
+            with conn:
+                _delete_source(conn, name)
+                _insert_rows(conn, rows)
+                conn.execute(
+                    "INSERT OR REPLACE INTO ingested_files (name, mtime_ns, size, rows) VALUES (?, ?, ?, ?)",
+                    (name, stat.st_mtime_ns, stat.st_size, len(rows))
+                )
+            ingested.append(name)
+    return ingested
+
+
+def _where(categories: Optional[List[str]], start: Optional[datetime.datetime],
+           end: Optional[datetime.datetime], time_column: str = "timestamp",
+           time_format: str = TIMESTAMP_FORMAT):
+    """Build a WHERE clause and parameters for the common filters."""
+    clauses = []
+    params = []
+    if categories is not None:
+        clauses.append(f"category IN ({', '.join('?' * len(categories))})" if categories else "0")
+        params.extend(categories)
+    if start is not None:
+        clauses.append(f"{time_column} >= ?")
+        params.append(start.strftime(time_format))
+    if end is not None:
+        clauses.append(f"{time_column} < ?")
+        params.append(end.strftime(time_format))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _is_day_boundary(value: Optional[datetime.datetime]) -> bool:
+    return value is None or value.time() == datetime.time.min
+
+
+def query_results(categories: Optional[List[str]] = None, start: Optional[datetime.datetime] = None,
+                  end: Optional[datetime.datetime] = None, limit: Optional[int] = None,
+                  path: Optional[str] = None):
+    """
+    Read stored results matching the filters, newest first.
+    
+    Args:
+        categories: Only return these categories (None for all)
+        start: Only return results at or after this time
+        end: Only return results before this time
+        limit: Maximum number of rows to return
+        path: Path to the database file, defaults to RESULTS_DB_PATH
+        
+    Returns:
+        DataFrame with Text, Category, source_file and timestamp columns
+    """
+    import pandas as pd
+    
+    where, params = _where(categories, start, end)
+    sql = ("SELECT text AS Text, category AS Category, source AS source_file, timestamp FROM results"
+           + where + " ORDER BY timestamp DESC, id DESC")
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    
+    with closing(connect(path)) as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format=TIMESTAMP_FORMAT)
+    return df
+
+
+def summarize_results(categories: Optional[List[str]] = None, start: Optional[datetime.datetime] = None,
+                      end: Optional[datetime.datetime] = None, path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Aggregate stored results matching the filters without loading the rows.
+    
+    Filters on whole days are answered from the materialized per-source
+    summaries; other time bounds fall back to an indexed scan of the results.
+    
+    Args:
+        categories: Only count these categories (None for all)
+        start: Only count results at or after this time
+        end: Only count results before this time
+        path: Path to the database file, defaults to RESULTS_DB_PATH
+        
+    Returns:
+        Dictionary with 'total', 'unique_texts', 'sources' and 'category_counts'
+    """
+    with closing(connect(path)) as conn:
+        if _is_day_boundary(start) and _is_day_boundary(end):
+            where, params = _where(categories, start, end, time_column="day", time_format=DAY_FORMAT)
+            category_counts = dict(conn.execute(
+                "SELECT category, SUM(rows) FROM aggregates" + where
+                + " GROUP BY category ORDER BY SUM(rows) DESC", params
+            ).fetchall())
+            sources = conn.execute("SELECT COUNT(DISTINCT source) FROM aggregates" + where, params).fetchone()[0]
+            unique_texts = conn.execute(
+                "SELECT COUNT(DISTINCT text_hash) FROM text_index" + where, params
+            ).fetchone()[0]
+            total = sum(category_counts.values())
+        else:
+            where, params = _where(categories, start, end)
+            total, unique_texts, sources = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT text), COUNT(DISTINCT source) FROM results" + where, params
+            ).fetchone()
+            category_counts = dict(conn.execute(
+                "SELECT category, COUNT(*) FROM results" + where + " GROUP BY category ORDER BY COUNT(*) DESC",
+                params
+            ).fetchall())
+    
+    return {
+        "total": total,
+        "unique_texts": unique_texts,
+        "sources": sources,
+        "category_counts": category_counts,
+    }
+
+
+def list_categories(path: Optional[str] = None) -> List[str]:
+    """Return every category present in the store, read from the aggregates."""
+    with closing(connect(path)) as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT category FROM aggregates ORDER BY category")]
+
+
+def time_range(path: Optional[str] = None):
+    """Return the (earliest, latest) result timestamps, or (None, None) if empty."""
+    with closing(connect(path)) as conn:
+        first, last = conn.execute("SELECT MIN(timestamp), MAX(timestamp) FROM results").fetchone()
+    
+    def parse(value):
+        return datetime.datetime.strptime(value, TIMESTAMP_FORMAT) if value else None
+    
+    return parse(first), parse(last)
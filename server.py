@@ -0,0 +1,239 @@
+"""
+Inference Server for Groq Classifier
+
+A standalone ASGI service around ml_logic. Concurrent single-text requests
+are queued and coalesced into micro-batches, so many clients share one
+vectorized prediction instead of each paying for its own.
+
+Endpoints:
+    POST /classify        {"text": "..."}
+    POST /classify/batch  {"texts": ["...", "..."]}
+    GET  /healthz
+    GET  /metrics         Prometheus text; ?format=json for JSON
+
+Usage:
+    uvicorn server:app --host 0.0.0.0 --port 8000
+    python server.py --port 8000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from instrumentation import export_json, export_prometheus
+from ml_logic import classify_batch, get_category_description, get_classification_model, loaded_model_version
+
+# Micro-batching limits: a batch is sent as soon as it holds MAX_BATCH_SIZE
+# texts or its first text has waited MAX_WAIT_MS milliseconds
+MAX_BATCH_SIZE = int(os.getenv("CLASSIFIER_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("CLASSIFIER_MAX_WAIT_MS", "2"))
+
+# Largest number of texts accepted by one /classify/batch request
+MAX_REQUEST_TEXTS = int(os.getenv("CLASSIFIER_MAX_REQUEST_TEXTS", "10000"))
+
+
+class MicroBatcher:
+    """
+    Queue that coalesces single-text requests into batched predictions.
+    
+    Args:
+        classify: Function mapping a list of texts to a list of categories
+        max_batch_size: Most texts sent to classify at once
+        max_wait_ms: Longest time the first queued text waits for company
+    """
+    
+    def __init__(self, classify=classify_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.classify = classify
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self._queue = None
+        self._worker = None
+    
+    def start(self):
+        """Start the batching loop on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the batching loop."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+    
+    async def submit(self, text):
+        """
+        Queue a text and wait for its category.
+        
+        Args:
+            text (str): The text to classify
+            
+        Returns:
+            str: The predicted category
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                # Take what is already queued before waiting for more
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Requests whose client went away are dropped before predicting
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+            
+            self.requests += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+            
+            # Predict in a worker thread so the event loop keeps accepting requests
+            try:
+                categories = await loop.run_in_executor(None, self.classify, [text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), category in zip(batch, categories):
+                if not future.done():
+                    future.set_result(category)
+    
+    def stats(self):
+        """Return request and batch counters."""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+batcher = MicroBatcher()
+_state = {"model_ready": False, "started_at": None}
+
+
+def _result(text, category):
+    return {"text": text, "category": category, "description": get_category_description(category)}
+
+
+async def _read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def classify_endpoint(request: Request):
+    payload = await _read_json(request)
+    text = payload.get("text") if isinstance(payload, dict) else None
+    if not isinstance(text, str):
+        return JSONResponse({"error": 'Expected a JSON object with a "text" string'}, status_code=400)
+    
+    category = await batcher.submit(text)
+    return JSONResponse(_result(text, category))
+
+
+async def classify_batch_endpoint(request: Request):
+    payload = await _read_json(request)
+    texts = payload.get("texts") if isinstance(payload, dict) else None
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return JSONResponse({"error": 'Expected a JSON object with a "texts" list of strings'}, status_code=400)
+    if len(texts) > MAX_REQUEST_TEXTS:
+        return JSONResponse({"error": f"At most {MAX_REQUEST_TEXTS} texts per request"}, status_code=413)
+    
+    # Batch requests are already vectorized, so they skip the micro-batch queue
+    categories = await asyncio.get_running_loop().run_in_executor(None, classify_batch, texts)
+    return JSONResponse({"results": [_result(text, category) for text, category in zip(texts, categories)]})
+
+
+async def healthz(request: Request):
+    if not _state["model_ready"]:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    
+    # Report what is loaded; a probe must never trigger a load or a retrain
+    return JSONResponse({
+        "status": "ok",
+        "corpus_fingerprint": loaded_model_version(),
+        "uptime_seconds": round(time.monotonic() - _state["started_at"], 1),
+        "batching": batcher.stats(),
+    })
+
+
+async def metrics(request: Request):
+    # Empty unless recording is on (CLASSIFIER_METRICS=on)
+    if request.query_params.get("format") == "json":
+        return JSONResponse(export_json())
+    return PlainTextResponse(export_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm the model before accepting traffic
+    await asyncio.get_running_loop().run_in_executor(None, get_classification_model)
+    _state["model_ready"] = True
+    _state["started_at"] = time.monotonic()
+    batcher.start()
+    try:
+        yield
+    finally:
+        await batcher.stop()
+        _state["model_ready"] = False
+
+
+app = Starlette(
+    routes=[
+        Route("/classify", classify_endpoint, methods=["POST"]),
+        Route("/classify/batch", classify_batch_endpoint, methods=["POST"]),
+        Route("/healthz", healthz, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main() -> None:
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Run the Groq Classifier inference server")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    args = parser.parse_args()
+    
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,26 @@
+import asyncio
+import random
+import re
 import unittest
 from unittest.mock import patch, MagicMock
 from ml_logic import classify_text, get_category_description
+from cache import LRUCache, SQLiteCache, MISSING
+import ml_logic
+import incremental_training
+import model_artifact
+import inference
+import instrumentation
+import profiling
+import json
+import numpy as np
 import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
 
 class TestClassifier(unittest.TestCase):
     """Tests for the text classifier"""
@@ -39,6 +58,1006 @@ class TestClassifier(unittest.TestCase):
             self.assertNotEqual(description, "Unknown category")
 
 
+class TestModelLifecycle(unittest.TestCase):
+    """Tests for the shared model registry"""
+    
+    def setUp(self):
+        # Train, save and export into a scratch directory, with a fresh registry
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        corpus_path = os.path.join(tmp.name, "training_corpus.jsonl")
+        shutil.copyfile(ml_logic.TRAINING_CORPUS_PATH, corpus_path)
+        model_dir = os.path.join(tmp.name, "models")
+        for patcher in (
+            patch.object(ml_logic, 'TRAINING_CORPUS_PATH', corpus_path),
+            patch.object(ml_logic, 'MODEL_DIR', model_dir),
+            patch.object(ml_logic, 'ARTIFACT_DIR', os.path.join(model_dir, "classifier_model")),
+            patch.dict(ml_logic._model_registry, {'model': None, 'fingerprint': None}),
+            patch.dict(ml_logic._compact_registry, {'model': None}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(ml_logic.clear_prediction_cache)
+    
+    def test_model_is_reused_between_predictions(self):
+        """Test that classify_text does not retrain on every call"""
+        model = ml_logic.get_model()
+        with patch('ml_logic.train_classifier') as mock_train:
+            classify_text("I love this product")
+            classify_text("When will my order arrive?")
+            mock_train.assert_not_called()
+        self.assertIs(ml_logic.get_model(), model)
+    
+    def test_retrain_replaces_model(self):
+        """Test that an explicit retrain registers a new model"""
+        model = ml_logic.get_model()
+        retrained = ml_logic.retrain_model()
+        self.assertIsNot(retrained, model)
+        self.assertIs(ml_logic.get_model(), retrained)
+    
+    def test_corpus_change_triggers_retrain(self):
+        """Test that a different corpus fingerprint invalidates the model"""
+        model = ml_logic.get_model()
+        examples, categories, fingerprint = ml_logic.load_training_corpus()
+        changed = ml_logic.TrainingCorpus(examples, categories, fingerprint + "-changed")
+        with patch('ml_logic.load_training_corpus', return_value=changed):
+            retrained = ml_logic.get_model()
+            self.assertIsNot(retrained, model)
+            self.assertEqual(retrained.corpus_fingerprint_, fingerprint + "-changed")
+    
+    def test_memory_mapped_load(self):
+        """Test that load_model can map the model's arrays instead of copying them"""
+        model = ml_logic.get_model()
+        filename = 'test_mmap_model.joblib'
+        ml_logic.save_model(model, filename)
+        try:
+            mapped = ml_logic.load_model(filename, mmap_mode='r')
+            self.assertIsInstance(mapped.named_steps['classifier'].coef_, np.memmap)
+            self.assertNotIsInstance(ml_logic.load_model(filename).named_steps['classifier'].coef_, np.memmap)
+            texts = TestBatchClassification.texts
+            self.assertEqual(list(mapped.predict(texts)), list(model.predict(texts)))
+        finally:
+            os.remove(os.path.join(ml_logic.MODEL_DIR, filename))
+
+
+class TestHashingVectorizer(unittest.TestCase):
+    """Tests for the hashing vectorizer mode"""
+    
+    def test_hashing_pipeline(self):
+        """Test that hashing mode trains without a vocabulary and classifies the corpus"""
+        examples, categories = ml_logic.get_training_data()
+        model = ml_logic.train_classifier(examples, categories, vectorizer='hashing', n_features=2 ** 16)
+        vectorizer = model.named_steps['vectorizer']
+        self.assertFalse(hasattr(vectorizer.named_steps['hashing'], 'vocabulary_'))
+        self.assertEqual(model.named_steps['classifier'].coef_.shape[1], 2 ** 16)
+        self.assertEqual(model.vectorizer_mode_, 'hashing')
+        accuracy = sum(p == c for p, c in zip(model.predict(examples), categories)) / len(categories)
+        self.assertGreater(accuracy, 0.9)
+    
+    def test_hashing_is_stateless(self):
+        """Test that hashed features do not depend on which texts are transformed together"""
+        hashing = ml_logic.build_vectorizer('hashing', n_features=2 ** 16).named_steps['hashing']
+        texts = TestBatchClassification.texts
+        whole = hashing.transform(texts)
+        parts = [hashing.transform(texts[:3]), hashing.transform(texts[3:])]
+        self.assertEqual((whole[:3] != parts[0]).nnz + (whole[3:] != parts[1]).nnz, 0)
+    
+    def test_unknown_mode(self):
+        """Test that an unknown vectorizer mode is rejected"""
+        with self.assertRaises(ValueError):
+            ml_logic.build_pipeline('bag-of-words')
+
+
+class TestIncrementalTraining(unittest.TestCase):
+    """Tests for out-of-core training with partial_fit"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.corpus_path = os.path.join(self.tmpdir.name, 'labelled.jsonl')
+        self.checkpoint_path = os.path.join(self.tmpdir.name, 'checkpoint.joblib')
+        examples, categories = ml_logic.get_training_data()
+        # A shuffled stream of several passes over the corpus, like a large labelled feed
+        self.records = [{"text": text, "category": category} for text, category in zip(examples, categories)] * 10
+        random.Random(0).shuffle(self.records)
+        self.write_records(self.records)
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def write_records(self, records, mode='w'):
+        with open(self.corpus_path, mode, encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    
+    def train(self, checkpoint_path=None, **kwargs):
+        return incremental_training.train_incremental(
+            [self.corpus_path], checkpoint_path or self.checkpoint_path,
+            chunk_size=100, n_features=2 ** 16, **kwargs
+        )
+    
+    def test_streaming_training(self):
+        """Test that chunked partial_fit learns the corpus into a usable pipeline"""
+        checkpoint = self.train()
+        self.assertEqual(checkpoint['examples_seen'], len(self.records))
+        model = incremental_training.checkpoint_pipeline(checkpoint)
+        predictions = model.predict([record['text'] for record in self.records])
+        accuracy = sum(p == r['category'] for p, r in zip(predictions, self.records)) / len(self.records)
+        self.assertGreater(accuracy, 0.9)
+    
+    def test_resume_matches_uninterrupted_run(self):
+        """Test that resuming from a checkpoint gives the same weights as one uninterrupted run"""
+        uninterrupted = self.train(os.path.join(self.tmpdir.name, 'uninterrupted.joblib'))
+        
+        def interrupt(seen):
+            if seen >= 300:
+                raise KeyboardInterrupt
+        with self.assertRaises(KeyboardInterrupt):
+            self.train(checkpoint_every=1, progress_callback=interrupt)
+        self.assertEqual(incremental_training.load_checkpoint(self.checkpoint_path)['examples_seen'], 300)
+        
+        resumed = self.train()
+        self.assertEqual(resumed['examples_seen'], len(self.records))
+        self.assertTrue((resumed['classifier'].coef_ == uninterrupted['classifier'].coef_).all())
+    
+    def test_fold_in_reads_only_new_records(self):
+        """Test that records appended after training are the only ones fitted on the next run"""
+        self.train()
+        self.write_records(self.records[:7], mode='a')
+        with patch.object(incremental_training.SGDClassifier, 'partial_fit',
+                          autospec=True, side_effect=lambda self, X, y, classes: self) as partial_fit:
+            checkpoint = self.train()
+        self.assertEqual(sum(len(call.args[2]) for call in partial_fit.call_args_list), 7)
+        self.assertEqual(checkpoint['examples_seen'], len(self.records) + 7)
+    
+    def test_unknown_category(self):
+        """Test that a category outside the model's classes is rejected"""
+        self.write_records([{"text": "brand new label", "category": "spam"}], mode='a')
+        with self.assertRaises(ValueError):
+            self.train()
+
+
+class TestModelArtifact(unittest.TestCase):
+    """Tests for the compact NumPy model artifact"""
+    
+    texts = [
+        "This is an amazing product, I love it!",
+        "How does this product work? Can you help me?",
+        "The product weighs 2kg and is available in blue and red colors.",
+        "Terrible quality, it broke after two days.",
+        "ok",
+        "",
+        "Ünïcödé ✨ texto com acentuação",
+    ]
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.examples, self.categories = ml_logic.get_training_data()
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def assert_parity(self, model):
+        directory = os.path.join(self.tmpdir.name, 'artifact')
+        model_artifact.export_artifact(model, directory)
+        compact = model_artifact.load_artifact(directory)
+        texts = self.texts + self.examples
+        self.assertTrue(np.allclose(compact.decision_function(texts), model.decision_function(texts), rtol=0, atol=1e-12))
+        self.assertEqual(list(compact.predict(texts)), list(model.predict(texts)))
+        return compact
+    
+    def test_tfidf_parity(self):
+        """Test that the artifact reproduces the joblib pipeline's decision values"""
+        model = ml_logic.train_classifier(self.examples, self.categories, vectorizer='tfidf')
+        compact = self.assert_parity(model)
+        self.assertIsInstance(compact.coef_, np.memmap)
+        self.assertIsInstance(compact.vocabulary, np.memmap)
+        self.assertEqual(compact.vectorizer_mode_, 'tfidf')
+    
+    def test_hashing_parity(self):
+        """Test parity for a hashing-mode pipeline"""
+        model = ml_logic.train_classifier(self.examples, self.categories, vectorizer='hashing', n_features=2 ** 16)
+        compact = self.assert_parity(model)
+        self.assertIsNone(compact.vocabulary)
+    
+    def test_hashing_alternate_sign_parity(self):
+        """Test that a hashing vectorizer with alternate signs keeps them in the artifact and the engine"""
+        model = ml_logic.build_pipeline('hashing', n_features=2 ** 10)
+        # Sublinear TF takes the log of the signed counts, so it is turned off
+        model.named_steps['vectorizer'].set_params(hashing__alternate_sign=True, tfidf__sublinear_tf=False)
+        model.fit(self.examples, self.categories)
+        compact = self.assert_parity(model)
+        self.assertTrue(compact.meta['alternate_sign'])
+        texts = [ml_logic.preprocess_text(text) for text in self.texts + self.examples]
+        _, margins = inference.InferenceEngine.from_artifact(compact).score_batch(texts)
+        self.assertTrue(np.allclose(margins, model.decision_function(texts).reshape(len(texts), -1), rtol=0, atol=1e-12))
+    
+    def test_export_replaces_existing_artifact(self):
+        """Test that exporting over an artifact swaps in the new one"""
+        directory = os.path.join(self.tmpdir.name, 'artifact')
+        model_artifact.export_artifact(ml_logic.train_classifier(self.examples, self.categories, vectorizer='hashing'), directory)
+        model_artifact.export_artifact(ml_logic.train_classifier(self.examples, self.categories, vectorizer='tfidf'), directory)
+        self.assertEqual(model_artifact.load_artifact(directory, mmap_mode=None).meta['vectorizer'], 'tfidf')
+        self.assertEqual(os.listdir(self.tmpdir.name), ['artifact'])
+    
+    def test_missing_artifact(self):
+        """Test that loading a missing artifact raises FileNotFoundError"""
+        with self.assertRaises(FileNotFoundError):
+            model_artifact.load_artifact(os.path.join(self.tmpdir.name, 'missing'))
+
+
+class TestLazyStartup(unittest.TestCase):
+    """Tests for deferred imports and classification from the compact artifact"""
+    
+    def run_python(self, code):
+        completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    
+    def test_imports_are_deferred(self):
+        """Test that importing the classifier, the agent and the CLI loads no heavy dependency"""
+        loaded = self.run_python(
+            "import json, sys, ml_logic, agents, data_utils, classify_cli\n"
+            "print(json.dumps([m for m in ('sklearn', 'scipy', 'joblib', 'pandas', 'matplotlib', "
+            "'langchain_groq', 'langchain_core', 'httpx') if m in sys.modules]))"
+        )
+        self.assertEqual(loaded, [])
+    
+    def test_first_classification_without_sklearn(self):
+        """Test that a fresh process classifies from the artifact, as the pipeline does, without sklearn"""
+        ml_logic.get_model()
+        texts = TestModelArtifact.texts
+        expected = ml_logic.classify_batch_results(texts, use_cache=False)
+        result = self.run_python(
+            "import json, sys, ml_logic\n"
+            f"results = ml_logic.classify_batch_results({texts!r})\n"
+            "print(json.dumps({'categories': [r.category for r in results], "
+            "'margins': [list(r.margins) for r in results], "
+            "'model': type(ml_logic.get_classification_model()).__name__, "
+            "'sklearn': 'sklearn' in sys.modules}))"
+        )
+        self.assertEqual(result['model'], 'CompactModel')
+        self.assertFalse(result['sklearn'])
+        self.assertEqual(result['categories'], [r.category for r in expected])
+        self.assertEqual(result['margins'], [list(r.margins) for r in expected])
+    
+    def test_stale_artifact_is_not_used(self):
+        """Test that an artifact from another corpus falls back to the pipeline"""
+        model = ml_logic.get_model()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            directory = os.path.join(tmpdir, 'artifact')
+            model_artifact.export_artifact(model, directory)
+            with patch('ml_logic.ARTIFACT_DIR', directory), \
+                    patch.dict(ml_logic._model_registry, {'model': None, 'fingerprint': None}), \
+                    patch.dict(ml_logic._compact_registry, {'model': None}), \
+                    patch('ml_logic.get_model', return_value=model) as mock_get_model:
+                compact = ml_logic.get_classification_model()
+                self.assertIsInstance(compact, model_artifact.CompactModel)
+                self.assertIs(ml_logic.get_classification_model(), compact)
+                mock_get_model.assert_not_called()
+                
+                examples, categories, fingerprint = ml_logic.load_training_corpus()
+                changed = ml_logic.TrainingCorpus(examples, categories, fingerprint + "-changed")
+                with patch('ml_logic.load_training_corpus', return_value=changed):
+                    self.assertIs(ml_logic.get_classification_model(), model)
+                mock_get_model.assert_called_once()
+
+
+class TestInferenceEngine(unittest.TestCase):
+    """Tests for the NumPy inference engine"""
+    
+    def setUp(self):
+        self.examples, self.categories = ml_logic.get_training_data()
+        self.texts = [ml_logic.preprocess_text(text) for text in TestModelArtifact.texts + self.examples]
+        self.texts.append("zzzz qqqq unseen words only")
+    
+    def assert_exact_parity(self, model, engine):
+        expected_scores = model.decision_function(self.texts).reshape(len(self.texts), -1)
+        expected_labels = model.predict(self.texts)
+        
+        labels, margins = engine.score_batch(self.texts)
+        self.assertEqual(list(labels), list(expected_labels))
+        self.assertTrue(np.array_equal(margins, expected_scores))
+        
+        for text, expected_label, expected in zip(self.texts, expected_labels, expected_scores):
+            label, margins = engine.score(text)
+            self.assertEqual(label, expected_label)
+            self.assertTrue(np.array_equal(margins, expected), text)
+    
+    def test_tfidf_parity(self):
+        """Test that the engine reproduces the TF-IDF pipeline's labels and margins exactly"""
+        model = ml_logic.train_classifier(self.examples, self.categories, vectorizer='tfidf')
+        self.assert_exact_parity(model, inference.InferenceEngine.from_pipeline(model))
+    
+    def test_hashing_parity(self):
+        """Test exact parity for a hashing-mode pipeline"""
+        model = ml_logic.train_classifier(self.examples, self.categories, vectorizer='hashing', n_features=2 ** 16)
+        self.assert_exact_parity(model, inference.InferenceEngine.from_pipeline(model))
+    
+    def test_artifact_parity(self):
+        """Test that an engine built from a memory-mapped artifact matches the pipeline"""
+        model = ml_logic.train_classifier(self.examples, self.categories, vectorizer='tfidf')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            compact = model_artifact.load_artifact(model_artifact.export_artifact(model, os.path.join(tmpdir, 'artifact')))
+            self.assert_exact_parity(model, inference.InferenceEngine.from_artifact(compact))
+    
+    def test_artifact_with_unsupported_analyzer_is_rejected(self):
+        """Test that an artifact whose analyzer the engine lacks raises instead of scoring differently"""
+        for option, value in (('stop_words', ['the']), ('strip_accents', 'unicode')):
+            model = ml_logic.train_classifier(self.examples, self.categories, vectorizer='tfidf')
+            model.named_steps['vectorizer'].set_params(**{option: value})
+            with tempfile.TemporaryDirectory() as tmpdir:
+                compact = model_artifact.load_artifact(model_artifact.export_artifact(model, os.path.join(tmpdir, 'artifact')))
+                with self.assertRaises(ValueError):
+                    inference.InferenceEngine.from_artifact(compact)
+    
+    def test_buffers_are_not_shared_between_results(self):
+        """Test that margins returned earlier are not overwritten by later calls"""
+        engine = ml_logic.get_inference_engine()
+        _, first = engine.score("I love this product")
+        saved = first.copy()
+        engine.score("When will my order arrive? " * 50)
+        self.assertTrue(np.array_equal(first, saved))
+    
+    def test_unsupported_vectorizer_falls_back_to_sklearn(self):
+        """Test that a vectorizer option the engine lacks uses the sklearn pipeline"""
+        model = ml_logic.train_classifier(self.examples, self.categories)
+        model.named_steps['vectorizer'].set_params(stop_words=['the'])
+        self.assertIsNone(ml_logic.get_inference_engine(model))
+        texts = TestBatchClassification.texts
+        categories = ml_logic._classify_uncached(model, texts, [ml_logic.preprocess_text(text) for text in texts])
+        self.assertEqual(len(categories), len(texts))
+
+    
+    def test_artifact_with_unsupported_analyzer_falls_back(self):
+        """Test that an artifact the engine cannot score is classified by the artifact itself, as the pipeline does"""
+        model = ml_logic.build_pipeline('tfidf')
+        model.named_steps['vectorizer'].set_params(stop_words='english')
+        model.fit(self.examples, self.categories)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            compact = model_artifact.load_artifact(model_artifact.export_artifact(model, os.path.join(tmpdir, 'artifact')))
+            self.assertIsNone(ml_logic.get_inference_engine(compact))
+            texts = TestBatchClassification.texts + TestModelArtifact.texts
+            processed = [ml_logic.preprocess_text(text) for text in texts]
+            expected = ml_logic._classify_uncached(model, texts, processed)
+            results = ml_logic._classify_uncached(compact, texts, processed)
+        self.assertEqual([result.category for result in results], [result.category for result in expected])
+        self.assertTrue(np.allclose([result.margins for result in results], [result.margins for result in expected],
+                                    rtol=0, atol=1e-12))
+
+class TestClassifierMetrics(unittest.TestCase):
+    """Tests for cross-validated metrics and their on-disk cache"""
+    
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = patch.object(ml_logic, 'METRICS_CACHE_DIR', tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache_dir = tmp.name
+    
+    def test_out_of_fold_predictions(self):
+        """Test that every example gets one prediction from a fold that held it out"""
+        examples, categories = ml_logic.get_training_data()
+        metrics = ml_logic.evaluate_classifier(ml_logic.build_pipeline(), examples, categories)
+        self.assertEqual(len(metrics['cv_scores']), ml_logic.CV_FOLDS)
+        self.assertEqual(len(metrics['oof_predictions']), len(examples))
+        self.assertEqual(metrics['classification_report']['macro avg']['support'], len(examples))
+        accuracy = sum(p == c for p, c in zip(metrics['oof_predictions'], categories)) / len(categories)
+        self.assertAlmostEqual(metrics['classification_report']['accuracy'], accuracy)
+    
+    def test_metrics_are_cached(self):
+        """Test that a second call is served from disk without cross-validating"""
+        first = ml_logic.get_classifier_metrics(n_jobs=1)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        with patch.object(ml_logic, 'evaluate_classifier') as evaluate:
+            second = ml_logic.get_classifier_metrics(n_jobs=1)
+        evaluate.assert_not_called()
+        self.assertEqual(second['cv_scores'].tolist(), first['cv_scores'].tolist())
+        self.assertEqual(second['classification_report'], first['classification_report'])
+
+
+class TestTrainingCorpus(unittest.TestCase):
+    """Tests for the versioned training corpus loader"""
+    
+    def write_corpus(self, directory, rows):
+        path = os.path.join(directory, "corpus.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for text, category in rows:
+                f.write(json.dumps({"text": text, "category": category}) + "\n")
+        return path
+    
+    def test_default_corpus(self):
+        """Test that the shipped corpus loads with matching examples and categories"""
+        corpus = ml_logic.load_training_corpus()
+        self.assertEqual(len(corpus.examples), len(corpus.categories))
+        self.assertGreater(len(corpus.examples), 0)
+        self.assertEqual(len(corpus.fingerprint), 64)
+        self.assertIs(ml_logic.load_training_corpus(), corpus)
+    
+    def test_reload_on_change(self):
+        """Test that the fingerprint follows the file contents"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_corpus(directory, [("Great!", "positive")])
+            first = ml_logic.load_training_corpus(path)
+            self.assertEqual(first.examples, ["Great!"])
+            
+            path = self.write_corpus(directory, [("Great!", "positive"), ("Awful", "negative")])
+            second = ml_logic.load_training_corpus(path)
+            self.assertEqual(second.categories, ["positive", "negative"])
+            self.assertNotEqual(first.fingerprint, second.fingerprint)
+    
+    def test_invalid_record(self):
+        """Test that malformed lines are reported with their line number"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.jsonl")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('{"text": "ok", "category": "neutral"}\n{"text": "missing category"}\n')
+            with self.assertRaisesRegex(ValueError, "corpus.jsonl:2"):
+                ml_logic.load_training_corpus(path)
+    
+    def test_classification_stats(self):
+        """Test that the exported statistics come from the corpus file"""
+        from data_utils import export_classification_stats
+        corpus = ml_logic.load_training_corpus()
+        stats = export_classification_stats()
+        self.assertEqual(stats['total_examples'], len(corpus.examples))
+        self.assertEqual(sum(stats['category_distribution'].values()), len(corpus.categories))
+        self.assertEqual(stats['corpus_fingerprint'], corpus.fingerprint)
+
+
+class TestBatchClassification(unittest.TestCase):
+    """Tests for vectorized batch classification"""
+    
+    texts = [
+        "This is an amazing product, I love it!",
+        "I do not like it",
+        "How does this product work? Can you help me?",
+        "The product weighs 2kg and is available in blue and red colors.",
+        "The color is blue",
+        "Made in China",
+        "Not bad at all, I'd recommend it",
+        "I am not happy with the service",
+    ]
+    
+    def test_batch_matches_single_text_path(self):
+        """Test that classify_batch agrees with classify_text on every text"""
+        expected = [classify_text(text) for text in self.texts]
+        self.assertEqual(ml_logic.classify_batch(self.texts), expected)
+    
+    def test_empty_batch(self):
+        """Test that an empty batch returns no results"""
+        self.assertEqual(ml_logic.classify_batch([]), [])
+    
+    def test_parallel_matches_batch(self):
+        """Test that sharding across worker processes keeps results and order"""
+        from data_utils import classify_parallel
+        texts = self.texts * 2
+        self.assertEqual(classify_parallel(texts, workers=2, chunk_size=3),
+                         ml_logic.classify_batch(texts))
+    
+    def test_batch_classify_results(self):
+        """Test that data_utils.batch_classify pairs texts with categories and full results"""
+        from data_utils import batch_classify
+        results = batch_classify(self.texts)
+        self.assertEqual([r[0] for r in results], self.texts)
+        self.assertEqual([r[1] for r in results], ml_logic.classify_batch(self.texts))
+        for _, category, description, result in results:
+            self.assertEqual(description, get_category_description(category))
+            self.assertEqual(result.category, category)
+    
+    def test_parallel_results_match_batch(self):
+        """Test that full results survive the trip back from worker processes"""
+        from data_utils import classify_parallel_results
+        self.assertEqual(classify_parallel_results(self.texts, workers=2, chunk_size=3),
+                         ml_logic.classify_batch_results(self.texts))
+    
+    def test_bulk_paths_skip_the_prediction_cache(self):
+        """Test that bulk classification leaves the prediction cache alone unless asked to use it"""
+        from data_utils import batch_classify
+        ml_logic.clear_prediction_cache()
+        batch_classify(self.texts)
+        self.assertEqual(ml_logic.get_prediction_cache_stats()['size'], 0)
+        batch_classify(self.texts, use_cache=True)
+        self.assertGreater(ml_logic.get_prediction_cache_stats()['size'], 0)
+        ml_logic.clear_prediction_cache()
+
+
+class TestClassificationResult(unittest.TestCase):
+    """Tests for the ClassificationResult returned by one decision pass"""
+    
+    def test_result_fields(self):
+        """Test that a result carries margins for every class and the model version"""
+        model = ml_logic.get_model()
+        result = ml_logic.classify_text_result("When will my order arrive?")
+        self.assertEqual(result.category, classify_text("When will my order arrive?"))
+        self.assertEqual(result.classes, tuple(model.named_steps['classifier'].classes_))
+        self.assertEqual(set(result.margins_by_class()), set(result.classes))
+        self.assertEqual(result.model_version, model.corpus_fingerprint_)
+        self.assertEqual(result.confidence, max(abs(margin) for margin in result.margins))
+    
+    def test_margins_match_decision_function(self):
+        """Test that the margins are the model's decision values"""
+        model = ml_logic.get_model()
+        texts = TestBatchClassification.texts
+        results = ml_logic.classify_batch_results(texts, use_cache=False)
+        expected = model.decision_function([ml_logic.preprocess_text(text) for text in texts])
+        self.assertTrue(np.array_equal(np.array([result.margins for result in results]), expected))
+    
+    def test_override_rule_is_reported(self):
+        """Test that the rule deciding the category is named, and None when the model decides"""
+        result = ml_logic.classify_text_result("I do not like this at all")
+        self.assertEqual(result.category, "negative")
+        self.assertEqual(result.rule, "negative_keywords")
+        
+        result = ml_logic.classify_text_result("How does this product work? Can you help me?")
+        self.assertIsNone(result.rule)
+        self.assertEqual(result.category, result.predicted)
+    
+    def test_short_text_rule(self):
+        """Test that the short-text rule is reported when it makes a text neutral"""
+        engine = MagicMock()
+        engine.classes_ = np.array(["informational", "negative", "neutral", "positive", "question"])
+        engine.score.return_value = ("informational", np.array([0.3, -0.4, -0.2, -0.45, -0.1]))
+        with patch('ml_logic.get_inference_engine', return_value=engine):
+            result = ml_logic.classify_batch_results(["the box"], use_cache=False)[0]
+        self.assertEqual(result.predicted, "informational")
+        self.assertEqual(result.category, "neutral")
+        self.assertEqual(result.rule, "short_text_neutral")
+        self.assertEqual(result.confidence, 0.45)
+
+
+class TestPredictionCache(unittest.TestCase):
+    """Tests for the classify_text prediction cache"""
+    
+    def setUp(self):
+        ml_logic.get_model()
+        ml_logic.clear_prediction_cache()
+    
+    def test_repeated_inputs_hit_the_cache(self):
+        """Test that a repeated text is served from the cache"""
+        before = ml_logic.get_prediction_cache_stats()
+        first = classify_text("The package arrived on Monday")
+        second = classify_text("The package arrived on Monday")
+        after = ml_logic.get_prediction_cache_stats()
+        self.assertEqual(first, second)
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+    
+    def test_cached_matches_uncached(self):
+        """Test that texts sharing a preprocessed form keep their own rule results"""
+        texts = [
+            "i don't like this", "i do not like this", "I DON'T like this!",
+            "can't complain", "cannot complain", "it's great", "It's   great",
+        ] + TestBatchClassification.texts
+        expected = ml_logic.classify_batch(texts, use_cache=False)
+        self.assertEqual(ml_logic.classify_batch(texts), expected)
+        self.assertEqual([classify_text(text) for text in texts], expected)
+    
+    def test_retrain_invalidates_cache(self):
+        """Test that retraining the model empties the cache"""
+        classify_text("The package arrived on Monday")
+        self.assertGreater(ml_logic.get_prediction_cache_stats()["size"], 0)
+        ml_logic.retrain_model()
+        self.assertEqual(ml_logic.get_prediction_cache_stats()["size"], 0)
+
+
+def legacy_rule_hits(text):
+    """Reference implementation of the keyword rules using substring scans"""
+    text_lower = text.lower()
+    hits = {
+        'negative_start': any(text_lower.startswith(start) for start in ml_logic.NEGATIVE_STARTS),
+        'negative_pattern': any(pattern in text_lower for pattern in ml_logic.NEGATIVE_PATTERNS),
+        'negated_positive': any(neg + " " + pos in text_lower
+                                for neg in ml_logic.NEGATION_WORDS for pos in ml_logic.POSITIVE_WORDS),
+        'positive_word': any(word in text_lower for word in ml_logic.POSITIVE_WORDS),
+        'contains_not': "not " in text_lower,
+        'extreme_positive': any(pattern in text_lower for pattern in ml_logic.EXTREME_POSITIVE_PATTERNS),
+    }
+    return tuple(name for name in ml_logic.RULE_NAMES if hits[name])
+
+
+class TestRuleEngine(unittest.TestCase):
+    """Equivalence tests for the compiled keyword rule matcher"""
+    
+    def assert_equivalent(self, texts):
+        for text in texts:
+            self.assertEqual(ml_logic.match_rules(text), legacy_rule_hits(text), text)
+    
+    def test_training_examples(self):
+        """Test the matcher against the reference rules on the training corpus"""
+        examples, _ = ml_logic.get_training_data()
+        self.assert_equivalent(examples)
+    
+    def test_rule_phrases(self):
+        """Test every rule phrase on its own, at the start and mid-text"""
+        phrases = (ml_logic.NEGATIVE_PATTERNS + ml_logic.POSITIVE_WORDS + ml_logic.NEGATIVE_STARTS +
+                   ml_logic.EXTREME_POSITIVE_PATTERNS + ml_logic.NEGATION_WORDS + ["not "])
+        texts = []
+        for phrase in phrases:
+            texts.extend([phrase, phrase.upper(), "so " + phrase, phrase + "d"])
+        self.assert_equivalent(texts)
+    
+    def test_random_combinations(self):
+        """Test overlapping and adjacent phrases in generated texts"""
+        rng = random.Random(42)
+        vocabulary = (ml_logic.NEGATIVE_PATTERNS + ml_logic.POSITIVE_WORDS + ml_logic.NEGATIVE_STARTS +
+                      ml_logic.EXTREME_POSITIVE_PATTERNS + ml_logic.NEGATION_WORDS +
+                      ["i", "it", "very", "no", "nothing", "knot", "badge", "the product", "!", "?"])
+        texts = []
+        for _ in range(2000):
+            words = [rng.choice(vocabulary) for _ in range(rng.randint(1, 8))]
+            texts.append(rng.choice([" ", "", "  "]).join(words))
+        self.assert_equivalent(texts)
+    
+    def test_precedence(self):
+        """Test that the rules keep their precedence order"""
+        self.assertEqual(ml_logic.match_rules("I do not like it, but I love it"),
+                         ('negative_start', 'negative_pattern', 'positive_word',
+                          'contains_not', 'extreme_positive'))
+        self.assertEqual(classify_text("I do not like it, but I love it"), "negative")
+        self.assertEqual(classify_text("I really love it"), "positive")
+
+
+def legacy_preprocess(text):
+    """Reference implementation of preprocess_text with one pass per step"""
+    text = text.lower()
+    for contraction, expansion in ml_logic.CONTRACTIONS.items():
+        text = text.replace(contraction, expansion)
+    text = re.sub(r'not\s+(\w+)', r'not_\1', text)
+    text = re.sub(r"not\s+(\w+)", r'not_\1', text)
+    text = re.sub(r'never\s+(\w+)', r'never_\1', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class TestPreprocessing(unittest.TestCase):
+    """Equivalence tests for the single-pass preprocess_text"""
+    
+    def test_examples(self):
+        """Test contraction expansion, negation joining and whitespace collapse"""
+        self.assertEqual(ml_logic.preprocess_text("I DON'T  like\tit"), "i do not_like it")
+        self.assertEqual(ml_logic.preprocess_text("  It won't work, I can't say"), "it will not_work, i cannot_say")
+        self.assertEqual(ml_logic.preprocess_text("never again, I'm not not happy"), "never_again, i am not_not_happy")
+    
+    def test_random_combinations(self):
+        """Test against the multi-pass reference on generated texts"""
+        rng = random.Random(7)
+        vocabulary = ["not", "never", "n't", "won't", "can't", "don't", "isn't", "i", "'m", "'d",
+                      "'ll", "'re", "'ve", "'", "good", "cannot", "knot", "nothing", "Not", "NEVER",
+                      "x", "n", "won", "_", "1", ",", ".", "?", "\u00e9"]
+        separators = [" ", " ", "", "  ", "\t", "\n", " \u00a0"]
+        for _ in range(5000):
+            text = "".join(rng.choice(vocabulary) + rng.choice(separators)
+                           for _ in range(rng.randint(1, 7)))
+            self.assertEqual(ml_logic.preprocess_text(text), legacy_preprocess(text), repr(text))
+    
+    def test_training_examples(self):
+        """Test against the multi-pass reference on the training corpus"""
+        examples, _ = ml_logic.get_training_data()
+        for text in examples:
+            self.assertEqual(ml_logic.preprocess_text(text), legacy_preprocess(text))
+    
+    def test_preprocess_batch(self):
+        """Test that preprocess_batch lazily yields preprocessed texts"""
+        texts = ["I don't know", "Never  mind"]
+        batch = ml_logic.preprocess_batch(iter(texts))
+        self.assertNotIsInstance(batch, list)
+        self.assertEqual(list(batch), [ml_logic.preprocess_text(text) for text in texts])
+
+
+class TestCsvStreaming(unittest.TestCase):
+    """Tests for chunked CSV classification"""
+    
+    def setUp(self):
+        import results_store
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = patch.object(results_store, 'RESULTS_DB_PATH', os.path.join(tmp.name, "results.sqlite3"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_stream_matches_batch(self):
+        """Test that streaming in chunks gives the same results as one batch"""
+        from data_utils import classify_csv_stream
+        import pandas as pd
+        import results_store
+        
+        texts = TestBatchClassification.texts * 3
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "input.csv")
+            pd.DataFrame({'id': range(len(texts) + 1), 'review': texts + [None]}).to_csv(source, index=False)
+            
+            progress = []
+            summary = classify_csv_stream(source, 'review', filename="test_stream_results.csv",
+                                          chunk_size=5, progress_callback=lambda *args: progress.append(args))
+        try:
+            results = pd.read_csv(summary['path'])
+            expected = ml_logic.classify_batch(texts)
+            self.assertEqual(results['Text'].tolist(), texts)
+            self.assertEqual(results['Category'].tolist(), expected)
+            self.assertEqual(summary['rows'], len(texts))
+            self.assertEqual(sum(summary['category_counts'].values()), len(texts))
+            # One progress update per chunk of five input rows
+            self.assertEqual(len(progress), 5)
+            self.assertEqual(progress[-1][0], len(texts))
+            # Rows are stored as they stream, and the CSV is not imported again
+            self.assertEqual(results_store.summarize_results()['total'], len(texts))
+            self.assertEqual(results_store.ingest_csv_files(pattern=summary['path']), [])
+        finally:
+            os.remove(summary['path'])
+
+    
+    def test_dashboard_ingest_during_stream(self):
+        """Test that ingesting while a stream is running does not duplicate its rows"""
+        from data_utils import classify_csv_stream
+        import pandas as pd
+        import results_store
+        
+        texts = TestBatchClassification.texts * 3
+        ingested = []
+        
+        def ingest(rows, bytes_read):
+            ingested.extend(results_store.ingest_csv_files())
+            self.assertEqual(results_store.summarize_results()['total'], rows)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "input.csv")
+            pd.DataFrame({'text': texts}).to_csv(source, index=False)
+            summary = classify_csv_stream(source, filename="classification_results_test_stream.csv",
+                                          chunk_size=5, progress_callback=ingest)
+        try:
+            self.assertEqual(ingested, [])
+            self.assertEqual(results_store.ingest_csv_files(pattern=summary['path']), [])
+            self.assertEqual(results_store.summarize_results()['total'], len(texts))
+        finally:
+            os.remove(summary['path'])
+
+class TestClassifyStream(unittest.TestCase):
+    """Tests for the file and stdin batch classifier behind classify_cli.py"""
+    
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.texts = TestBatchClassification.texts * 3
+    
+    def path(self, name):
+        return os.path.join(self.directory, name)
+    
+    def test_csv_to_csv(self):
+        """Test that input columns are kept, empty texts skipped and results match classify_batch"""
+        import csv
+        from data_utils import classify_stream
+        
+        with open(self.path("in.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "review"])
+            writer.writerows(enumerate(self.texts))
+            writer.writerow([len(self.texts), ""])
+        
+        progress = []
+        summary = classify_stream([self.path("in.csv")], self.path("out.csv"), "review", chunk_size=7,
+                                  progress_callback=lambda *args: progress.append(args))
+        with open(self.path("out.csv"), newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        
+        results = ml_logic.classify_batch_results(self.texts)
+        self.assertEqual(list(rows[0]), ["id", "review", "category", "confidence", "rule"])
+        self.assertEqual([row["id"] for row in rows], [str(i) for i in range(len(self.texts))])
+        self.assertEqual([row["category"] for row in rows], [result.category for result in results])
+        self.assertEqual([row["rule"] for row in rows], [result.rule or "" for result in results])
+        self.assertEqual((summary["rows"], summary["skipped"]), (len(self.texts), 1))
+        self.assertEqual(len(progress), -(-len(self.texts) // 7))
+        self.assertEqual(progress[-1][0], len(self.texts))
+    
+    def test_jsonl_inputs_in_order(self):
+        """Test several JSONL inputs, records without a text and the JSONL output"""
+        from data_utils import classify_stream
+        
+        halves = [self.texts[:10], self.texts[10:]]
+        for i, half in enumerate(halves):
+            with open(self.path(f"in{i}.jsonl"), "w", encoding="utf-8") as f:
+                for text in half:
+                    f.write(json.dumps({"text": text, "source": i}) + "\n")
+                f.write(json.dumps({"source": i}) + "\n\n")
+        
+        summary = classify_stream([self.path("in0.jsonl"), self.path("in1.jsonl")], self.path("out.jsonl"), chunk_size=4)
+        with open(self.path("out.jsonl"), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        
+        self.assertEqual([record["text"] for record in records], self.texts)
+        self.assertEqual([record["source"] for record in records], [0] * 10 + [1] * (len(self.texts) - 10))
+        self.assertEqual([record["category"] for record in records], ml_logic.classify_batch(self.texts))
+        self.assertEqual(summary["skipped"], 2)
+    
+    def test_stdin_to_stdout(self):
+        """Test one text per line from stdin, written to stdout as JSONL"""
+        import io
+        from data_utils import classify_stream
+        
+        stdin = io.TextIOWrapper(io.BytesIO("\n".join(self.texts[:5]).encode("utf-8")))
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        with patch("sys.stdin", stdin), patch("sys.stdout", stdout):
+            classify_stream(["-"])
+        
+        records = [json.loads(line) for line in stdout.buffer.getvalue().decode("utf-8").splitlines()]
+        self.assertEqual([record["category"] for record in records], ml_logic.classify_batch(self.texts[:5]))
+    
+    def test_workers_match_single_process(self):
+        """Test that classifying with a worker pool gives the same output"""
+        from data_utils import classify_stream
+        
+        with open(self.path("in.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(self.texts))
+        classify_stream([self.path("in.txt")], self.path("single.jsonl"), chunk_size=8)
+        classify_stream([self.path("in.txt")], self.path("pool.jsonl"), chunk_size=8, workers=2)
+        with open(self.path("single.jsonl"), encoding="utf-8") as single, open(self.path("pool.jsonl"), encoding="utf-8") as pool:
+            self.assertEqual(pool.read(), single.read())
+    
+    def test_bad_inputs(self):
+        """Test a missing text column, an unknown extension and invalid JSON"""
+        from data_utils import classify_stream
+        
+        with open(self.path("in.csv"), "w", encoding="utf-8") as f:
+            f.write("id,body\n1,hello\n")
+        with open(self.path("in.jsonl"), "w", encoding="utf-8") as f:
+            f.write('{"text": "fine"}\nnot json\n')
+        with self.assertRaisesRegex(ValueError, "Column 'text' not found"):
+            classify_stream([self.path("in.csv")], self.path("out.csv"))
+        with self.assertRaisesRegex(ValueError, "Cannot tell the format"):
+            classify_stream([self.path("in.csv")], self.path("out.parquet"))
+        with self.assertRaisesRegex(ValueError, "line 2"):
+            classify_stream([self.path("in.jsonl")], self.path("out.jsonl"))
+        # Failed runs leave no partial output behind
+        self.assertEqual(sorted(os.listdir(self.directory)), ["in.csv", "in.jsonl"])
+
+
+class TestResultsStore(unittest.TestCase):
+    """Tests for the append-only SQLite results store"""
+    
+    def setUp(self):
+        import results_store
+        self.store = results_store
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.path = os.path.join(tmp.name, "results.sqlite3")
+    
+    def test_append_and_filtered_reads(self):
+        """Test that category and time filters are applied by the store"""
+        import datetime
+        
+        day = datetime.datetime(2024, 5, 1, 12, 0, 0)
+        self.store.append_results(["good", "bad"], ["positive", "negative"], timestamp=day, path=self.path)
+        self.store.append_results(["good", "why?"], ["positive", "question"],
+                                  timestamp=day + datetime.timedelta(days=2), path=self.path)
+        
+        summary = self.store.summarize_results(path=self.path)
+        self.assertEqual((summary['total'], summary['unique_texts'], summary['sources']), (4, 3, 2))
+        self.assertEqual(summary['category_counts'], {'positive': 2, 'negative': 1, 'question': 1})
+        
+        df = self.store.query_results(categories=['positive'], start=day + datetime.timedelta(days=1), path=self.path)
+        self.assertEqual(df['Text'].tolist(), ["good"])
+        self.assertEqual(df['timestamp'].iloc[0].to_pydatetime(), day + datetime.timedelta(days=2))
+        self.assertEqual(len(self.store.query_results(limit=3, path=self.path)), 3)
+        self.assertEqual(self.store.summarize_results(categories=[], path=self.path)['total'], 0)
+    
+    def test_incremental_csv_ingest(self):
+        """Test that legacy CSV files are imported once and again only when changed"""
+        pattern = os.path.join(self.directory, "classification_results_*.csv")
+        csv_path = os.path.join(self.directory, "classification_results_20240501_120000.csv")
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write("Text,Category\na,positive\nb,neutral\n")
+        
+        self.assertEqual(self.store.ingest_csv_files(pattern, path=self.path), [os.path.basename(csv_path)])
+        self.assertEqual(self.store.ingest_csv_files(pattern, path=self.path), [])
+        
+        with open(csv_path, 'a', encoding='utf-8') as f:
+            f.write("c,question\n")
+        self.assertEqual(len(self.store.ingest_csv_files(pattern, path=self.path)), 1)
+        summary = self.store.summarize_results(path=self.path)
+        self.assertEqual(summary['total'], 3)
+        self.assertEqual(self.store.time_range(path=self.path)[0].year, 2024)
+    
+    def test_aggregates_match_rows(self):
+        """Test that the materialized summaries agree with the stored rows"""
+        import datetime
+        import sqlite3
+        
+        rng = random.Random(3)
+        categories = ["positive", "negative", "question"]
+        day = datetime.datetime(2024, 5, 1)
+        for batch in range(6):
+            texts = [f"text {rng.randint(0, 20)}" for _ in range(50)]
+            self.store.append_results(texts, [rng.choice(categories) for _ in texts],
+                                      timestamp=day + datetime.timedelta(days=batch, hours=batch), path=self.path)
+        
+        df = self.store.query_results(path=self.path)
+        start, end = day + datetime.timedelta(days=1), day + datetime.timedelta(days=4)
+        for filters, rows in [
+            ({}, df),
+            ({'categories': ['negative', 'question']}, df[df['Category'].isin(['negative', 'question'])]),
+            ({'start': start, 'end': end}, df[(df['timestamp'] >= start) & (df['timestamp'] < end)]),
+        ]:
+            summary = self.store.summarize_results(path=self.path, **filters)
+            self.assertEqual(summary['total'], len(rows))
+            self.assertEqual(summary['unique_texts'], rows['Text'].nunique())
+            self.assertEqual(summary['sources'], rows['source_file'].nunique())
+            self.assertEqual(summary['category_counts'], rows['Category'].value_counts().to_dict())
+        
+        # A store written before the aggregates existed is rebuilt on open
+        expected = self.store.summarize_results(path=self.path)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("DELETE FROM aggregates")
+            conn.execute("DELETE FROM store_meta WHERE key = 'aggregates_version'")
+        self.assertEqual(self.store.summarize_results(path=self.path), expected)
+    
+    def test_version_changes_on_write(self):
+        """Test that the cache key used by the dashboard changes when results are added"""
+        before = self.store.store_version(path=self.path)
+        self.store.append_results(["a"], ["positive"], path=self.path)
+        self.assertGreater(self.store.store_version(path=self.path), before)
+
+
+class TestInferenceServer(unittest.TestCase):
+    """Tests for the ASGI inference server and its micro-batcher"""
+    
+    def test_endpoints(self):
+        """Test /healthz, /classify and /classify/batch against the real model"""
+        from starlette.testclient import TestClient
+        import server
+        
+        texts = TestBatchClassification.texts
+        with TestClient(server.app) as client:
+            health = client.get("/healthz")
+            self.assertEqual(health.status_code, 200)
+            self.assertEqual(health.json()["status"], "ok")
+            self.assertEqual(health.json()["corpus_fingerprint"], ml_logic.load_training_corpus().fingerprint)
+            
+            # A probe reports the loaded model and never loads or retrains one
+            with patch.dict(ml_logic._model_registry, {'model': None, 'fingerprint': None}), \
+                    patch.dict(ml_logic._compact_registry, {'model': None}), \
+                    patch('ml_logic.get_model') as mock_get_model, \
+                    patch('ml_logic.load_artifact') as mock_load_artifact:
+                health = client.get("/healthz")
+                mock_get_model.assert_not_called()
+                mock_load_artifact.assert_not_called()
+            self.assertEqual(health.status_code, 200)
+            self.assertIsNone(health.json()["corpus_fingerprint"])
+            
+            response = client.post("/classify", json={"text": texts[0]})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["category"], classify_text(texts[0]))
+            
+            response = client.post("/classify/batch", json={"texts": texts})
+            self.assertEqual([r["category"] for r in response.json()["results"]],
+                             ml_logic.classify_batch(texts))
+            
+            self.assertEqual(client.post("/classify", json={"texts": texts}).status_code, 400)
+            self.assertEqual(client.post("/classify/batch", content=b"not json").status_code, 400)
+    
+    def test_micro_batching(self):
+        """Test that concurrent requests are coalesced up to max_batch_size"""
+        import server
+        
+        batch_sizes = []
+        
+        def classify(texts):
+            batch_sizes.append(len(texts))
+            return [text.upper() for text in texts]
+        
+        async def run():
+            batcher = server.MicroBatcher(classify, max_batch_size=4, max_wait_ms=50)
+            batcher.start()
+            try:
+                return await asyncio.gather(*(batcher.submit(f"text {i}") for i in range(10)))
+            finally:
+                await batcher.stop()
+        
+        self.assertEqual(asyncio.run(run()), [f"TEXT {i}" for i in range(10)])
+        self.assertEqual(batch_sizes, [4, 4, 2])
+
+
 class TestAgent(unittest.TestCase):
     """Tests for the LLM agent"""
     
@@ -69,5 +1088,368 @@ class TestAgent(unittest.TestCase):
         mock_chain.invoke.assert_called_once()
 
 
+
+class EchoChatModel(BaseChatModel):
+    """Local fake chat model that echoes the question and tracks concurrency"""
+    
+    delay: float = 0.01
+    in_flight: int = 0
+    max_in_flight: int = 0
+    
+    @property
+    def _llm_type(self):
+        return "echo"
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = AIMessage(content="Echo: " + messages[-1].content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return self._generate(messages, stop=stop)
+        finally:
+            self.in_flight -= 1
+
+
+class TestAsyncAgent(unittest.TestCase):
+    """Tests for the cached and async LLM agent API against a local fake model"""
+    
+    def setUp(self):
+        import agents
+        self.agents = agents
+        self.fake_model = EchoChatModel()
+        agents.clear_client_cache()
+        patcher = patch('agents.get_model', return_value=self.fake_model)
+        self.mock_get_model = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(agents.clear_client_cache)
+        # Each test gets its own answer cache so earlier answers do not leak in
+        previous_cache = agents.get_answer_cache()
+        agents.set_answer_cache(LRUCache(max_size=100))
+        self.addCleanup(agents.set_answer_cache, previous_cache)
+    
+    def test_replaced_client_is_closed(self):
+        """Test that changing the API key closes the connection pool of the previous chain"""
+        with patch.dict(os.environ, {"GROQ_API_KEY": "first-key"}):
+            self.agents.get_chain()
+        first_client = self.mock_get_model.call_args.kwargs['http_client']
+        with patch.dict(os.environ, {"GROQ_API_KEY": "second-key"}):
+            self.agents.get_chain()
+        second_client = self.mock_get_model.call_args.kwargs['http_client']
+        self.assertTrue(first_client.is_closed)
+        self.assertFalse(second_client.is_closed)
+        self.agents.clear_client_cache()
+        self.assertTrue(second_client.is_closed)
+    
+    def test_replaced_async_client_is_closed(self):
+        """Test that changing the API key closes the async connection pool of the previous chain"""
+        async def ask_with(api_key):
+            with patch.dict(os.environ, {"GROQ_API_KEY": api_key}):
+                await self.agents.answer_async(f"Key {api_key}?")
+            return self.mock_get_model.call_args.kwargs['http_async_client']
+        
+        async def change_key():
+            first_client = await ask_with("first-key")
+            second_client = await ask_with("second-key")
+            self.assertTrue(first_client.is_closed)
+            self.assertFalse(second_client.is_closed)
+            return second_client
+        
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        second_client = loop.run_until_complete(change_key())
+        self.agents.clear_client_cache()
+        self.assertTrue(second_client.is_closed)
+    
+    def test_client_is_reused(self):
+        """Test that answer builds the model and chain only once"""
+        self.assertEqual(self.agents.answer("First?"), "Echo: First?")
+        self.assertEqual(self.agents.answer("Second?"), "Echo: Second?")
+        self.mock_get_model.assert_called_once()
+    
+    def test_answer_async(self):
+        """Test a single async answer"""
+        self.assertEqual(asyncio.run(self.agents.answer_async("Hello?")), "Echo: Hello?")
+    
+    def test_answer_many_keeps_order_and_bounds_concurrency(self):
+        """Test fan-out with a concurrency limit"""
+        questions = [f"Question {i}?" for i in range(20)]
+        answers = asyncio.run(self.agents.answer_many(questions, max_concurrency=4))
+        self.assertEqual(answers, ["Echo: " + question for question in questions])
+        self.assertEqual(self.fake_model.max_in_flight, 4)
+        self.mock_get_model.assert_called_once()
+    
+    def test_errors_are_returned(self):
+        """Test that failures are reported as text like the sync API"""
+        self.mock_get_model.side_effect = ValueError("GROQ_API_KEY not found")
+        self.assertIn("GROQ_API_KEY not found", asyncio.run(self.agents.answer_async("Hi?")))
+    
+    def test_answers_are_cached(self):
+        """Test that repeated and re-spaced questions are served from the cache"""
+        self.assertEqual(self.agents.answer("What is a refund?"), "Echo: What is a refund?")
+        self.assertEqual(self.agents.answer("  what IS a   refund? "), "Echo: What is a refund?")
+        self.assertEqual(asyncio.run(self.agents.answer_async("What is a refund?")), "Echo: What is a refund?")
+        stats = self.agents.get_answer_cache().stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+    
+    def test_errors_are_not_cached(self):
+        """Test that a failed call is retried instead of served from the cache"""
+        self.mock_get_model.side_effect = ValueError("GROQ_API_KEY not found")
+        self.assertIn("GROQ_API_KEY not found", self.agents.answer("Hi?"))
+        self.mock_get_model.side_effect = None
+        self.assertEqual(self.agents.answer("Hi?"), "Echo: Hi?")
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Tests for the stage timers, counters and exporters"""
+    
+    def setUp(self):
+        was_enabled = instrumentation.is_enabled()
+        instrumentation.reset()
+        instrumentation.enable()
+        self.addCleanup(instrumentation.reset)
+        self.addCleanup(instrumentation.enable if was_enabled else instrumentation.disable)
+    
+    def stages(self):
+        return {row["stage"]: row for row in instrumentation.registry.stage_summary()}
+    
+    def counter(self, name, **labels):
+        for row in instrumentation.registry.counters():
+            if row["name"] == name and row["labels"] == labels:
+                return row["value"]
+        return 0
+    
+    def test_disabled_records_nothing(self):
+        """Test that a disabled registry hands out one shared no-op timer"""
+        instrumentation.disable()
+        self.assertIs(instrumentation.stage("a"), instrumentation.stage("b"))
+        ml_logic.classify_batch(TestBatchClassification.texts, use_cache=False)
+        self.assertEqual(instrumentation.export_json()["stages"], [])
+        self.assertEqual(instrumentation.export_json()["counters"], [])
+    
+    def test_classification_stages(self):
+        """Test that a classification records each stage, the cache counters and rule overrides"""
+        texts = TestBatchClassification.texts
+        ml_logic.clear_prediction_cache()
+        results = ml_logic.classify_batch_results(texts)
+        ml_logic.classify_batch_results(texts)
+        
+        stages = self.stages()
+        for name in ("classify", "preprocess", "cache_lookup", "vectorize", "predict", "rules"):
+            self.assertIn(name, stages)
+        self.assertEqual(stages["classify"]["count"], 2)
+        self.assertEqual(stages["predict"]["count"], 1)
+        self.assertEqual(self.counter("classified_texts_total"), 2 * len(texts))
+        self.assertEqual(self.counter("prediction_cache_misses_total"), len(texts))
+        self.assertEqual(self.counter("prediction_cache_hits_total"), len(texts))
+        for rule in ml_logic.OVERRIDE_RULES:
+            self.assertEqual(self.counter("rule_overrides_total", rule=rule),
+                             sum(result.rule == rule for result in results))
+    
+    def test_answer_stages(self):
+        """Test that the agent records client construction, the request and errors"""
+        import agents
+        
+        agents.clear_client_cache()
+        self.addCleanup(agents.clear_client_cache)
+        previous_cache = agents.get_answer_cache()
+        agents.set_answer_cache(None)
+        self.addCleanup(agents.set_answer_cache, previous_cache)
+        
+        with patch('agents.get_model', return_value=EchoChatModel()) as mock_get_model:
+            self.assertEqual(agents.answer("Hi?"), "Echo: Hi?")
+            mock_get_model.side_effect = ValueError("GROQ_API_KEY not found")
+            agents.clear_client_cache()
+            agents.answer("Hi?")
+        
+        stages = self.stages()
+        self.assertEqual(stages["answer"]["count"], 2)
+        self.assertEqual(stages["answer_client"]["count"], 2)
+        self.assertEqual(stages["answer_request"]["count"], 1)
+        self.assertEqual(self.counter("answers_total"), 2)
+        self.assertEqual(self.counter("answer_errors_total"), 1)
+    
+    def test_histogram_quantiles(self):
+        """Test quantile estimates against values spread over known buckets"""
+        histogram = instrumentation.Histogram(buckets=(0.001, 0.01, 0.1))
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in [0.0005] * 50 + [0.005] * 49 + [5.0]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [50, 49, 0, 1])
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.001)
+        self.assertTrue(0.001 < histogram.quantile(0.9) <= 0.01)
+        self.assertEqual(histogram.quantile(1.0), 0.1)
+    
+    def test_prometheus_export(self):
+        """Test the exposition text: cumulative buckets, +Inf equal to the count, labelled counters"""
+        registry = instrumentation.MetricsRegistry(enabled=True, buckets=(0.001, 0.01))
+        for seconds in (0.0005, 0.002, 0.5):
+            registry.observe('vector"ize', seconds)
+        registry.increment("rule_overrides_total", 3, rule="positive_word")
+        
+        text = registry.to_prometheus()
+        name = instrumentation.METRIC_PREFIX + "stage_duration_seconds"
+        self.assertIn(f'{name}_bucket{{stage="vector\\"ize",le="0.001"}} 1', text)
+        self.assertIn(f'{name}_bucket{{stage="vector\\"ize",le="0.01"}} 2', text)
+        self.assertIn(f'{name}_bucket{{stage="vector\\"ize",le="+Inf"}} 3', text)
+        self.assertIn(f'{name}_count{{stage="vector\\"ize"}} 3', text)
+        self.assertIn(f'{instrumentation.METRIC_PREFIX}rule_overrides_total{{rule="positive_word"}} 3', text)
+        self.assertEqual(json.loads(json.dumps(registry.to_json()))["stages"][0]["count"], 3)
+    
+    def test_metrics_endpoint(self):
+        """Test that the inference server exposes the shared registry"""
+        from starlette.testclient import TestClient
+        import server
+        
+        with TestClient(server.app) as client:
+            client.post("/classify/batch", json={"texts": TestBatchClassification.texts})
+            response = client.get("/metrics")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('stage="classify"', response.text)
+            self.assertIn("classify", {row["stage"] for row in client.get("/metrics?format=json").json()["stages"]})
+
+
+class TestProfiling(unittest.TestCase):
+    """Tests for the opt-in cProfile and tracemalloc hooks"""
+    
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        patcher = patch('profiling.PROFILE_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(profiling.enable if profiling.is_enabled() else profiling.disable)
+    
+    def test_disabled_writes_nothing(self):
+        """Test that hooked functions run unprofiled while profiling is off"""
+        profiling.disable()
+        self.assertEqual(len(ml_logic.classify_batch(["I love it"])), 1)
+        with profiling.profile("block") as capture:
+            pass
+        self.assertEqual(capture.paths, {})
+        self.assertEqual(os.listdir(self.directory), [])
+    
+    def test_reports(self):
+        """Test the .prof, .folded and .alloc.txt files of a profiled block"""
+        import pstats
+        
+        with profiling.profile("block", force=True) as capture:
+            held = [str(i) * 10 for i in range(20000)]
+            sorted(held)
+        
+        self.assertEqual(set(capture.paths), {"prof", "folded", "alloc"})
+        stats = pstats.Stats(capture.paths["prof"])
+        with open(capture.paths["folded"], encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        # Every line is "frame;frame;frame microseconds" and together they add up to the profile
+        total = sum(int(line.rsplit(" ", 1)[1]) for line in lines)
+        self.assertAlmostEqual(total / 1e6, stats.total_tt, delta=0.001 + 0.05 * stats.total_tt)
+        self.assertTrue(any("<method 'sort' of 'list' objects>" in line or "sorted" in line for line in lines))
+        with open(capture.paths["alloc"], encoding="utf-8") as f:
+            report = f.read()
+        self.assertIn("peak traced memory", report)
+        self.assertIn("tests.py", report)
+    
+    def test_nested_profiles(self):
+        """Test that a profile inside another is folded into the outer one"""
+        with profiling.profile("outer", force=True) as outer:
+            with profiling.profile("inner", force=True) as inner:
+                pass
+        self.assertEqual(inner.paths, {})
+        self.assertEqual(len(outer.paths), 3)
+    
+    def test_batch_classify_hook(self):
+        """Test that batch classification and training write reports when profiling is on"""
+        from data_utils import batch_classify
+        
+        profiling.enable()
+        batch_classify(TestBatchClassification.texts)
+        ml_logic.train_classifier(["I love it", "How do I return this?"], ["positive", "question"])
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(len(names), 6)
+        self.assertEqual({name.split("-")[0] for name in names}, {"batch_classify", "train_classifier"})
+    
+    def test_app_batch_paths_hook(self):
+        """Test that the CSV upload and parallel batch paths used by app.py write reports"""
+        import pandas as pd
+        import results_store
+        from data_utils import classify_csv_stream, classify_parallel_results
+        
+        profiling.enable()
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "input.csv")
+            pd.DataFrame({'text': TestBatchClassification.texts}).to_csv(source, index=False)
+            with patch.object(results_store, 'RESULTS_DB_PATH', os.path.join(tmp, "results.sqlite3")):
+                summary = classify_csv_stream(source, filename="test_profiled_results.csv")
+        os.remove(summary['path'])
+        classify_parallel_results(TestBatchClassification.texts, workers=1)
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(len(names), 6)
+        self.assertEqual({name.split("-")[0] for name in names}, {"classify_csv_stream", "classify_parallel_results"})
+    
+    def test_classify_cli_hook(self):
+        """Test that classify_cli.py --profile writes reports for the whole run"""
+        import io
+        import classify_cli
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "in.txt")
+            with open(source, "w", encoding="utf-8") as f:
+                f.write("\n".join(TestBatchClassification.texts))
+            argv = ["classify_cli.py", source, "-o", os.path.join(tmp, "out.jsonl"), "--quiet", "--profile"]
+            with patch.object(sys, "argv", argv), patch("sys.stderr", io.StringIO()):
+                classify_cli.main()
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual([name.split(".", 1)[1] for name in names], ["alloc.txt", "folded", "prof"])
+        self.assertEqual({name.split("-")[0] for name in names}, {"classify_stream"})
+
+
+class TestCaches(unittest.TestCase):
+    """Tests for the in-memory and SQLite caches"""
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+    
+    def test_lru_ttl(self):
+        """Test that expired entries count as misses"""
+        cache = LRUCache(ttl=60)
+        with patch('cache.time.monotonic', return_value=1000.0):
+            cache.set("a", 1)
+        with patch('cache.time.monotonic', return_value=1059.0):
+            self.assertEqual(cache.get("a"), 1)
+        with patch('cache.time.monotonic', return_value=1061.0):
+            self.assertIsNone(cache.get("a", None))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (1, 1, 1))
+    
+    def test_sqlite_persistence_and_eviction(self):
+        """Test that SQLite entries survive reopening and respect max_size"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.sqlite3")
+            cache = SQLiteCache(path, max_size=2)
+            cache.set(("model", "q1"), "a1")
+            cache.set(("model", "q2"), "a2")
+            cache.close()
+            
+            cache = SQLiteCache(path, max_size=2)
+            self.assertEqual(cache.get(("model", "q1")), "a1")
+            cache.set(("model", "q3"), "a3")
+            self.assertIs(cache.get(("model", "q2")), MISSING)
+            self.assertEqual(len(cache), 2)
+            cache.close()
+
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file